@@ -0,0 +1,151 @@
+import os
+import json
+import random
+from decimal import Decimal
+from typing import *
+from dataclasses import dataclass
+
+import numpy as np
+
+from parsee.converters.pdf_extraction import PdfConverter
+from parsee.converters.html_extraction import HtmlConverter
+from parsee.extraction.extractor_elements import StandardDocumentFormat, ExtractedEl, StructuredTable, StructuredRow, StructuredTableCell
+from parsee.extraction.extractor_dataclasses import ExtractedSource
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, truncate_prompt
+from parsee.extraction.models.llm_models.prompts import Prompt
+from parsee.extraction.models.helpers import ollama_config
+from parsee.extraction.tasks.questions.features import GeneralQueriesPromptBuilder, MAIN_QUESTION_STR
+from parsee.extraction.tasks.questions.question_model_llm import LLMQuestionModel
+from parsee.extraction.tasks.element_classification.features import LLMLocationFeatureBuilder
+from parsee.storage.interfaces import StorageManager
+from parsee.storage.vector_stores.simple_numpy import SimpleNumpyStore
+from parsee.storage.feature_store import FeatureStore
+from parsee.templates.helpers import StructuringItem, TableItem, OutputType
+from parsee.utils.enums import DocumentType, ElementType, SearchStrategy
+from parsee.settings import chat_settings
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures")
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    # returns the arguments for run, setup is not timed
+    setup: Callable[[], Tuple]
+    run: Callable
+    repeat: int = 5
+    slow: bool = False
+
+
+class StubLLM(LLMBaseModel):
+    """
+    Returns the same canned answer for every prompt (after tokenizing and truncating the prompt like the real models).
+    """
+
+    def __init__(self, answer: str):
+        super().__init__(ollama_config("benchmark-stub"))
+        self.answer = answer
+        self.encoding = chat_settings.encoding
+        self.max_tokens_question = self.spec.max_tokens
+
+    def make_prompt_request(self, prompt: Prompt) -> Tuple[str, Decimal]:
+        truncate_prompt(prompt, self.encoding, self.max_tokens_question)
+        return self.answer, Decimal(0)
+
+
+class StubEncoder:
+    # replaces the sentence transformer, so that the chunking of the vector store can be measured offline
+    def encode(self, texts: List[str]):
+        return np.random.default_rng(0).random((len(texts), 384), dtype=np.float32)
+
+
+def make_table(element_index: int, num_rows: int, num_cols: int, rng: random.Random) -> StructuredTable:
+    rows = [StructuredRow("header", [StructuredTableCell("")] + [StructuredTableCell(f"FY {2000 + k}") for k in range(0, num_cols)])]
+    for r in range(0, num_rows):
+        rows.append(StructuredRow("body", [StructuredTableCell(f"Line item {r}")] + [StructuredTableCell(f"{rng.randint(-100000, 100000):,}") for _ in range(0, num_cols)]))
+    return StructuredTable(ExtractedSource(DocumentType.PDF, None, None, element_index, {"page_idx": element_index // 20}), rows)
+
+
+def make_document(num_elements: int, table_every: int = 10, seed: int = 0) -> StandardDocumentFormat:
+    rng = random.Random(seed)
+    words = ["revenue", "costs", "profit", "segment", "growth", "the", "of", "fiscal", "year", "increased", "decreased", "by", "percent", "compared", "to"]
+    elements = []
+    for k in range(0, num_elements):
+        if k % table_every == table_every - 1:
+            elements.append(make_table(k, 12, 3, rng))
+        else:
+            text = " ".join(rng.choice(words) for _ in range(0, rng.randint(20, 80)))
+            elements.append(ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.PDF, None, None, k, {"page_idx": k // 20}), text))
+    return StandardDocumentFormat(DocumentType.PDF, f"synthetic-{num_elements}-{seed}", elements, None)
+
+
+def make_html_file(num_blocks: int, directory: str) -> str:
+    path = os.path.join(directory, f"synthetic_{num_blocks}.html")
+    if not os.path.exists(path):
+        blocks = []
+        for k in range(0, num_blocks):
+            blocks.append(f"<p>Paragraph {k}: revenue increased by {k % 17} percent compared to the previous fiscal year.</p>")
+            if k % 4 == 0:
+                blocks.append("<table>" + "".join(f"<tr><td>Line item {r}</td><td>{(k + 1) * r:,}</td><td>{k * r:,}</td></tr>" for r in range(0, 10)) + "</table>")
+        with open(path, "w") as f:
+            f.write(f"<html><body>{''.join(blocks)}</body></html>")
+    return path
+
+
+def question_items(num_items: int) -> List[StructuringItem]:
+    items = []
+    for k in range(0, num_items):
+        item = StructuringItem(f"What is the value of question {k}?", OutputType.TEXT, assigned_id=f"question_{k}")
+        item.searchStrategy = SearchStrategy.START
+        items.append(item)
+    return items
+
+
+def make_cases(tmp_dir: str) -> List[BenchmarkCase]:
+    cases = []
+
+    for file_name in sorted(os.listdir(FIXTURES_DIR)):
+        if file_name.endswith(".pdf"):
+            path = os.path.join(FIXTURES_DIR, file_name)
+            slow = os.path.getsize(path) > 400000
+            cases.append(BenchmarkCase(f"pdf_conversion[{file_name}]", lambda p=path: (p,), lambda p: PdfConverter(None).convert(p), 1 if slow else 3, slow))
+
+    cases.append(BenchmarkCase("html_conversion[synthetic_500]", lambda: (make_html_file(500, tmp_dir),), lambda p: HtmlConverter().convert(p), 3))
+
+    def setup_table():
+        return (make_table(0, 1000, 8, random.Random(0)),)
+    cases.append(BenchmarkCase("structure_table[1000x8]", setup_table, lambda table: table.structure_table(), 3))
+
+    def setup_index():
+        return SimpleNumpyStore(StubEncoder()), make_document(20000)
+    cases.append(BenchmarkCase("make_index[20000_elements]", setup_index, lambda store, document: store.make_index(document, False)))
+
+    def setup_question_prompt():
+        return GeneralQueriesPromptBuilder(StorageManager(None, None)), question_items(1)[0], make_document(5000)
+    cases.append(BenchmarkCase("question_prompt[5000_elements]", setup_question_prompt,
+                               lambda builder, item, document: builder.build_prompt(item, [], document, builder.get_relevant_elements(item, document))))
+
+    def setup_element_prompt():
+        item = TableItem("Income statement", "revenue profit")
+        item.searchStrategy = SearchStrategy.START
+        # a new feature store, so that features are computed in each run
+        return item, make_document(5000), StorageManager(None, None)
+    cases.append(BenchmarkCase("element_prompt[5000_elements]", setup_element_prompt,
+                               lambda item, document, storage: LLMLocationFeatureBuilder(FeatureStore()).make_prompt(item, document, storage)))
+
+    def setup_answers():
+        answer = json.dumps({MAIN_QUESTION_STR: "some value", "sources": [0, 1]})
+        storage = BenchmarkStorage()
+        return LLMQuestionModel(question_items(10), [], storage, StubLLM(answer)), make_document(2000)
+    cases.append(BenchmarkCase("predict_answers[10_items_2000_elements]", setup_answers, lambda model, document: model.predict_answers(document)))
+
+    return cases
+
+
+class BenchmarkStorage(StorageManager):
+
+    def __init__(self):
+        super().__init__(None, None)
+
+    def log_expense(self, service: str, amount: Decimal, class_id: str, tokens: Optional[int] = None):
+        pass
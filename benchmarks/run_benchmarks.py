@@ -0,0 +1,84 @@
+"""
+Offline benchmarks for document conversion, table structuring, vector store indexing and prompt building (LLMs are replaced by stubs).
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks [--quick] [--filter NAME] [--save results.json] [--baseline benchmarks/baseline.json] [--max-slowdown 1.5]
+
+Timings are the median and minimum seconds of several runs, peak memory is measured in a separate run with tracemalloc.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from statistics import median
+from typing import *
+
+from benchmarks.cases import make_cases, BenchmarkCase
+
+
+def run_case(case: BenchmarkCase, measure_memory: bool) -> Dict[str, float]:
+    timings = []
+    for _ in range(0, case.repeat):
+        args = case.setup()
+        start = time.perf_counter()
+        case.run(*args)
+        timings.append(time.perf_counter() - start)
+    result = {"median_seconds": median(timings), "min_seconds": min(timings), "runs": len(timings)}
+    if measure_memory:
+        args = case.setup()
+        tracemalloc.start()
+        case.run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_memory_mb"] = peak / 1024 / 1024
+    return result
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    # ratio of the median timings (values above 1 are slower than the baseline)
+    return {name: results[name]["median_seconds"] / baseline[name]["median_seconds"] for name in results if name in baseline and baseline[name]["median_seconds"] > 0}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="parsee offline benchmarks")
+    parser.add_argument("--quick", action="store_true", help="skip slow cases (large fixture PDFs)")
+    parser.add_argument("--filter", default=None, help="only run cases containing this string")
+    parser.add_argument("--no-memory", action="store_true", help="do not measure peak memory")
+    parser.add_argument("--save", default=None, help="save the results as JSON (e.g. as new baseline)")
+    parser.add_argument("--baseline", default=None, help="JSON file with results to compare to")
+    parser.add_argument("--max-slowdown", type=float, default=None, help="exit with an error if a case is slower than the baseline by this factor")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = [x for x in make_cases(tmp_dir) if not (args.quick and x.slow) and (args.filter is None or args.filter in x.name)]
+        results = {}
+        for case in cases:
+            results[case.name] = run_case(case, not args.no_memory)
+            memory_str = f", peak memory {results[case.name]['peak_memory_mb']:.1f} MB" if "peak_memory_mb" in results[case.name] else ""
+            print(f"{case.name}: median {results[case.name]['median_seconds']:.4f}s, min {results[case.name]['min_seconds']:.4f}s{memory_str}")
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(), "results": results}, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+        ratios = compare(results, baseline)
+        too_slow = []
+        for name, ratio in ratios.items():
+            print(f"{name}: {ratio:.2f}x baseline")
+            if args.max_slowdown is not None and ratio > args.max_slowdown:
+                too_slow.append(name)
+        if len(too_slow) > 0:
+            print(f"slower than {args.max_slowdown}x baseline: {', '.join(too_slow)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
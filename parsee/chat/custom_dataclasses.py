@@ -25,3 +25,6 @@ class Message:
 class SinglePageProcessingSettings:
     max_images_trigger: int = 3
     merge_strategy: Optional[Callable[[List[str]], str]] = None
+    # if set, pages are processed concurrently (without showing the previous answer) and merged afterwards
+    parallel: bool = False
+    max_concurrent_pages: int = 4
@@ -1,10 +1,13 @@
 from typing import *
+from concurrent.futures import ThreadPoolExecutor
 from parsee.chat.custom_dataclasses import Message, SinglePageProcessingSettings
 from decimal import Decimal
 from parsee.storage.interfaces import DocumentManager
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.extraction.models.model_loader import get_llm_base_model
 from parsee.extraction.models.llm_models.prompts import Prompt
+from parsee.extraction.models.llm_models.llm_base_model import make_prompt_request_with_tokens
+from parsee.utils.instrumentation import stage
 from parsee.utils.helper import merge_answer_pieces
 from parsee.settings import chat_settings
 from tenacity import RetryError
@@ -39,7 +42,20 @@ def run_chat(message: Message, message_history: List[Message],
              single_page_processing_settings: Optional[SinglePageProcessingSettings] = None) -> List[Message]:
     """Run a chat with a specific model."""
     logger.info(f"Running chat with {spec.model_id}")
+    with stage("chat", model=spec.model_id) as attributes:
+        output, cache_hits = _run_chat(message, message_history, document_manager, spec, most_recent_references_only, show_chunk_index, single_page_processing_settings)
+        attributes["cache_hits"] = cache_hits
+        attributes["cost"] = float(sum(x.cost for x in output if x.cost is not None))
+    return output
+
+
+def _run_chat(message: Message, message_history: List[Message],
+              document_manager: DocumentManager, spec: MlModelSpecification,
+              most_recent_references_only: bool, show_chunk_index: bool,
+              single_page_processing_settings: Optional[SinglePageProcessingSettings]) -> Tuple[List[Message], int]:
+    # returns the messages and the number of prompts answered from the cache
     output = []
+    cache_hits = 0
 
     model = get_llm_base_model(spec)
 
@@ -54,7 +70,8 @@ def run_chat(message: Message, message_history: List[Message],
                 references.append(ref)
                 added_references.add(ref.reference_id())
 
-    data = document_manager.load_documents(references, model.spec.multimodal, str(message), model.spec.max_images, chat_settings.min_tokens_for_instructions_and_history, show_chunk_index)
+    with stage("retrieval", model=spec.model_id, num_references=len(references)):
+        data = document_manager.load_documents(references, model.spec.multimodal, str(message), model.spec.max_images, chat_settings.min_tokens_for_instructions_and_history, show_chunk_index)
 
     # for multimodal queries, check if pages have to be processed individually
     process_pages_individually = False
@@ -66,16 +83,26 @@ def run_chat(message: Message, message_history: List[Message],
     if process_pages_individually:
         answers = []
         cost = Decimal(0)
-        for k, img in enumerate(data):
-            if k > 0:
-                additional_info = f"We are showing you the images contained in the document one by one. The current image is number {k + 1} out of a total of {len(data)}.\n Your last answer ended with the following (make sure that your new answer is valid JSON or similar, as requested; last 500 characters are shown):\n" \
-                                  f"{answers[-1][-500:]}"
-            else:
-                additional_info = f"We are showing you the images contained in the document one by one. The current image is number {k + 1} out of a total of {len(data)}."
-            prompt = Prompt(None, f"{message}", additional_info=additional_info, available_data=[img], history=[str(m) for m in message_history])
-            current_answer, current_cost = model.make_prompt_request(prompt)
-            answers.append(current_answer)
-            cost += current_cost
+
+        def page_prompt(k: int, previous_answer: Optional[str]) -> Prompt:
+            additional_info = f"We are showing you the images contained in the document one by one. The current image is number {k + 1} out of a total of {len(data)}."
+            if previous_answer is not None:
+                additional_info += f"\n Your last answer ended with the following (make sure that your new answer is valid JSON or similar, as requested; last 500 characters are shown):\n{previous_answer[-500:]}"
+            return Prompt(None, f"{message}", additional_info=additional_info, available_data=[data[k]], history=[str(m) for m in message_history])
+
+        if single_page_processing_settings.parallel:
+            # pages are independent from each other, so they can be requested concurrently (map) and merged afterwards (reduce)
+            with ThreadPoolExecutor(max_workers=max(single_page_processing_settings.max_concurrent_pages, 1)) as executor:
+                for current_answer, current_cost, tokens in executor.map(lambda k: make_prompt_request_with_tokens(model, page_prompt(k, None)), range(0, len(data))):
+                    answers.append(current_answer)
+                    cost += current_cost
+                    cache_hits += 1 if tokens is None else 0
+        else:
+            for k in range(0, len(data)):
+                current_answer, current_cost, tokens = make_prompt_request_with_tokens(model, page_prompt(k, answers[-1] if k > 0 else None))
+                answers.append(current_answer)
+                cost += current_cost
+                cache_hits += 1 if tokens is None else 0
 
         # Use custom merge strategy if provided, otherwise use default
         if single_page_processing_settings is not None and single_page_processing_settings.merge_strategy is not None:
@@ -84,9 +111,9 @@ def run_chat(message: Message, message_history: List[Message],
             answer = merge_answer_pieces(answers)
     else:
         prompt = Prompt(None, f"{message}", available_data=data, history=[str(m) for m in message_history])
-        answer, cost = model.make_prompt_request(prompt)
+        answer, cost, tokens = make_prompt_request_with_tokens(model, prompt)
+        cache_hits += 1 if tokens is None else 0
 
     output.append(Message(answer, [], model.spec.model_id, cost=cost))
-    cache_info = model.make_prompt_request.cache_info()
-    logger.info(f"Chat with {spec.model_id} done. Cache info: {cache_info}")
-    return output
\ No newline at end of file
+    logger.info(f"Chat with {spec.model_id} done. Prompts answered from the cache: {cache_hits}")
+    return output, cache_hits
\ No newline at end of file
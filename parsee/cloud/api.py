@@ -1,8 +1,13 @@
 import os
+import time
 from typing import *
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 from enum import Enum
+from dataclasses import dataclass
 
 from parsee.templates.job_template import JobTemplate
 from parsee.templates.template_from_json import from_json_dict
@@ -11,6 +16,7 @@ from parsee.converters.json_to_raw import load_document_from_json
 from parsee.extraction.extractor_dataclasses import ParseeAnswer, ParseeMeta, source_from_json, AssignedAnswer
 from parsee.extraction.extractor_dataclasses import Base64Image
 from parsee.converters.image_creation import from_bytes
+from parsee.settings import chat_settings
 
 
 class RequestType(Enum):
@@ -18,28 +24,84 @@ class RequestType(Enum):
     GET = "get"
 
 
+@dataclass
+class UploadResult:
+    item: any
+    successful: bool
+    status_code: Optional[int]
+    error: Optional[str]
+    value: Optional[str] = None
+
+
+def _not_sent(exception: requests.RequestException) -> bool:
+    # connection timeouts and errors while connecting (e.g. connection refused), requests wraps the latter in the MaxRetryError of urllib3
+    if isinstance(exception, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exception.args[0], "reason", None) if len(exception.args) > 0 else None
+    return isinstance(reason, NewConnectionError)
+
+
 class ParseeCloud:
 
-    def __init__(self, api_key: Optional[str], custom_host: Optional[str] = None):
+    # status codes for which requests are retried
+    retry_status_codes = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key: Optional[str], custom_host: Optional[str] = None, timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None, max_workers: Optional[int] = None):
 
         self.api_key = api_key
         self.host = custom_host if custom_host is not None else (os.getenv("BACKEND_HOST") if os.getenv("BACKEND_HOST") is not None else "https://backend.parsee.ai")
         self.default_image_size = 2000
+        self.timeout = chat_settings.cloud_timeout if timeout is None else timeout
+        self.max_retries = chat_settings.cloud_max_retries if max_retries is None else max_retries
+        self.backoff_factor = chat_settings.cloud_backoff_factor if backoff_factor is None else backoff_factor
+        self.max_workers = chat_settings.cloud_max_workers if max_workers is None else max_workers
+        # connections are kept alive and shared by all requests (also from several threads)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def _headers(self):
         return {"Authorization": self.api_key}
 
-    def _make_request(self, url: str, request_type: RequestType, data: Optional[Dict] = None, max_retries: int=3, retry=0) -> any:
-        try:
-            if request_type == RequestType.POST:
-                return requests.post(url, json=data, headers=self._headers())
-            else:
-                return requests.get(url, headers=self._headers())
-        except Exception as e:
-            if retry < max_retries:
-                return self._make_request(url, request_type, data, max_retries, retry+1)
-            else:
+    def _make_request(self, url: str, request_type: RequestType, data: Optional[Dict] = None, max_retries: Optional[int] = None, files: Optional[Dict] = None,
+                      idempotent: Optional[bool] = None) -> any:
+        max_retries = self.max_retries if max_retries is None else max_retries
+        # requests that are not idempotent (by default all POST requests) are only retried if they can not have been processed by the server:
+        # the connection could not be established or 429, but not if the connection was lost after sending, read timeouts or server errors
+        idempotent = request_type == RequestType.GET if idempotent is None else idempotent
+        retry_status_codes = self.retry_status_codes if idempotent else {429}
+        for retry in range(0, max_retries + 1):
+            if retry > 0:
+                time.sleep(self.backoff_factor * (2 ** (retry - 1)))
+            try:
+                if request_type == RequestType.POST:
+                    if files is not None:
+                        response = self.session.post(url, data=data, files=files, headers=self._headers(), timeout=self.timeout)
+                    else:
+                        response = self.session.post(url, json=data, headers=self._headers(), timeout=self.timeout)
+                else:
+                    response = self.session.get(url, headers=self._headers(), timeout=self.timeout)
+            except requests.RequestException as e:
+                if idempotent or _not_sent(e):
+                    continue
                 return None
+            if response.status_code not in retry_status_codes or retry == max_retries:
+                return response
+        return None
+
+    def _get_response(self, url: str) -> requests.Response:
+        response = self._make_request(url, RequestType.GET)
+        if response is None:
+            raise Exception(f"request failed: {url}")
+        return response
+
+    def _map_concurrent(self, fun: Callable, entries: List) -> List:
+        if len(entries) <= 1:
+            return [fun(x) for x in entries]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(entries))) as executor:
+            return list(executor.map(fun, entries))
 
     def get_template(self, template_id: str) -> JobTemplate:
         url = f"{self.host}/{'public/' if self.api_key is None else ''}api/extraction/template/id/{template_id}"
@@ -50,20 +112,25 @@ class ParseeCloud:
 
     def get_document(self, source_identifier: str) -> StandardDocumentFormat:
         url = f"{self.host}/api/document/get-json-document?identifier={source_identifier}"
-        data = requests.get(url, headers=self._headers()).json()
+        data = self._get_response(url).json()
         return load_document_from_json(data)
 
+    def get_documents(self, source_identifiers: List[str]) -> List[StandardDocumentFormat]:
+        return self._map_concurrent(self.get_document, source_identifiers)
+
     def save_template(self, template: JobTemplate, public: bool = False) -> str:
         url = f"{self.host}/api/extraction/template"
         template_json_dict = template.to_json_dict()
         template_json_dict = {**template_json_dict, "public": public}
-        request = requests.post(url, json=template_json_dict, headers=self._headers())
+        request = self._make_request(url, RequestType.POST, template_json_dict)
+        if request is None:
+            raise Exception("template could not be saved")
         return request.text
 
     # currently only output for general questions is supported here (i.e. textual output)
     def get_output(self, source_identifier: str, template_id: str) -> List[ParseeAnswer]:
         url = f"{self.host}/api/extraction/output/json/{source_identifier}"
-        data = requests.get(url, headers=self._headers()).json()
+        data = self._get_response(url).json()
         output = []
         for entry in data:
             if entry["templateId"] == template_id and entry["text"] is not None:
@@ -76,52 +143,81 @@ class ParseeCloud:
                 output.append(ParseeAnswer(entry["model"], sources, class_id, class_value, "", True, meta_answers))
         return output
 
-    def upload_file(self, file_path: str) -> str:
-        """
-        upload a PDF, HTML or image file to Parsee Cloud
-        """
+    def _upload_file(self, file_path: str) -> UploadResult:
         with open(file_path, "rb") as f:
             data = f.read()
         file_data = {'file': (os.path.basename(file_path), data)}
 
         extractor_url = f"{self.host}/api/document/upload?method=simple"
 
-        r = requests.post(extractor_url, {}, files=file_data, headers=self._headers())
+        r = self._make_request(extractor_url, RequestType.POST, {}, files=file_data)
 
-        data = r.json()
+        if r is None:
+            return UploadResult(file_path, False, None, "request failed")
+        elif r.status_code != 200:
+            return UploadResult(file_path, False, r.status_code, r.text)
+        return UploadResult(file_path, True, r.status_code, None, list(r.json()[0].values())[0])
 
-        return list(data[0].values())[0]
+    def upload_file(self, file_path: str) -> str:
+        """
+        upload a PDF, HTML or image file to Parsee Cloud
+        """
+        result = self._upload_file(file_path)
+        if not result.successful:
+            raise Exception(f"file could not be uploaded: {file_path} (status code: {result.status_code}, error: {result.error})")
+        return result.value
+
+    def upload_files(self, file_paths: List[str]) -> List[UploadResult]:
+        """
+        uploads several files concurrently, the result of each upload contains the source identifier (value) if it was successful
+        """
+        def upload(file_path: str) -> UploadResult:
+            try:
+                return self._upload_file(file_path)
+            except Exception as e:
+                return UploadResult(file_path, False, None, str(e))
+        return self._map_concurrent(upload, file_paths)
+
+    def _add_assigned_answer(self, template_id: str, source_identifier: str, answer: AssignedAnswer) -> UploadResult:
+        data = {
+            "sourceIdentifier": source_identifier,
+            "templateId": template_id,
+            "itemId": answer.class_id,
+            "newValue": answer.class_value,
+            "newMeta": [
+                {"model": "manual", "class_id": meta_item.class_id, "value": meta_item.class_value, "prob": 1.0} for meta_item in answer.meta
+            ],
+            "sources": [source.to_json_dict() for source in answer.sources]
+        }
+
+        url = f"{self.host}/api/extraction/output/general-query"
+
+        r = self._make_request(url, RequestType.POST, data)
+
+        if r is None:
+            return UploadResult(answer, False, None, "request failed")
+        elif r.status_code != 200:
+            return UploadResult(answer, False, r.status_code, r.text)
+        return UploadResult(answer, True, r.status_code, None)
+
+    def upload_assigned_answers(self, answers: List[Tuple[str, str, AssignedAnswer]]) -> List[UploadResult]:
+        """
+        adds assigned answers (template ID, source identifier, answer) of any number of documents concurrently, returns the result for each answer
+        """
+        return self._map_concurrent(lambda entry: self._add_assigned_answer(*entry), answers)
 
     def add_assigned_answers(self, template_id: str, source_identifier: str, answers: List[AssignedAnswer]) -> bool:
         """
         adds one or more assigned answers to the Parsee Cloud database
         """
-        failed = False
-        for answer in answers:
-            data = {
-                "sourceIdentifier": source_identifier,
-                "templateId": template_id,
-                "itemId": answer.class_id,
-                "newValue": answer.class_value,
-                "newMeta": [
-                    {"model": "manual", "class_id": meta_item.class_id, "value": meta_item.class_value, "prob": 1.0} for meta_item in answer.meta
-                ],
-                "sources": [source.to_json_dict() for source in answer.sources]
-            }
-
-            url = f"{self.host}/api/extraction/output/general-query"
-
-            r = self._make_request(url, RequestType.POST, data)
-
-            if r is None or r.status_code != 200:
-                failed = True
-        return not failed
+        results = self.upload_assigned_answers([(template_id, source_identifier, answer) for answer in answers])
+        return len([x for x in results if not x.successful]) == 0
 
     def _get_image(self, source_identifier: str, page_index: int) -> bytes:
 
         url = f"{self.host}/api/document/images?identifier={source_identifier}&page-index={page_index}"
 
-        return requests.get(url, headers=self._headers()).content
+        return self._get_response(url).content
 
     def get_image(self, source_identifier: str, page_index: int, max_image_size: Optional[int]) -> Base64Image:
 
@@ -129,6 +225,10 @@ class ParseeCloud:
 
         return from_bytes(data, max_image_size if max_image_size is not None else self.default_image_size)
 
+    def get_images(self, source_identifier: str, page_indexes: List[int], max_image_size: Optional[int]) -> List[Base64Image]:
+        # pages are downloaded concurrently, the order of the images is the same as the one of the page indexes
+        return self._map_concurrent(lambda page_index: self.get_image(source_identifier, page_index, max_image_size), page_indexes)
+
     def get_image_and_save(self, source_identifier: str, page_index: int, output_path: str):
         """
         :param output_path: Output image is always a JPEG.
@@ -5,8 +5,8 @@ from parsee.cloud.api import ParseeCloud
 
 class CloudFileManager(DocumentManager):
 
-    def __init__(self, storage: StorageManager, cloud: ParseeCloud):
-        super().__init__(storage)
+    def __init__(self, storage: StorageManager, cloud: ParseeCloud, document_cache: Optional[DocumentCache] = None):
+        super().__init__(storage, document_cache)
         self.cloud = cloud
 
     def load_documents(self, references: List[FileReference], multimodal: bool, search_term: Optional[str], max_images: Optional[int], max_tokens: Optional[int], show_chunk_index: bool = False) -> Union[str, List[Base64Image]]:
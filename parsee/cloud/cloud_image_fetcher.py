@@ -20,4 +20,4 @@ class CloudImageFetcher(ImageCreator):
                     max_images is None or len(page_indexes) < max_images):
                 page_indexes.append(int(el.source.other_info["page_idx"]))
 
-        return [self.cloud.get_image(document.source_identifier, page_index, max_image_size) for page_index in page_indexes]
+        return self.cloud.get_images(document.source_identifier, page_indexes, max_image_size)
@@ -1,7 +1,7 @@
 import json
 import tempfile
 from decimal import Decimal
-from typing import Tuple, Union, List, Dict
+from typing import Tuple, Union, List, Dict, Optional
 
 from parsee.utils.enums import DocumentType
 from parsee.extraction.extractor_elements import StandardDocumentFormat
@@ -10,7 +10,9 @@ from parsee.converters.interfaces import RawToJsonConverter
 from parsee.converters.html_extraction import HtmlConverter
 from parsee.converters.pdf_extraction import PdfConverter
 from parsee.converters.simple_text import SimpleTextConverter
-from parsee.utils.helper import get_source_identifier, get_source_identifier_simple
+from parsee.utils.helper import get_source_identifier_simple
+from parsee.storage.source_identifier_registry import shared_source_identifier_registry
+from parsee.utils.instrumentation import stage
 
 
 def determine_document_type(file_path: str) -> DocumentType:
@@ -34,9 +36,10 @@ def choose_converter(source_type: DocumentType) -> RawToJsonConverter:
         raise Exception("Unknown format")
 
 
-def load_document(file_path: str) -> StandardDocumentFormat:
+def load_document(file_path: str, source_identifier: Optional[str] = None) -> StandardDocumentFormat:
     doc_type = determine_document_type(file_path)
-    source_identifier = get_source_identifier(file_path)
+    # files are only hashed again if they changed
+    source_identifier = shared_source_identifier_registry.get(file_path) if source_identifier is None else source_identifier
     doc, _ = doc_to_standard_format(source_identifier, doc_type, choose_converter(doc_type), file_path)
     return doc
 
@@ -50,7 +53,9 @@ def from_text(text: str) -> StandardDocumentFormat:
 
 def doc_to_standard_format(source_identifier: str, source_type: DocumentType, converter: RawToJsonConverter,
                            file_path_or_content: str) -> Tuple[StandardDocumentFormat, Decimal]:
-    elements, amount = converter.convert(file_path_or_content)
+    with stage("conversion", source_identifier=source_identifier, document_type=source_type.value) as attributes:
+        elements, amount = converter.convert(file_path_or_content)
+        attributes["num_elements"] = len(elements)
     return StandardDocumentFormat(source_type, source_identifier, elements, None if source_type == DocumentType.TEXT else file_path_or_content), amount
 
 
@@ -1,106 +1,176 @@
 import os.path
 from typing import *
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Semaphore
+
+import numpy as np
+import pandas as pd
 
 from parsee.extraction.extractor_dataclasses import ParseeAnswer
 from parsee.datasets.readers.interfaces import DatasetReader
 from parsee.datasets.writers.interfaces import DatasetWriter
+from parsee.datasets.dataset_dataclasses import DatasetRow
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.templates.job_template import JobTemplate
+from parsee.templates.general_structuring_schema import GeneralQueryItemSchema
 from parsee.extraction.models.model_loader import ModelLoader, LLMQuestionModel
 from parsee.storage.interfaces import StorageManager
 from parsee.storage.in_memory_storage import InMemoryStorageManager
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.extraction.extractor_elements import StandardDocumentFormat, ExtractedSource
-from parsee.utils.enums import DocumentType
+from parsee.utils.enums import DocumentType, ModelType
 
 
 class EvaluationResult:
+    """
+    Keeps all answers in a flat table (one row per source, model, class and meta key) and computes the scores with group-bys.
+    Strings are stored as integer codes in the table, the values can be looked up in self.labels.
+    """
+
+    columns = ["source", "model", "class_id", "key", "value", "has_meta"]
 
     def __init__(self, custom_compare_func: Optional[Dict[str, Callable]], exclude_meta_keys: Optional[List[str]]):
-        self.answers = {}
-        self.custom_compare_func = custom_compare_func
+        self.custom_compare_func = {} if custom_compare_func is None else custom_compare_func
         self.exclude_meta_keys = exclude_meta_keys
+        self.rows: List[Tuple[int, int, int, int, int, bool]] = []
+        # meta values and answers (only needed for custom compare functions) are kept outside of the table, by position
+        self.meta_keys: List[str] = []
+        self.meta: List[Dict[str, str]] = []
+        self.answer_objects: List[Optional[ParseeAnswer]] = []
+        # position in the table for each (source, model, class_id, key)
+        self.positions: Dict[Tuple[str, str, str, str], int] = {}
+        self.codes: Dict[str, Dict[any, int]] = {col: {} for col in ["source", "model", "class_id", "key", "value"]}
+        self.labels: Dict[str, List[any]] = {col: [] for col in self.codes.keys()}
+        self._table: Optional[pd.DataFrame] = None
+
+    def _code(self, col: str, value: any) -> int:
+        codes = self.codes[col]
+        if value not in codes:
+            codes[value] = len(codes)
+            self.labels[col].append(value)
+        return codes[value]
 
     def add_answers(self, source_identifier: str, answers: List[ParseeAnswer], is_assigned: bool):
         if len(answers) == 0:
             return
-        if source_identifier not in self.answers:
-            self.answers[source_identifier] = {}
-        key = "assigned" if is_assigned else answers[0].model
-        if key not in self.answers[source_identifier]:
-            self.answers[source_identifier][key] = {}
-        obj = self.answers[source_identifier][key]
+        self._table = None
+        model = "assigned" if is_assigned else answers[0].model
+        # codes of sources follow the order in which they were added
+        source_code, model_code = self._code("source", source_identifier), self._code("model", model)
         for answer in answers:
-            if answer.class_id not in obj:
-                obj[answer.class_id] = {}
-            if answer.unique_id() not in obj[answer.class_id]:
-                obj[answer.class_id][answer.unique_id(self.exclude_meta_keys)] = answer
+            meta_key = answer.meta_key()
+            full_key = f"{answer.class_id}:{meta_key}"
+            # answers are not added again if their full unique id is already taken (it can differ from the key if some meta keys are excluded)
+            if (source_identifier, model, answer.class_id, full_key) in self.positions:
+                continue
+            key = full_key if self.exclude_meta_keys is None else answer.unique_id(self.exclude_meta_keys)
+            row = (source_code, model_code, self._code("class_id", answer.class_id), self._code("key", key), self._code("value", answer.class_value), len(answer.meta) > 0)
+            meta = {x.class_id: x.class_value for x in answer.meta}
+            answer_object = answer if answer.class_id in self.custom_compare_func else None
+            position_key = (source_identifier, model, answer.class_id, key)
+            if position_key in self.positions:
+                pos = self.positions[position_key]
+                self.rows[pos], self.meta_keys[pos], self.meta[pos], self.answer_objects[pos] = row, meta_key, meta, answer_object
+            else:
+                self.positions[position_key] = len(self.rows)
+                self.rows.append(row)
+                self.meta_keys.append(meta_key)
+                self.meta.append(meta)
+                self.answer_objects.append(answer_object)
 
     def _values_match(self, val1: ParseeAnswer, val2: ParseeAnswer) -> bool:
         if val1.class_id in self.custom_compare_func:
             return self.custom_compare_func[val1.class_id](val1, val2)
         return val1.class_value == val2.class_value
 
-    def evaluate(self) -> Dict:
-        scores_by_source = {}
-        for source, sc_dict in self.answers.items():
-            scores_by_source[source] = {}
-            reference_item = sc_dict["assigned"]
-            for model, by_class in sc_dict.items():
-                scores_by_source[source][model] = {"error_log": [], "missing_answers": 0}
-                # check that all questions have been answered
-                scores_by_source[source][model]["completion"] = len(by_class.keys()) / len(reference_item.keys())
-                # check each question
-                score = 0
-                score_meta = 0
-                for class_id, assigned_values in reference_item.items():
-                    if class_id not in by_class:
-                        continue
-                    predicted_values = by_class[class_id]
-                    # check if some answers are missing from the result
-                    scores_by_source[source][model]["missing_answers"] = max(len(assigned_values.keys()) - len(predicted_values.keys()), 0)
-                    for meta_key, correct_value in assigned_values.items():
-                        if meta_key in predicted_values:
-                            if meta_key != "" and len(correct_value.meta) > 0:
-                                score_meta += 1
-                            predicted_value = predicted_values[meta_key]
-                            # check if values match
-                            if self._values_match(correct_value, predicted_value):
-                                score += 1
-                            else:
-                                scores_by_source[source][model]["error_log"].append({"doc": source, "class_id": class_id, "type": "main question", "expected": correct_value.class_value, "actual": predicted_value.class_value})
-                        else:
-                            if len(assigned_values.keys()) == 1 and len(predicted_values.keys()) == 1:
-                                predicted_value = predicted_values[list(predicted_values.keys())[0]]
-                            else:
-                                # try to find main answer
-                                filtered_answers = [x for x in predicted_values.values() if x.class_value == correct_value.class_value]
-                                if len(filtered_answers) > 0:
-                                    predicted_value = filtered_answers[0]
-                                else:
-                                    continue
-                            # meta mismatch
-                            scores_by_source[source][model]["error_log"].append({"doc": source, "class_id": class_id, "type": "meta", "expected": correct_value.meta_key(), "actual": predicted_value.meta_key()})
-                            # check if values match
-                            if correct_value.class_value == predicted_value.class_value:
-                                score += 1
-                            else:
-                                scores_by_source[source][model]["error_log"].append({"doc": source, "class_id": class_id, "type": "main question", "expected": correct_value.class_value, "actual": predicted_value.class_value})
-
-                scores_by_source[source][model]["total_correct"] = score
-                scores_by_source[source][model]["total_correct_meta_found"] = score_meta
+    def answers_table(self) -> pd.DataFrame:
+        if self._table is None:
+            df = pd.DataFrame(np.array(self.rows, dtype=np.int64).reshape(-1, len(self.columns)), columns=self.columns)
+            df["has_meta"] = df["has_meta"].astype(bool)
+            df["pos"] = np.arange(0, len(df))
+            self._table = df
+        return self._table
+
+    def _reference(self, df: pd.DataFrame) -> pd.DataFrame:
+        if "assigned" not in self.codes["model"]:
+            raise Exception("no assigned answers")
+        reference = df[df["model"] == self.codes["model"]["assigned"]]
+        if reference["source"].nunique() != len(self.codes["source"]):
+            raise Exception("assigned answers missing for some sources")
+        return reference
+
+    def matches_table(self) -> pd.DataFrame:
+        # for each assigned answer and model: the predicted answer it is compared with (if any)
+        df = self.answers_table()
+        reference = self._reference(df)
+        reference = reference.assign(class_order=reference.groupby(["source", "class_id"])["pos"].transform("min"), num_ref_keys=reference.groupby(["source", "class_id"])["key"].transform("size"))
+        predicted = df.assign(num_pred_keys=df.groupby(["source", "model", "class_id"])["key"].transform("size"))
+        pairs = reference.drop(columns=["model"]).merge(predicted, on=["source", "class_id"], suffixes=("_ref", ""))
+        pairs["exact"] = pairs["key_ref"] == pairs["key"]
+        pairs["value_equal"] = pairs["value_ref"] == pairs["value"]
+        pairs["single"] = (pairs["num_ref_keys"] == 1) & (pairs["num_pred_keys"] == 1)
+        # exact key matches come first, then the only answer (if there is only one), then the first answer with the same value
+        pairs["priority"] = np.where(pairs["exact"], 0, np.where(pairs["single"], 1, np.where(pairs["value_equal"], 2, 3)))
+        pairs = pairs[pairs["priority"] < 3].sort_values(["priority", "pos"], kind="stable")
+        matches = pairs.groupby(["model", "pos_ref"], sort=False).head(1).copy()
+        matches["correct"] = matches["value_equal"]
+        custom_classes = [self.codes["class_id"][x] for x in self.custom_compare_func.keys() if x in self.codes["class_id"]]
+        custom = matches["exact"] & matches["class_id"].isin(custom_classes)
+        if custom.any():
+            matches.loc[custom, "correct"] = [self._values_match(self.answer_objects[ref], self.answer_objects[pred]) for ref, pred in zip(matches.loc[custom, "pos_ref"], matches.loc[custom, "pos"])]
+        matches["meta_found"] = matches["exact"] & matches["has_meta_ref"]
+        # same order as the assigned answers were added
+        matches = matches.sort_values(["source", "class_order", "pos_ref"], kind="stable")
+        matches["rank"] = np.arange(0, len(matches))
+        return matches
+
+    def _error_log(self, matches: pd.DataFrame) -> Dict[str, List[Dict]]:
+        meta_errors = matches.loc[~matches["exact"], ["rank", "model", "source", "class_id", "pos_ref", "pos"]].assign(type="meta", order=0)
+        main_errors = matches.loc[~matches["correct"], ["rank", "model", "source", "class_id", "value_ref", "value"]].assign(type="main question", order=1)
+        # meta errors come before main errors of the same answer
+        errors = pd.concat([meta_errors, main_errors]).sort_values(["rank", "order"])
+        error_log = {self.labels["model"][model]: [] for model in matches["model"].unique()}
+        sources, classes, values = self.labels["source"], self.labels["class_id"], self.labels["value"]
+        for model, model_errors in errors.groupby("model", sort=False):
+            error_log[self.labels["model"][model]] = [{"doc": sources[source], "class_id": classes[class_id], "type": "meta", "expected": self.meta_keys[int(pos_ref)], "actual": self.meta_keys[int(pos)]} if order == 0 else
+                                                      {"doc": sources[source], "class_id": classes[class_id], "type": "main question", "expected": values[int(value_ref)], "actual": values[int(value)]}
+                                                      for source, class_id, order, pos_ref, pos, value_ref, value in zip(model_errors["source"], model_errors["class_id"], model_errors["order"], model_errors["pos_ref"], model_errors["pos"], model_errors["value_ref"], model_errors["value"])]
+        return error_log
+
+    def evaluate(self, include_error_log: bool = True) -> Dict:
+        df = self.answers_table()
+        matches = self.matches_table()
+        reference = self._reference(df)
+        num_sources = len(self.codes["source"])
+
+        # completion: share of assigned classes that were answered (per source)
+        classes_ref = reference.groupby("source")["class_id"].nunique()
+        by_source = df.groupby(["source", "model"]).agg(classes=("class_id", "nunique"), first_pos=("pos", "min")).reset_index()
+        by_source["completion"] = by_source["classes"] / by_source["source"].map(classes_ref)
+
+        # missing answers: difference in the number of answers for the last assigned class that was answered by the model
+        keys_ref = reference.groupby(["source", "class_id"]).agg(num_ref_keys=("key", "size"), class_order=("pos", "min")).reset_index()
+        keys_pred = df.groupby(["source", "model", "class_id"]).size().rename("num_pred_keys").reset_index()
+        missing = keys_pred.merge(keys_ref, on=["source", "class_id"]).sort_values("class_order").groupby(["source", "model"]).tail(1)
+        missing["missing_answers"] = (missing["num_ref_keys"] - missing["num_pred_keys"]).clip(lower=0)
+        by_source = by_source.merge(missing[["source", "model", "missing_answers"]], on=["source", "model"], how="left")
 
+        scores = matches.groupby(["source", "model"]).agg(total_correct=("correct", "sum"), total_correct_meta_found=("meta_found", "sum")).reset_index()
+        by_source = by_source.merge(scores, on=["source", "model"], how="left").fillna({"missing_answers": 0, "total_correct": 0, "total_correct_meta_found": 0})
+
+        # models in the order they appear first
+        totals = by_source.sort_values(["source", "first_pos"]).groupby("model", sort=False)[["completion", "total_correct", "total_correct_meta_found", "missing_answers"]].sum()
+        error_log = self._error_log(matches) if include_error_log else {}
+
+        reference_scores = totals.loc[self.codes["model"]["assigned"]]
         total_scores = {}
-        for source, by_source in scores_by_source.items():
-            for model, scores in by_source.items():
-                if model not in total_scores:
-                    total_scores[model] = {"completion": 0, "total_correct": 0, "total_correct_meta_found": 0, "missing_answers": 0, "error_log": []}
-                for score_key, score_value in scores.items():
-                    total_scores[model][score_key] += score_value
-        reference_scores = total_scores["assigned"]
-        for model, scores_dict in total_scores.items():
-            scores_dict_final = {**scores_dict}
-            scores_dict_final["completion"] = scores_dict["completion"] / len(scores_by_source.keys())
+        for model_code, scores_dict in totals.iterrows():
+            model = self.labels["model"][model_code]
+            scores_dict_final = {"completion": scores_dict["completion"], "total_correct": int(scores_dict["total_correct"]), "total_correct_meta_found": int(scores_dict["total_correct_meta_found"]), "missing_answers": int(scores_dict["missing_answers"])}
+            if include_error_log:
+                scores_dict_final["error_log"] = error_log.get(model, [])
+            scores_dict_final["completion"] = scores_dict_final["completion"] / num_sources
             # calculate completeness: how many items are not "missing" entirely
             scores_dict_final["completeness"] = (reference_scores["total_correct"] - scores_dict_final["missing_answers"])/reference_scores["total_correct"]
             # scores INCLUDING missing answers
@@ -112,8 +182,70 @@ class EvaluationResult:
             total_scores[model] = scores_dict_final
         return total_scores
 
+    def evaluate_by_class(self) -> Dict[str, Dict[str, Dict[str, any]]]:
+        # share of correct answers per model and class
+        matches = self.matches_table()
+        totals = self._reference(self.answers_table()).groupby("class_id").size()
+        correct = matches.groupby(["model", "class_id"])["correct"].sum()
+        output = {}
+        for (model, class_id), total_correct in correct.items():
+            output.setdefault(self.labels["model"][model], {})[self.labels["class_id"][class_id]] = {"total_correct": int(total_correct), "total": int(totals[class_id]), "total_correct_percent": total_correct / totals[class_id]}
+        return output
+
+    def evaluate_by_meta(self) -> Dict[str, Dict[str, Dict[str, any]]]:
+        # share of assigned meta values that were found by the model (for the answers compared with each other)
+        matches = self.matches_table()
+        totals = Counter(meta_id for pos in self._reference(self.answers_table())["pos"] for meta_id in self.meta[pos].keys())
+        output = {}
+        for model, pos_ref, pos in zip(matches["model"], matches["pos_ref"], matches["pos"]):
+            meta = self.meta[pos]
+            for meta_id, value in self.meta[pos_ref].items():
+                entry = output.setdefault(self.labels["model"][model], {}).setdefault(meta_id, {"total_correct": 0, "total": totals[meta_id]})
+                entry["total_correct"] += 1 if meta.get(meta_id) == value else 0
+        for by_meta in output.values():
+            for entry in by_meta.values():
+                entry["total_correct_percent"] = entry["total_correct"] / entry["total"]
+        return output
+
+    def bootstrap_confidence_intervals(self, num_samples: int = 1000, confidence: float = 0.95, seed: Optional[int] = None) -> Dict[str, Tuple[float, float]]:
+        # confidence intervals of total_correct_percent per model, sources are resampled with replacement
+        matches = self.matches_table()
+        num_sources = len(self.codes["source"])
+        reference = np.bincount(self._reference(self.answers_table())["source"], minlength=num_sources)
+        samples = np.random.default_rng(seed).integers(0, num_sources, size=(num_samples, num_sources))
+        totals_ref = np.maximum(reference[samples].sum(axis=1), 1)
+        output = {}
+        for model, model_matches in matches.groupby("model"):
+            correct = np.bincount(model_matches["source"], weights=model_matches["correct"].astype(float), minlength=num_sources)
+            percent = correct[samples].sum(axis=1) / totals_ref
+            output[self.labels["model"][model]] = (float(np.quantile(percent, (1 - confidence) / 2)), float(np.quantile(percent, 1 - (1 - confidence) / 2)))
+        return output
+
+
+def _is_saved_answer(row: DatasetRow, model_spec: MlModelSpecification, retry_on_na: bool) -> bool:
+    saved_answer = row.get_value(model_spec.model_id, False)
+    return saved_answer is not None and str(saved_answer).strip() != "" and not (retry_on_na and str(saved_answer) == "n/a")
+
+
+def _predict_for_row(model: LLMQuestionModel, model_spec: MlModelSpecification, row: DatasetRow, schema_item: GeneralQueryItemSchema, storage: StorageManager, limit: Semaphore) -> Tuple[List[ParseeAnswer], str]:
+    # for text based datasets, the data is already in the prompt
+    available_data = None
+    with limit:
+        if model_spec.multimodal:
+            page_indexes = row.get_feature("page_indexes").split("|")
+            sources = [ExtractedSource(DocumentType.PDF, None, None, 0, {"page_idx": x}) for x in page_indexes]
+            available_data = storage.image_creator.get_images(StandardDocumentFormat(DocumentType.PDF, row.source_identifier, [], None), sources, len(page_indexes), model_spec.max_image_pixels)
+        prompt = Prompt(None, row.get_feature("full_prompt"), None, None, available_data)
+        answers_model = model.predict_for_prompt(prompt, schema_item, None, None)
+    raw_answer = answers_model[0].raw_value if len(answers_model) > 0 else "n/a"
+    return answers_model, raw_answer
+
+
+def _row_key(row: DatasetRow) -> Tuple[str, str, str]:
+    return str(row.source_identifier), str(row.template_id), str(row.element_identifier)
 
-def evaluate_llm_performance(template: JobTemplate, reader: DatasetReader, models: List[MlModelSpecification], storage: Optional[StorageManager] = None, writer_for_model_answers: Optional[DatasetWriter] = None, use_saved_model_answers: bool = False, new_dataset_name: Optional[str] = None, custom_compare_func: Optional[Dict[str, Callable]] = None, exclude_meta_keys: Optional[List[str]] = None, retry_on_na: bool = False) -> Dict:
+
+def evaluate_llm_performance(template: JobTemplate, reader: DatasetReader, models: List[MlModelSpecification], storage: Optional[StorageManager] = None, writer_for_model_answers: Optional[DatasetWriter] = None, use_saved_model_answers: bool = False, new_dataset_name: Optional[str] = None, custom_compare_func: Optional[Dict[str, Callable]] = None, exclude_meta_keys: Optional[List[str]] = None, retry_on_na: bool = False, max_workers: int = 8, max_concurrent_per_provider: Optional[Dict[ModelType, int]] = None, default_concurrent_per_provider: int = 4, resume_reader: Optional[DatasetReader] = None) -> Dict:
 
     storage = InMemoryStorageManager(models) if storage is None else storage
     loader = ModelLoader(storage)
@@ -126,35 +258,66 @@ def evaluate_llm_performance(template: JobTemplate, reader: DatasetReader, model
         if spec.model_type == "custom":
             raise Exception("custom models not allowed here")
 
-    for row, _ in reader.row_generator():
+    # models are only built once and shared by all rows
+    question_models: List[LLMQuestionModel] = []
+    for model_spec in models:
+        model = loader.get_question_model(model_spec.model_id, template.questions.items, template.meta, {})
+        if model is None:
+            raise Exception("model not found")
+        question_models.append(model)
+
+    # requests to the same provider are limited
+    max_concurrent_per_provider = {} if max_concurrent_per_provider is None else max_concurrent_per_provider
+    limits = {spec.model_type: Semaphore(max_concurrent_per_provider.get(spec.model_type, default_concurrent_per_provider)) for spec in models}
+
+    # answers of rows that were already written by a previous (interrupted) run
+    answers_resumed: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+    if resume_reader is not None:
+        for row, _ in resume_reader.row_generator():
+            answers_resumed[_row_key(row)] = {spec.model_id: row.get_value(spec.model_id, False) for spec in models if _is_saved_answer(row, spec, retry_on_na)}
 
+    # rows are finished in the order of the reader, so that answers are added and written in the same order as they were read
+    pending: Deque[Tuple[DatasetRow, GeneralQueryItemSchema, List[Union[Future, List[ParseeAnswer]]]]] = deque()
+
+    def finish_row(row: DatasetRow, schema_item: GeneralQueryItemSchema, results: List[Union[Future, List[ParseeAnswer]]]):
         for k, model_spec in enumerate(models):
-            model: LLMQuestionModel = loader.get_question_model(model_spec.model_id, template.questions.items, template.meta, {})
-            if model is None:
-                raise Exception("model not found")
-            schema_items = [x for x in template.questions.items if x.id == row.element_identifier]
-            if len(schema_items) == 0:
-                raise Exception("item not found in schema")
-            schema_item = schema_items[0]
-            if use_saved_model_answers and row.get_value(model_spec.model_id, False) is not None and str(row.get_value(model_spec.model_id, False)).strip() != "" and not (retry_on_na and str(row.get_value(model_spec.model_id, False)) == "n/a"):
-                prompt_answer = row.get_value(model_spec.model_id, False)
-                answers_model = model.parse_prompt_answer(schema_item, prompt_answer, None, None)
-            else:
-                # for text based datasets, the data is already in the prompt
-                available_data = None
-                if model_spec.multimodal:
-                    page_indexes = row.get_feature("page_indexes").split("|")
-                    sources = [ExtractedSource(DocumentType.PDF, None, None, 0, {"page_idx": x}) for x in page_indexes]
-                    available_data = storage.image_creator.get_images(StandardDocumentFormat(DocumentType.PDF, row.source_identifier, [], None), sources, len(page_indexes), model_spec.max_image_pixels)
-                prompt = Prompt(None, row.get_feature("full_prompt"), None, None, available_data)
-                answers_model = model.predict_for_prompt(prompt, schema_item, None, None)
-                raw_answer = answers_model[0].raw_value if len(answers_model) > 0 else "n/a"
+            if isinstance(results[k], Future):
+                answers_model, raw_answer = results[k].result()
                 row.assign_truth_values({model_spec.model_id: raw_answer})
+            else:
+                answers_model = results[k]
             ev.add_answers(row.source_identifier, answers_model, False)
             if k == 0:
-                answers_assigned = model.parse_prompt_answer(schema_item, row.get_value("assigned", False), None, None)
+                answers_assigned = question_models[0].parse_prompt_answer(schema_item, row.get_value("assigned", False), None, None)
                 ev.add_answers(row.source_identifier, answers_assigned, True)
         if writer_for_model_answers is not None:
             writer_for_model_answers.write_rows([row], "dataset_with_answers" if new_dataset_name is None else new_dataset_name)
 
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for row, _ in reader.row_generator():
+
+            schema_items = [x for x in template.questions.items if x.id == row.element_identifier]
+            if len(schema_items) == 0:
+                raise Exception("item not found in schema")
+            schema_item = schema_items[0]
+
+            row_resumed = _row_key(row) in answers_resumed
+            if row_resumed:
+                row.assign_truth_values(answers_resumed[_row_key(row)])
+
+            results = []
+            for model, model_spec in zip(question_models, models):
+                if (use_saved_model_answers or row_resumed) and _is_saved_answer(row, model_spec, retry_on_na):
+                    results.append(model.parse_prompt_answer(schema_item, row.get_value(model_spec.model_id, False), None, None))
+                else:
+                    results.append(executor.submit(_predict_for_row, model, model_spec, row, schema_item, storage, limits[model_spec.model_type]))
+            pending.append((row, schema_item, results))
+
+            # write finished rows as soon as possible, keep a bounded number of rows in memory
+            while len(pending) > 0 and (len(pending) > max_workers * 4 or all(not isinstance(x, Future) or x.done() for x in pending[0][2])):
+                finish_row(*pending.popleft())
+
+        while len(pending) > 0:
+            finish_row(*pending.popleft())
+
     return ev.evaluate()
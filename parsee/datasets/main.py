@@ -1,8 +1,12 @@
+import os
 from decimal import Decimal
 from functools import reduce
 from typing import *
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
 
 import tiktoken
+from tiktoken import Encoding
 
 from parsee.extraction.extractor_elements import StandardDocumentFormat
 from parsee.templates.job_template import JobTemplate
@@ -13,14 +17,17 @@ from parsee.extraction.tasks.questions.features import GeneralQueriesPromptBuild
 from parsee.extraction.models.llm_models.llm_base_model import truncate_prompt
 from parsee.datasets.dataset_dataclasses import DatasetRow
 from parsee.extraction.extractor_dataclasses import AssignedAnswer
+from parsee.datasets.writers.interfaces import DatasetWriter
+from parsee.converters.main import load_document
 
 
-def create_dataset_rows(template: JobTemplate, document: StandardDocumentFormat, assigned_answers: List[AssignedAnswer], storage: Optional[StorageManager] = None, max_tokens_prompt=4000, custom_model_loader: Optional[ModelLoader] = None) -> List[DatasetRow]:
-    encoding = tiktoken.get_encoding("cl100k_base")
+def create_dataset_rows(template: JobTemplate, document: StandardDocumentFormat, assigned_answers: List[AssignedAnswer], storage: Optional[StorageManager] = None, max_tokens_prompt=4000, custom_model_loader: Optional[ModelLoader] = None, encoding: Optional[Encoding] = None, prompt_builder: Optional[GeneralQueriesPromptBuilder] = None) -> List[DatasetRow]:
+    encoding = tiktoken.get_encoding("cl100k_base") if encoding is None else encoding
     storage = InMemoryStorageManager(None) if storage is None else storage
     model_loader = ModelLoader(storage) if custom_model_loader is None else custom_model_loader
     template = storage.db_values_template(template, False)
-    question_feature_builder = GeneralQueriesPromptBuilder(storage)
+    # a shared builder reuses the parts of the prompts that are the same for all documents
+    question_feature_builder = GeneralQueriesPromptBuilder(storage) if prompt_builder is None else prompt_builder
     question_models = question_models_from_schema(template.questions, template.meta, model_loader, {"truth_questions": assigned_answers})
     question_rows = []
     if len(question_models) > 0:
@@ -40,3 +47,57 @@ def create_dataset_rows(template: JobTemplate, document: StandardDocumentFormat,
                     row.assign_truth_values({"assigned": full_answer})
                     question_rows.append(row)
     return question_rows
+
+
+# state of a worker process, shared by all documents the worker processes
+_worker_state: Dict[str, any] = {}
+
+
+def _init_worker(storage_factory: Optional[Callable[[], StorageManager]]):
+    _worker_state["storage"] = InMemoryStorageManager(None) if storage_factory is None else storage_factory()
+    _worker_state["encoding"] = tiktoken.get_encoding("cl100k_base")
+    _worker_state["prompt_builder"] = GeneralQueriesPromptBuilder(_worker_state["storage"])
+
+
+def _worker_rows(template: JobTemplate, document: Union[str, StandardDocumentFormat], assigned_answers: List[AssignedAnswer], max_tokens_prompt: int) -> List[DatasetRow]:
+    # documents can also be given as file paths, so that they are converted in the worker
+    if isinstance(document, str):
+        document = load_document(document)
+    return create_dataset_rows(template, document, assigned_answers, _worker_state["storage"], max_tokens_prompt, encoding=_worker_state["encoding"], prompt_builder=_worker_state["prompt_builder"])
+
+
+def create_dataset(template: JobTemplate, documents: Iterable[Tuple[Union[str, StandardDocumentFormat], List[AssignedAnswer]]], writer: DatasetWriter, dataset_name: str = "dataset", max_tokens_prompt=4000, num_workers: Optional[int] = None,
+                   storage_factory: Optional[Callable[[], StorageManager]] = None, max_pending: Optional[int] = None) -> int:
+    """
+    Creates the dataset rows for a whole corpus of documents (or file paths) with their assigned answers and writes them with the writer, returns the number of rows written.
+    Documents are processed by a pool of num_workers processes (num_workers=0: in this process), each worker has its own storage (created with storage_factory, needs to be picklable) and tokenizer.
+    Rows are written in the order of the documents.
+    """
+
+    rows_written = 0
+
+    def write(rows: List[DatasetRow]):
+        nonlocal rows_written
+        writer.write_rows(rows, dataset_name)
+        rows_written += len(rows)
+
+    if num_workers == 0:
+        _init_worker(storage_factory)
+        for document, assigned_answers in documents:
+            write(_worker_rows(template, document, assigned_answers, max_tokens_prompt))
+        return rows_written
+
+    num_workers = os.cpu_count() if num_workers is None else num_workers
+    # only a limited number of documents is submitted at once, so that the corpus doesn't have to fit into memory
+    max_pending = num_workers * 2 if max_pending is None else max_pending
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(storage_factory,)) as executor:
+        pending: Deque[Future] = deque()
+        for document, assigned_answers in documents:
+            pending.append(executor.submit(_worker_rows, template, document, assigned_answers, max_tokens_prompt))
+            while len(pending) >= max_pending or (len(pending) > 0 and pending[0].done()):
+                write(pending.popleft().result())
+        while len(pending) > 0:
+            write(pending.popleft().result())
+
+    return rows_written
@@ -2,16 +2,20 @@ import os
 import csv
 from typing import *
 import pickle
+import logging
 from collections import Counter
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 
 from parsee.datasets.readers.interfaces import DatasetReader
 from parsee.datasets.dataset_dataclasses import DatasetColumn, TRUTH_PREFIX, FEATURE_PREFIX, DatasetRow
 
 csv.field_size_limit(2147483647)
 
+logger = logging.getLogger(__name__)
+
 
 def num_rows_in_file(dataset_path: str) -> int:
     f = open(dataset_path, encoding="utf8")
@@ -26,16 +30,39 @@ def determine_columns(dataset_path: str) -> List[DatasetColumn]:
     datareader = csv.reader(f, delimiter=',', quotechar='"')
     row = datareader.__next__()
     f.close()
+    return columns_from_header(row)
+
+
+def row_from_csv(row: List[str], columns: List[DatasetColumn]) -> DatasetRow:
+    source_identifier = row[0]
+    template_id = row[1]
+    item_identifier = row[2]
+
+    features = {}
+    truth_values = {}
+    for col in columns:
+        if col.is_feature:
+            features[col.col_name] = row[col.col_idx]
+        else:
+            truth_values[col.col_name] = row[col.col_idx]
+
+    dr = DatasetRow(source_identifier, template_id, item_identifier, features)
+    dr.assign_truth_values(truth_values)
+    return dr
+
+
+def is_complete_row(row: List[str], columns: List[DatasetColumn]) -> bool:
+    # the last row can be cut off if the process writing the file was killed
+    return len(row) > max([x.col_idx for x in columns], default=2)
+
+
+def columns_from_header(header: List[str]) -> List[DatasetColumn]:
     output = []
-    for col_idx, col_name in enumerate(row):
+    for col_idx, col_name in enumerate(header):
         if col_name.startswith(FEATURE_PREFIX):
-            col_name = col_name[len(FEATURE_PREFIX)+1:]
-            is_feature = True
-            output.append(DatasetColumn(col_idx, col_name, is_feature))
+            output.append(DatasetColumn(col_idx, col_name[len(FEATURE_PREFIX)+1:], True))
         elif col_name.startswith(TRUTH_PREFIX):
-            col_name = col_name[len(TRUTH_PREFIX)+1:]
-            is_feature = False
-            output.append(DatasetColumn(col_idx, col_name, is_feature))
+            output.append(DatasetColumn(col_idx, col_name[len(TRUTH_PREFIX)+1:], False))
     return output
 
 
@@ -77,24 +104,173 @@ class SimpleCsvDiskReader(DatasetReader):
                     # increment current index
                     self.increment_index()
 
-                    source_identifier = row[0]
-                    template_id = row[1]
-                    item_identifier = row[2]
-
-                    features = {}
-                    truth_values = {}
-                    for col in self.columns:
-                        if col.is_feature:
-                            features[col.col_name] = row[col.col_idx]
-                        else:
-                            truth_values[col.col_name] = row[col.col_idx]
+                    if not is_complete_row(row, self.columns):
+                        logger.warning(f"incomplete row {k} skipped: {self.dataset_path}")
+                        continue
 
-                    dr = DatasetRow(source_identifier, template_id, item_identifier, features)
-                    dr.assign_truth_values(truth_values)
+                    dr = row_from_csv(row, self.columns)
 
                     if self.preprocessing_fun is not None:
                         dr = self.preprocessing_fun(dr)
 
                     self.entry_counter += 1
 
-                    yield dr, self.current_index-1
\ No newline at end of file
+                    yield dr, self.current_index-1
+
+
+def _read_lines(file: BinaryIO) -> Generator[str, None, None]:
+    # lines are read in binary mode to know the byte offsets, newlines are translated like in text mode
+    while True:
+        line = file.readline()
+        if line == b"":
+            return
+        yield line.decode("utf8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class IndexedCsvDiskReader(DatasetReader):
+    """
+    Reads csv datasets with an index of the byte offsets of all rows, so that any subset of rows can be read without scanning the skipped ones.
+    The index is built with a single pass on the first open and saved next to the csv file.
+    Indices follow the same convention as SimpleCsvDiskReader: 0 is the header, rows start at 1.
+    """
+
+    def __init__(self, dataset_path: str, save_index: bool = True):
+        self.dataset_path = dataset_path
+        self.index_path = dataset_path + ".index.npy"
+        self.offsets = self._load_index()
+        if self.offsets is None:
+            self.offsets = self._build_index()
+            if save_index:
+                stat = os.stat(self.dataset_path)
+                np.save(self.index_path, np.array([stat.st_size, stat.st_mtime_ns] + self.offsets, dtype=np.int64))
+        self.rows_in_file = len(self.offsets)
+        super().__init__([x for x in range(1, self.rows_in_file)])
+        self.columns = columns_from_header(self._read_row(0))
+        self.col_map = {x.col_idx: x for x in self.columns}
+        self.entry_counter = 0
+
+    def _load_index(self) -> Union[List[int], None]:
+        if not os.path.exists(self.index_path):
+            return None
+        values = np.load(self.index_path).tolist()
+        stat = os.stat(self.dataset_path)
+        # index is outdated if the file changed
+        if len(values) < 2 or values[0] != stat.st_size or values[1] != stat.st_mtime_ns:
+            return None
+        return values[2:]
+
+    def _build_index(self) -> List[int]:
+        offsets = []
+        with open(self.dataset_path, "rb") as file:
+            datareader = csv.reader(_read_lines(file), delimiter=',', quotechar='"')
+            row_start = 0
+            for _ in datareader:
+                offsets.append(row_start)
+                # lines are only read until the row is complete, so the current position is the start of the next row
+                row_start = file.tell()
+        return offsets
+
+    def _read_row(self, idx: int) -> List[str]:
+        with open(self.dataset_path, "rb") as file:
+            file.seek(self.offsets[idx])
+            return next(csv.reader(_read_lines(file), delimiter=',', quotechar='"'))
+
+    def get_columns(self) -> List[DatasetColumn]:
+        return self.columns
+
+    def shuffle(self, seed: Optional[int] = None):
+        # rows are returned in a random order (until indices are reassigned)
+        rng = np.random.default_rng(seed)
+        self.indices = [self.indices[x] for x in rng.permutation(len(self.indices))]
+
+    def shard(self, num_shards: int, shard_index: int):
+        # keeps only every num_shards-th row, e.g. to split the dataset between workers
+        if not 0 <= shard_index < num_shards:
+            raise Exception("invalid shard index")
+        self.indices = self.indices[shard_index::num_shards]
+        self.total_rows = len(self.indices)
+
+    def row_generator(self) -> Generator[Tuple[DatasetRow, int], None, None]:
+
+        with open(self.dataset_path, "rb") as file:
+            datareader = csv.reader(_read_lines(file), delimiter=',', quotechar='"')
+            next_index = None
+            for idx in self.indices:
+                # consecutive rows are read without seeking
+                if idx != next_index:
+                    file.seek(self.offsets[idx])
+                row = next(datareader)
+                next_index = idx + 1
+
+                if not is_complete_row(row, self.columns):
+                    logger.warning(f"incomplete row {idx} skipped: {self.dataset_path}")
+                    continue
+
+                dr = row_from_csv(row, self.columns)
+
+                if self.preprocessing_fun is not None:
+                    dr = self.preprocessing_fun(dr)
+
+                self.entry_counter += 1
+
+                yield dr, idx
+
+
+class ParquetDiskReader(DatasetReader):
+    """
+    Reads datasets written by the ParquetDiskWriter. If column names are given, only these feature/truth columns are read from the file (besides the identifiers).
+    Indices follow the same convention as the csv readers: rows start at 1.
+    """
+
+    base_columns = ["source_identifier", "template_id", "element_identifier"]
+
+    def __init__(self, dataset_path: str, columns: Optional[List[str]] = None, batch_size: int = 1000):
+        self.dataset_path = dataset_path
+        self.batch_size = batch_size
+        parquet_file = pq.ParquetFile(dataset_path)
+        self.rows_in_file = parquet_file.metadata.num_rows + 1
+        super().__init__([x for x in range(1, self.rows_in_file)])
+        all_columns = columns_from_header(parquet_file.schema_arrow.names)
+        self.columns = all_columns if columns is None else [x for x in all_columns if x.col_name in columns]
+        self.col_map = {x.col_idx: x for x in self.columns}
+        self.file_columns = self.base_columns + [(FEATURE_PREFIX if x.is_feature else TRUTH_PREFIX) + "_" + x.col_name for x in self.columns]
+        self.entry_counter = 0
+
+    def get_columns(self) -> List[DatasetColumn]:
+        return self.columns
+
+    def row_generator(self) -> Generator[Tuple[DatasetRow, int], None, None]:
+
+        parquet_file = pq.ParquetFile(self.dataset_path)
+        index_pos = 0
+        row_offset = 1
+        for batch in parquet_file.iter_batches(batch_size=self.batch_size, columns=self.file_columns):
+            if index_pos >= self.total_rows:
+                break
+            values = batch.to_pydict()
+            # rows of this batch that are part of the indices
+            while index_pos < self.total_rows and self.indices[index_pos] < row_offset + batch.num_rows:
+                idx = self.indices[index_pos]
+                index_pos += 1
+                k = idx - row_offset
+                if k < 0:
+                    continue
+
+                features = {}
+                truth_values = {}
+                for col, file_col in zip(self.columns, self.file_columns[len(self.base_columns):]):
+                    if col.is_feature:
+                        features[col.col_name] = values[file_col][k]
+                    else:
+                        truth_values[col.col_name] = values[file_col][k]
+
+                dr = DatasetRow(values["source_identifier"][k], values["template_id"][k], values["element_identifier"][k], features)
+                dr.assign_truth_values(truth_values)
+
+                if self.preprocessing_fun is not None:
+                    dr = self.preprocessing_fun(dr)
+
+                self.entry_counter += 1
+
+                yield dr, idx
+            row_offset += batch.num_rows
@@ -6,6 +6,9 @@ import uuid
 import pickle
 from shutil import rmtree
 
+import pyarrow as pa
+import pyarrow.parquet as pq
+
 from parsee.datasets.dataset_dataclasses import BaseDatasetRow, Transformation, ColumnSettings
 from parsee.datasets.writers.interfaces import DatasetWriter, ModelWriter
 
@@ -50,6 +53,8 @@ class CsvDiskWriter(DatasetWriter):
 
         self.writer[dataset].writerows([x.to_list() for k, x in enumerate(dataset_rows)])
         self.rows_written[dataset] += len(dataset_rows)
+        # written rows are not lost if the process is killed (e.g. files used to resume an evaluation)
+        self.file[dataset].flush()
 
     def finish_writing(self):
         # close files
@@ -59,3 +64,72 @@ class CsvDiskWriter(DatasetWriter):
     def delete_all_files(self):
         shutil.rmtree(self.write_location)
 
+
+class ParquetDiskWriter(DatasetWriter):
+    """
+    Writes datasets as compressed parquet files (one per dataset), all values are stored as strings like in the csv files.
+    Rows are buffered and written in row groups, files can only be read after finish_writing was called.
+    """
+
+    def __init__(self, write_location: str, create_sub_dir: bool = True, compression: str = "zstd", row_group_size: int = 1000):
+
+        # create folder
+        folder_name = "dataset_"+str(uuid.uuid4())
+        final_path = os.path.join(write_location, folder_name) if create_sub_dir else write_location
+        if not os.path.exists(final_path):
+            os.mkdir(final_path)
+        self.base_location = write_location
+        self.write_location = final_path
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.writer = {}
+        self.schema = {}
+        self.buffer = {}
+        self.rows_written = {}
+        self.full_paths = {}
+
+    def file_name(self, dataset_name: str):
+        return dataset_name+".parquet"
+
+    def create_dataset_file(self, dataset: str, column_names: List[str]):
+
+        full_file_path = os.path.join(self.write_location, self.file_name(dataset))
+        self.full_paths[dataset] = full_file_path
+        self.schema[dataset] = pa.schema([(x, pa.string()) for x in column_names])
+        self.writer[dataset] = pq.ParquetWriter(full_file_path, self.schema[dataset], compression=self.compression)
+        self.buffer[dataset] = []
+        self.rows_written[dataset] = 0
+
+    def _flush(self, dataset: str):
+
+        rows = self.buffer[dataset]
+        if len(rows) == 0:
+            return
+        columns = list(zip(*rows))
+        self.writer[dataset].write_table(pa.Table.from_arrays([pa.array(x, pa.string()) for x in columns], schema=self.schema[dataset]))
+        self.rows_written[dataset] += len(rows)
+        self.buffer[dataset] = []
+
+    def _write_rows(self, dataset_rows: List[BaseDatasetRow], dataset: str):
+
+        if len(dataset_rows) == 0:
+            return
+
+        if dataset not in self.writer:
+            self.create_dataset_file(dataset, dataset_rows[0].column_names())
+
+        if dataset_rows[0].column_names() != self.schema[dataset].names:
+            raise Exception("columns of rows don't match the columns of the dataset")
+
+        self.buffer[dataset] += [[str(v) for v in x.to_list()] for x in dataset_rows]
+        if len(self.buffer[dataset]) >= self.row_group_size:
+            self._flush(dataset)
+
+    def finish_writing(self):
+        # write remaining rows and close files
+        for dataset, writer in self.writer.items():
+            self._flush(dataset)
+            writer.close()
+
+    def delete_all_files(self):
+        shutil.rmtree(self.write_location)
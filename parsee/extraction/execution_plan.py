@@ -0,0 +1,70 @@
+from typing import *
+
+from parsee.templates.job_template import JobTemplate
+from parsee.extraction.extractor_elements import StandardDocumentFormat, FinalOutputTableColumn
+from parsee.extraction.extractor_dataclasses import ParseeAnswer, ParseeBucket
+from parsee.extraction.final_structuring import get_structured_tables_from_locations, final_tables_from_columns
+from parsee.extraction.models.model_loader import element_models_from_schema, meta_models_from_items, question_models_from_schema, mapping_models_from_schema, ModelLoader
+from parsee.utils.instrumentation import stage
+from parsee.storage.expense_ledger import expense_context
+
+
+class ExecutionPlan:
+    """
+    Models (grouped by items) and lookups of a template, created once and then run for any number of documents.
+    The models are shared by all runs, so that their caches (e.g. the static parts of the prompts) are reused.
+    """
+
+    def __init__(self, job_template: JobTemplate, model_loader: ModelLoader, params: Optional[Dict[str, Any]] = None):
+        self.template = job_template
+        # add manual answers to params
+        self.params = {**(params if params is not None else {}), **job_template.detection.settings, **job_template.questions.settings}
+
+        self.question_models = question_models_from_schema(job_template.questions, job_template.meta, model_loader, self.params)
+        self.element_models = element_models_from_schema(job_template.detection, model_loader, self.params)
+
+        all_meta_ids = set(meta_id for item in job_template.detection.items for meta_id in item.metaInfoIds)
+        self.meta_ids_by_main_class: Dict[str, Set[str]] = {item.id: set(item.metaInfoIds) for item in job_template.detection.items}
+        self.meta_models = meta_models_from_items([x for x in job_template.meta if x.id in all_meta_ids], model_loader, self.params) if len(all_meta_ids) > 0 else []
+
+        self.mapping_models = mapping_models_from_schema(job_template.detection, model_loader, self.params)
+
+    def run(self, doc: StandardDocumentFormat) -> Tuple[List[ParseeBucket], List[FinalOutputTableColumn], List[ParseeAnswer]]:
+        # expenses are grouped by document and template in the expense ledger of the storage
+        with stage("structure_data", source_identifier=doc.source_identifier, template_id=self.template.id, num_elements=len(doc.elements)), expense_context(doc.source_identifier, self.template.id):
+            return self._run(doc)
+
+    def _run(self, doc: StandardDocumentFormat) -> Tuple[List[ParseeBucket], List[FinalOutputTableColumn], List[ParseeAnswer]]:
+
+        answers: List[ParseeAnswer] = []
+        with stage("questions", source_identifier=doc.source_identifier):
+            for question_model in self.question_models:
+                answers += question_model.predict_answers(doc)
+
+        locations = []
+        with stage("element_detection", source_identifier=doc.source_identifier):
+            for model_loc in self.element_models:
+                locations += model_loc.classify_elements(doc)
+
+        with stage("table_structuring", source_identifier=doc.source_identifier):
+            output_values = get_structured_tables_from_locations(self.template, doc, locations)
+
+        # add meta values
+        if len(self.meta_models) > 0:
+            with stage("meta", source_identifier=doc.source_identifier):
+                for meta_model in self.meta_models:
+                    meta_predictions_list = meta_model.predict_meta(output_values, doc.elements)
+                    for k, meta_predictions in enumerate(meta_predictions_list):
+                        meta_ids = self.meta_ids_by_main_class[output_values[k].detected_class]
+                        output_values[k].meta += [x for x in meta_predictions if x.class_id in meta_ids]
+
+        # run mapping
+        all_mappings: List[ParseeBucket] = []
+        tables = final_tables_from_columns(output_values)
+        with stage("mapping", source_identifier=doc.source_identifier):
+            for model_mapping in self.mapping_models:
+                for table in tables:
+                    mappings, mapping_schema = model_mapping.classify_elements(table)
+                    all_mappings += mappings
+
+        return all_mappings, output_values, answers
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import numpy as np
 import re
-from typing import List, Union, Tuple, Dict, Optional, Set
+from typing import List, Union, Tuple, Dict, Optional, Set, Callable
 from decimal import Decimal
 from dataclasses import dataclass
 from hashlib import sha256
@@ -32,9 +32,6 @@ def get_text_distance(el_idx1: int, el_idx2: int, elements: List[ExtractedEl], e
 class FinalOutputTableColumn:
     detected_class: str
     col_idx: int
-    li_identifier: Union[str, None]
-    kv_identifier: str
-    key_value_pairs: List[Tuple[str, any]]
     sources: List[ExtractedSource]
     meta: List[ParseeMeta]
     model: str
@@ -43,12 +40,14 @@ class FinalOutputTableColumn:
     def __init__(self, location: ParseeLocation, element: StructuredTable, col_idx: int, col_idx_local: int, col_idx_org: int):
         self.col_idx = col_idx
         self.detected_class = location.detected_class
-        self.key_value_pairs = []
+        self._key_value_pairs = []
         self.sources = []
         self.meta = []
         self.model = location.model
-        self.li_identifier = None
-        self.set_identifiers()
+        # identifiers are only computed when they are read and the key value pairs changed in the meantime
+        self._kv_identifier = None
+        self._li_identifier = None
+        self._identifiers_dirty = True
         self.locations = [location]
         self._elements = [element]
         self._local_col_indices = [col_idx_local]
@@ -61,39 +60,65 @@ class FinalOutputTableColumn:
     def __repr__(self):
         return str(self)
 
+    @property
+    def key_value_pairs(self) -> List[Tuple[str, any]]:
+        return self._key_value_pairs
+
+    @key_value_pairs.setter
+    def key_value_pairs(self, key_value_pairs: List[Tuple[str, any]]):
+        self._key_value_pairs = key_value_pairs
+        self._identifiers_dirty = True
+
+    @property
+    def kv_identifier(self) -> str:
+        if self._identifiers_dirty:
+            self.set_identifiers()
+        return self._kv_identifier
+
+    @property
+    def li_identifier(self) -> str:
+        if self._identifiers_dirty:
+            self.set_identifiers()
+        return self._li_identifier
+
     def key_value_pairs_json(self):
-        return [{str(key): (str(value) if value is not None else None)} for key, value in self.key_value_pairs]
+        return [{str(key): (str(value) if value is not None else None)} for key, value in self._key_value_pairs]
 
     def set_identifiers(self):
-        self.kv_identifier = sha256(str(self.key_value_pairs_json()).encode('utf-8')).hexdigest()
-        self.li_identifier = sha256(str(get_table_signature(self.key_value_pairs)).encode('utf-8')).hexdigest()
+        self._kv_identifier = sha256(str(self.key_value_pairs_json()).encode('utf-8')).hexdigest()
+        self._li_identifier = sha256(str(get_table_signature(self._key_value_pairs)).encode('utf-8')).hexdigest()
+        self._identifiers_dirty = False
 
     def dict_json(self):
         return {"class_id": self.detected_class, "li_identifier": self.li_identifier, "col_idx": self.col_idx, "meta": [x.to_json_dict() for x in self.meta], "values": self.key_value_pairs_json(), "sources": [x.to_json_dict() for x in self.sources]}
 
+    def _kv_pairs_for_location(self, k: int) -> List[Tuple[str, any]]:
+        el = self._elements[k]
+        return [(x.clean_caption(), x.value_elements[self._local_col_indices[k]].numeric_value_cleaned) for x in el.line_items]
+
     def build(self):
         # build values
         kv_pairs = []
         sources = []
         for k, loc in enumerate(self.locations):
-            el = self._elements[k]
-            kv_pairs += [(x.clean_caption(), x.value_elements[self._local_col_indices[k]].numeric_value_cleaned) for li_idx, x in enumerate(el.line_items)]
+            kv_pairs += self._kv_pairs_for_location(k)
             sources.append(loc.source)
         self.key_value_pairs = kv_pairs
         self.sources = sources
-        self.set_identifiers()
 
     def add_empty_line_items(self, insert_idx: int, line_items: List[str]):
-        new_kv = self.key_value_pairs[0:insert_idx]+[(x, None) for x in line_items]+self.key_value_pairs[insert_idx:]
-        self.key_value_pairs = new_kv
-        self.set_identifiers()
+        self._key_value_pairs[insert_idx:insert_idx] = [(x, None) for x in line_items]
+        self._identifiers_dirty = True
 
     def add_location(self, location: ParseeLocation, element: StructuredTable, local_col_idx: int, org_col_idx: int):
         self.locations.append(location)
         self._elements.append(element)
         self._local_col_indices.append(local_col_idx)
         self.org_col_indices.append(org_col_idx)
-        self.build()
+        # only the values of the new location have to be appended, the existing ones are unchanged
+        self._key_value_pairs += self._kv_pairs_for_location(len(self.locations) - 1)
+        self.sources.append(location.source)
+        self._identifiers_dirty = True
 
     def can_be_merged(self, col: FinalOutputTableColumn) -> bool:
         if len(col.key_value_pairs) != len(self.key_value_pairs) or col.li_identifier != self.li_identifier:
@@ -106,10 +131,10 @@ class FinalOutputTableColumn:
 
     def merge_kv(self, col: FinalOutputTableColumn):
         # merges key value pairs with key value pairs of other column
-        for k, (li, val) in enumerate(self.key_value_pairs):
+        for k, (li, val) in enumerate(self._key_value_pairs):
             if val is None:
-                self.key_value_pairs[k] = (li, col.key_value_pairs[k][1])
-        self.set_identifiers()
+                self._key_value_pairs[k] = (li, col.key_value_pairs[k][1])
+        self._identifiers_dirty = True
 
 
 class FinalOutputTable:
@@ -493,6 +518,8 @@ class StructuredTable(ExtractedEl):
     def __init__(self, source: ExtractedSource, rows: List[StructuredRow]):
         super().__init__(ElementType.TABLE, source)
         self.rows = rows
+        self._render_cache = {}
+        self._render_cache_rows = None
 
         self.finalise_table()
 
@@ -502,7 +529,24 @@ class StructuredTable(ExtractedEl):
     def to_json_dict(self):
         return {**super().to_json_dict(), "rows": [x.to_json_dict() for x in self.rows]}
 
+    def reset_render_cache(self):
+        self._render_cache = {}
+        self._render_cache_rows = None
+
+    def _cached_render(self, key: Tuple, render_fun: Callable[[], str]) -> str:
+        # rendered texts are kept until the rows are replaced or rows are added/removed, other changes have to call reset_render_cache
+        rows_signature = (id(self.rows), len(self.rows))
+        if self._render_cache_rows != rows_signature:
+            self._render_cache = {}
+            self._render_cache_rows = rows_signature
+        if key not in self._render_cache:
+            self._render_cache[key] = render_fun()
+        return self._render_cache[key]
+
     def get_text(self, insert_li_break_text=None):
+        return self._cached_render(("text", insert_li_break_text), lambda: self._render_text(insert_li_break_text))
+
+    def _render_text(self, insert_li_break_text=None):
         text_pieces = []
 
         for row in self.rows:
@@ -514,6 +558,9 @@ class StructuredTable(ExtractedEl):
         return " ".join(text_pieces)
 
     def get_text_llm(self, contain_numbers: bool) -> str:
+        return self._cached_render(("llm", contain_numbers), lambda: self._render_text_llm(contain_numbers))
+
+    def _render_text_llm(self, contain_numbers: bool) -> str:
         text_pieces = []
 
         for row_idx, row in enumerate(self.rows):
@@ -728,6 +775,8 @@ class StructuredTable(ExtractedEl):
                 elif row_index not in self.numeric_rows_indices:
                     self.other_rows.append(self.rows[row_index])
 
+        self.reset_render_cache()
+
 
 @dataclass
 class StandardDocumentFormat:
@@ -746,10 +795,7 @@ class StandardDocumentFormat:
         return str(self)
 
     def to_string(self, show_chunk_index: bool):
-        output = ""
-        for el in self.elements:
-            output += (f"[chunk {el.source.element_index}] " if show_chunk_index else "") + el.get_text_llm(True) + "\n"
-        return output
+        return "".join([(f"[chunk {el.source.element_index}] " if show_chunk_index else "") + el.get_text_llm(True) + "\n" for el in self.elements])
 
 
 @dataclass
@@ -42,3 +42,10 @@ def mistral_api_config(mistral_api_key: str, model_name: str, token_limit: Optio
 def google_config(model_name: str, project_name: str, location_name: str, token_limit: Optional[int] = None, multimodal: bool = False, max_images: int = 5, max_image_size: int = 2000, output_token_limit: Optional[int] = None, system_message: Optional[str] = None):
     token_limit = NUM_TOKENS_DEFAULT_LLM if token_limit is None else token_limit
     return MlModelSpecification(f"Google model: {model_name}", model_name, model_name, ModelType.GOOGLE, f"{project_name}__{location_name}", None, None, None, token_limit, None, None, None, None, None, None, multimodal, max_images, max_image_size, output_token_limit, system_message, None)
+
+
+def mock_config(model_name: str = "mock", token_limit: Optional[int] = None, latency_mean: float = 0, latency_std: float = 0, rate_limit_probability: float = 0, quota_per_minute: Optional[int] = None, answers: Optional[Dict[str, str]] = None, seed: int = 0, price_per_1k_tokens: Optional[Decimal] = None, price_per_1k_output_tokens: Optional[Decimal] = None, output_token_limit: Optional[int] = None) -> MlModelSpecification:
+    # local model with deterministic answers and simulated latencies/rate limits, for load tests without API keys
+    token_limit = NUM_TOKENS_DEFAULT_LLM if token_limit is None else token_limit
+    settings = {"latency_mean": latency_mean, "latency_std": latency_std, "rate_limit_probability": rate_limit_probability, "quota_per_minute": quota_per_minute, "answers": answers if answers is not None else {}, "seed": seed}
+    return MlModelSpecification(f"Mock model: {model_name}", model_name, model_name, ModelType.MOCK, None, price_per_1k_tokens, price_per_1k_output_tokens, None, token_limit, None, None, None, None, None, None, False, None, None, output_token_limit, None, None, settings=settings)
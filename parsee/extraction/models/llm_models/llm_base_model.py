@@ -1,11 +1,14 @@
 from decimal import Decimal
 from typing import *
 import logging
+import threading
 
 from tiktoken.core import Encoding
 
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
+from parsee.extraction.models.llm_models.rate_limiter import RateLimiter, get_rate_limiter, status_code
+from parsee.utils.instrumentation import stage, is_enabled
 
 
 logger = logging.getLogger(__name__)
@@ -16,6 +19,13 @@ def get_tokens_encoded(prompt: str, encoding: Encoding) -> List[int]:
 
 
 def truncate_prompt(prompt: Prompt, encoding: Encoding, max_tokens: int) -> Tuple[str, int]:
+    with stage("tokenization") as attributes:
+        final_prompt, num_tokens = _truncate_prompt(prompt, encoding, max_tokens)
+        attributes["input_tokens"] = num_tokens
+    return final_prompt, num_tokens
+
+
+def _truncate_prompt(prompt: Prompt, encoding: Encoding, max_tokens: int) -> Tuple[str, int]:
     tokens_history = get_tokens_encoded(prompt.history, encoding)
     tokens_instructions = get_tokens_encoded(prompt.instructions(), encoding)
     tokens_data = get_tokens_encoded(prompt.available_data_string(), encoding)
@@ -37,16 +47,60 @@ def truncate_prompt(prompt: Prompt, encoding: Encoding, max_tokens: int) -> Tupl
         return str(prompt), num_tokens
 
 
+def pop_request_tokens(model: Any) -> Union[int, None]:
+    # tokens (input and output) of the last request made by the current thread, None if the answer came from the cache
+    usage = getattr(model, "_usage", None)
+    tokens = getattr(usage, "tokens", None)
+    if usage is not None:
+        usage.tokens = None
+    return tokens
+
+
+def make_prompt_request_with_tokens(model: Any, prompt: Prompt) -> Tuple[str, Decimal, Union[int, None]]:
+    """
+    answer and cost of the prompt and the tokens of the request (None if the answer came from the cache).
+    The tokens are taken from the usage of the current thread, so cache hits are counted correctly also if other threads use the same model.
+    """
+    pop_request_tokens(model)
+    answer, amount = model.make_prompt_request(prompt)
+    return answer, amount, pop_request_tokens(model)
+
+
 class LLMBaseModel:
 
     spec: MlModelSpecification
+    rate_limiter: RateLimiter
 
     def __init__(self, spec: MlModelSpecification):
         self.spec = spec
+        self.rate_limiter = get_rate_limiter(spec)
+        self._usage = threading.local()
 
     def make_prompt_request(self, prompt: Prompt) -> Tuple[str, Decimal]:
         raise NotImplementedError
 
+    def is_rate_limit_error(self, exception: BaseException) -> bool:
+        return status_code(exception) == 429
+
+    def _request(self, num_tokens_input: int, call: Callable, *args) -> Any:
+        # waits for the rate limits of the model (the answer can have up to max_tokens_answer tokens) and times the API call,
+        # retries of the call acquire the same amount again (see report_rate_limit)
+        tokens_reserved = num_tokens_input + getattr(self, "max_tokens_answer", 0)
+        self._usage.tokens_reserved = tokens_reserved
+        self.rate_limiter.acquire(tokens_reserved)
+        with stage("llm_request", model=self.spec.model_id, input_tokens=num_tokens_input) as attributes:
+            result = call(*args)
+            answer = result[0] if isinstance(result, tuple) else result
+            num_tokens_output = len(get_tokens_encoded(answer, self.encoding)) if hasattr(self, "encoding") and isinstance(answer, str) else None
+            if num_tokens_output is not None:
+                # the part of the answer budget that was not used is available for other requests
+                self.rate_limiter.release(tokens_reserved - num_tokens_input - num_tokens_output)
+            self._usage.tokens = num_tokens_input + (num_tokens_output if num_tokens_output is not None else 0)
+            attributes["output_tokens"] = num_tokens_output
+            if isinstance(result, tuple) and isinstance(result[1], Decimal):
+                attributes["cost"] = float(result[1])
+        return result
+
     def __hash__(self):
         return hash(self.spec)
 
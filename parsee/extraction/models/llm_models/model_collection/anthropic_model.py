@@ -9,6 +9,7 @@ from anthropic import RateLimitError
 from tenacity import retry, wait_random_exponential, retry_if_exception_type, stop_after_attempt, after_log
 
 from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, truncate_prompt
+from parsee.extraction.models.llm_models.rate_limiter import report_rate_limit
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.extraction.extractor_dataclasses import Base64Image
@@ -32,6 +33,7 @@ class AnthropicModel(LLMBaseModel):
            wait=wait_random_exponential(multiplier=chat_settings.retry_wait_multiplier,
                                  min=chat_settings.retry_wait_min,
                                  max=chat_settings.retry_wait_max),
+           before_sleep=report_rate_limit,
            after=after_log(logger, logging.DEBUG))
     def _call_api(self, prompt: str, images: List[Base64Image]) -> Tuple[str, Decimal]:
         user_message_content = [
@@ -72,5 +74,5 @@ class AnthropicModel(LLMBaseModel):
 
     @lru_cache(maxsize=chat_settings.max_cache_size)
     def make_prompt_request(self, prompt: Prompt) -> Tuple[str, Decimal]:
-        final_prompt, _ = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
-        return self._call_api(final_prompt, prompt.available_data if self.spec.multimodal else [])
+        final_prompt, num_tokens_input = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
+        return self._request(num_tokens_input, self._call_api, final_prompt, prompt.available_data if self.spec.multimodal else [])
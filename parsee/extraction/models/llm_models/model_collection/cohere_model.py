@@ -8,6 +8,7 @@ from cohere import TooManyRequestsError
 from tenacity import retry, stop_after_attempt, retry_if_exception_type, wait_random_exponential, after_log
 
 from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, truncate_prompt
+from parsee.extraction.models.llm_models.rate_limiter import report_rate_limit
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.extraction.extractor_dataclasses import Base64Image
@@ -32,6 +33,7 @@ class CohereModel(LLMBaseModel):
            wait=wait_random_exponential(multiplier=chat_settings.retry_wait_multiplier,
                                  min=chat_settings.retry_wait_min,
                                  max=chat_settings.retry_wait_max),
+           before_sleep=report_rate_limit,
            after=after_log(logger, logging.DEBUG))
     def _call_api(self, prompt: str, images: List[Base64Image]) -> Tuple[str, Decimal]:
         response = self.client.chat(
@@ -53,5 +55,5 @@ class CohereModel(LLMBaseModel):
 
     @lru_cache(maxsize=chat_settings.max_cache_size)
     def make_prompt_request(self, prompt: Prompt) -> Tuple[str, Decimal]:
-        final_prompt, _ = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
-        return self._call_api(final_prompt, prompt.available_data if self.spec.multimodal else [])
+        final_prompt, num_tokens_input = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
+        return self._request(num_tokens_input, self._call_api, final_prompt, prompt.available_data if self.spec.multimodal else [])
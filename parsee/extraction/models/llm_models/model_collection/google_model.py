@@ -11,6 +11,7 @@ import tiktoken
 from tenacity import retry, stop_after_attempt, retry_if_exception_type, wait_random_exponential, after_log
 
 from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, truncate_prompt
+from parsee.extraction.models.llm_models.rate_limiter import report_rate_limit
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.extraction.extractor_dataclasses import Base64Image
@@ -44,6 +45,7 @@ class GoogleModel(LLMBaseModel):
             min=chat_settings.retry_wait_min,
             max=chat_settings.retry_wait_max
         ),
+        before_sleep=report_rate_limit,
         after=after_log(logger, logging.DEBUG)
     )
     def _call_api(self, prompt: str, images: list) -> tuple[str, Decimal]:
@@ -109,5 +111,5 @@ class GoogleModel(LLMBaseModel):
 
     @lru_cache(maxsize=chat_settings.max_cache_size)
     def make_prompt_request(self, prompt: Prompt) -> tuple[str, Decimal]:
-        final_prompt, _ = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
-        return self._call_api(final_prompt, prompt.available_data if self.spec.multimodal else [])
+        final_prompt, num_tokens_input = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
+        return self._request(num_tokens_input, self._call_api, final_prompt, prompt.available_data if self.spec.multimodal else [])
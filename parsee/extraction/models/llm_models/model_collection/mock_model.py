@@ -0,0 +1,156 @@
+import re
+import json
+import time
+import random
+import hashlib
+from types import SimpleNamespace
+from functools import lru_cache
+from collections import deque
+from threading import Lock
+from typing import *
+from decimal import Decimal
+
+import tiktoken
+from tenacity import retry, stop_after_attempt, retry_if_exception_type, wait_random_exponential, after_log
+
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, truncate_prompt, get_tokens_encoded
+from parsee.extraction.models.llm_models.rate_limiter import report_rate_limit
+from parsee.extraction.models.model_dataclasses import MlModelSpecification
+from parsee.extraction.models.llm_models.prompts import Prompt
+from parsee.settings import chat_settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MockRateLimitError(Exception):
+
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit exceeded (mock)")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": str(retry_after)})
+
+
+class MockModel(LLMBaseModel):
+    """
+    Local stand-in for the LLM providers, used for load tests and benchmarks without API keys.
+    Answers are deterministic: they are either configured (first entry of 'answers' whose key is contained in the prompt) or derived from the example
+    answer of the prompt, so that they can be parsed by the models of all tasks. Latencies are sampled with a seed derived from the prompt.
+
+    Settings (spec.settings): latency_mean, latency_std (seconds), rate_limit_probability, quota_per_minute (requests, 429 errors are injected above this rate), seed, answers.
+    """
+
+    max_tracked_prompts = 10000
+
+    def __init__(self, model: MlModelSpecification):
+        super().__init__(model)
+        settings = model.settings if model.settings is not None else {}
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.max_tokens_answer = 1024 if model.max_output_tokens is None else model.max_output_tokens
+        self.max_tokens_question = self.spec.max_tokens - self.max_tokens_answer
+        self.latency_mean = settings.get("latency_mean", 0.0)
+        self.latency_std = settings.get("latency_std", 0.0)
+        self.rate_limit_probability = settings.get("rate_limit_probability", 0.0)
+        self.quota_per_minute = settings.get("quota_per_minute")
+        self.seed = settings.get("seed", 0)
+        self.answers = settings.get("answers", {})
+        self._attempts: Dict[str, int] = {}
+        self._request_times = deque()
+        self._lock = Lock()
+
+    def _random(self, prompt: str, attempt: int) -> random.Random:
+        return random.Random(f"{self.seed}-{attempt}-{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}")
+
+    def _check_rate_limit(self, prompt: str):
+        # attempts are counted by the hash of the prompt until its request gets through, prompts that ran out of retries are dropped if there are too many
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.pop(key, 0)
+            while len(self._attempts) >= self.max_tracked_prompts:
+                del self._attempts[next(iter(self._attempts))]
+            self._attempts[key] = attempt + 1
+            if self.quota_per_minute is not None:
+                now = time.monotonic()
+                while len(self._request_times) > 0 and self._request_times[0] < now - 60:
+                    self._request_times.popleft()
+                if len(self._request_times) >= self.quota_per_minute:
+                    raise MockRateLimitError(60 - (now - self._request_times[0]))
+                self._request_times.append(now)
+        if self.rate_limit_probability > 0 and self._random(prompt, attempt).random() < self.rate_limit_probability:
+            raise MockRateLimitError(0)
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def canned_answer(self, prompt: Prompt) -> str:
+        prompt_str = str(prompt)
+        for key, answer in self.answers.items():
+            if key in prompt_str:
+                return answer
+        return answer_from_example(prompt)
+
+    @retry(stop=stop_after_attempt(chat_settings.retry_attempts),
+           retry=retry_if_exception_type(MockRateLimitError),
+           wait=wait_random_exponential(multiplier=chat_settings.retry_wait_multiplier,
+                                 min=chat_settings.retry_wait_min,
+                                 max=chat_settings.retry_wait_max),
+           before_sleep=report_rate_limit,
+           after=after_log(logger, logging.DEBUG))
+    def _call_api(self, final_prompt: str, prompt: Prompt) -> Tuple[str, Decimal]:
+        self._check_rate_limit(final_prompt)
+        latency = max(self._random(final_prompt, -1).gauss(self.latency_mean, self.latency_std), 0) if self.latency_std > 0 else self.latency_mean
+        if latency > 0:
+            time.sleep(latency)
+        answer = self.canned_answer(prompt)
+        cost_input = (len(get_tokens_encoded(final_prompt, self.encoding)) * Decimal(self.spec.price_per_1k_tokens / 1000)) if self.spec.price_per_1k_tokens is not None else Decimal(0)
+        cost_output = (len(get_tokens_encoded(answer, self.encoding)) * Decimal(self.spec.price_per_1k_output_tokens / 1000)) if self.spec.price_per_1k_output_tokens is not None else Decimal(0)
+        return answer, cost_input + cost_output
+
+    @lru_cache(maxsize=chat_settings.max_cache_size)
+    def make_prompt_request(self, prompt: Prompt) -> Tuple[str, Decimal]:
+        final_prompt, num_tokens_input = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
+        return self._request(num_tokens_input, self._call_api, final_prompt, prompt)
+
+
+def _first_json(text: str) -> Union[Any, None]:
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"[{\[]", text):
+        try:
+            value, _ = decoder.raw_decode(text[match.start():])
+            return value
+        except ValueError:
+            continue
+    return None
+
+
+def answer_from_example(prompt: Prompt) -> str:
+    """
+    answers in the format of the example of the prompt, with the element indices taken from the available data
+    """
+    example = prompt.full_example
+    data = prompt.available_data_string()
+    if "For example your answer could look like this:" in example:
+        # general questions: JSON with the main question (and meta items), sources are replaced with fragments of the actual data
+        answer = _first_json(example.split("For example your answer could look like this:")[1])
+        fragments = [int(x) for x in re.findall(r"\[(\d+)\]:", data)]
+        if isinstance(answer, dict) and "sources" in answer:
+            answer["sources"] = fragments[0:1]
+        return json.dumps(answer)
+    elif example.startswith("Your response could be for example:"):
+        # element detection: JSON array of element indices
+        indices = re.findall(r"^\[(\d+)\]", data, re.MULTILINE)
+        return f"[{indices[0]}]" if len(indices) > 0 else "[]"
+    elif example.startswith("Your answer could be for example:"):
+        # meta info: numbered values, for table prompts one block per column
+        values = example.split("\n", 1)[1]
+        if "[column " in values:
+            values = values.split("]\n", 1)[1]
+            columns = re.findall(r"Column index (\d+):", prompt.main_task + prompt.additional_info + data)
+            return "\n".join(f"[column {col_idx}]\n{values}" for col_idx in columns)
+        return values
+    elif "a valid output would be:" in example and "The actual table with line items to be classified is the following:" in data:
+        # mappings: all line items are put into the first of the actual buckets
+        buckets_str, table_str = data.split("The actual available buckets are the following:")[1].split("The actual table with line items to be classified is the following:")
+        bucket_ids = [line.split(":")[0].strip() for line in buckets_str.strip().split("\n") if ":" in line]
+        line_items = [f"LI{x}" for x in re.findall(r'"LI(\d+):', table_str)]
+        return json.dumps({bucket_id: (line_items if k == 0 else []) for k, bucket_id in enumerate(bucket_ids)})
+    return "mock answer"
@@ -8,6 +8,7 @@ from replicate.exceptions import ReplicateError
 from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception, after_log
 
 from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, get_tokens_encoded, truncate_prompt
+from parsee.extraction.models.llm_models.rate_limiter import report_rate_limit
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.settings import chat_settings
@@ -16,6 +17,10 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _is_throttled(exception: BaseException) -> bool:
+    return isinstance(exception, ReplicateError) and len(exception.args) > 0 and "Request was throttled." in exception.args[0]
+
+
 class ReplicateModel(LLMBaseModel):
 
     def __init__(self, model: MlModelSpecification):
@@ -25,12 +30,16 @@ class ReplicateModel(LLMBaseModel):
         self.max_tokens_answer = 1024 if model.max_output_tokens is None else model.max_output_tokens
         self.max_tokens_question = self.spec.max_tokens - self.max_tokens_answer
 
+    def is_rate_limit_error(self, exception: BaseException) -> bool:
+        # throttling errors of replicate don't have a status code
+        return _is_throttled(exception)
+
     @retry(stop=stop_after_attempt(chat_settings.retry_attempts),
-           retry=retry_if_exception(lambda x: isinstance(x, ReplicateError) and len(x.args) > 0 and
-                                              "Request was throttled." in x.args[0]),
+           retry=retry_if_exception(lambda x: _is_throttled(x)),
            wait=wait_random_exponential(multiplier=chat_settings.retry_wait_multiplier,
                                  min=chat_settings.retry_wait_min,
                                  max=chat_settings.retry_wait_max),
+           before_sleep=report_rate_limit,
            after=after_log(logger, logging.DEBUG) )
     def _call_api(self, prompt: str) -> str:
 
@@ -50,7 +59,7 @@ class ReplicateModel(LLMBaseModel):
     @lru_cache(maxsize=chat_settings.max_cache_size)
     def make_prompt_request(self, prompt: Prompt) -> Tuple[str, Decimal]:
         final_prompt, num_tokens_input = truncate_prompt(prompt, self.encoding, self.max_tokens_question)
-        response = self._call_api(final_prompt)
+        response = self._request(num_tokens_input, self._call_api, final_prompt)
         tokens_response = len(get_tokens_encoded(response, self.encoding))
         cost_input = (int(num_tokens_input) * Decimal(self.spec.price_per_1k_tokens / 1000)) if self.spec.price_per_1k_tokens is not None else Decimal(0)
         cost_output = (int(tokens_response) * Decimal(self.spec.price_per_1k_output_tokens / 1000)) if self.spec.price_per_1k_output_tokens is not None else Decimal(0)
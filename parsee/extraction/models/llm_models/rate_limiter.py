@@ -0,0 +1,168 @@
+import time
+from typing import *
+from threading import Lock
+
+from parsee.extraction.models.model_dataclasses import MlModelSpecification
+
+
+class RateLimiter:
+    """
+    Token buckets for the requests and tokens per minute of a model, shared by all threads of a process.
+    After rate limit errors, the rates are halved and recover over time, so that the throughput stays close to the quota.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None, min_factor: float = 0.1, recovery_seconds: float = 60):
+        self.min_factor = min_factor
+        self.recovery_seconds = recovery_seconds
+        self.factor = 1.0
+        self.paused_until = 0.0
+        self._lock = Lock()
+        self._last_update = time.monotonic()
+        self.requests_per_minute: Optional[int] = None
+        self.tokens_per_minute: Optional[int] = None
+        self.requests_available = 0.0
+        self.tokens_available = 0.0
+        self.set_limits(requests_per_minute, tokens_per_minute)
+
+    def set_limits(self, requests_per_minute: Optional[int], tokens_per_minute: Optional[int]):
+        # buckets hold up to one minute of the budget
+        if (requests_per_minute is not None and requests_per_minute <= 0) or (tokens_per_minute is not None and tokens_per_minute <= 0):
+            raise Exception("requests and tokens per minute have to be positive (or None for no limit)")
+        with self._lock:
+            self._refill(time.monotonic())
+            self.requests_available = _bucket(self.requests_available, self.requests_per_minute, requests_per_minute)
+            self.tokens_available = _bucket(self.tokens_available, self.tokens_per_minute, tokens_per_minute)
+            self.requests_per_minute = requests_per_minute
+            self.tokens_per_minute = tokens_per_minute
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_update
+        self._last_update = now
+        self.factor = min(1.0, self.factor + elapsed / self.recovery_seconds)
+        if self.requests_per_minute is not None:
+            self.requests_available = min(float(self.requests_per_minute), self.requests_available + elapsed * self.requests_per_minute * self.factor / 60)
+        if self.tokens_per_minute is not None:
+            self.tokens_available = min(float(self.tokens_per_minute), self.tokens_available + elapsed * self.tokens_per_minute * self.factor / 60)
+
+    def _wait_time(self, now: float, num_tokens: int) -> float:
+        wait = max(self.paused_until - now, 0)
+        if self.requests_per_minute is not None and self.requests_available < 1:
+            wait = max(wait, (1 - self.requests_available) * 60 / (self.requests_per_minute * self.factor))
+        if self.tokens_per_minute is not None and self.tokens_available < num_tokens:
+            wait = max(wait, (num_tokens - self.tokens_available) * 60 / (self.tokens_per_minute * self.factor))
+        return wait
+
+    def acquire(self, num_tokens: int = 0):
+        """
+        blocks until the request (with the given number of tokens) fits into the budgets
+        """
+        if self.tokens_per_minute is not None:
+            num_tokens = min(num_tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now, num_tokens)
+                if wait <= 0:
+                    if self.requests_per_minute is not None:
+                        self.requests_available -= 1
+                    if self.tokens_per_minute is not None:
+                        self.tokens_available -= num_tokens
+                    return
+            time.sleep(wait)
+
+    def release(self, num_tokens: int):
+        """
+        returns tokens that were acquired but not used (e.g. the answer was shorter than the maximum answer length)
+        """
+        if self.tokens_per_minute is None or num_tokens <= 0:
+            return
+        with self._lock:
+            self.tokens_available = min(float(self.tokens_per_minute), self.tokens_available + num_tokens)
+
+    def report_rate_limit(self, headers: Optional[Mapping[str, str]] = None):
+        """
+        slows down all requests after a rate limit error, headers of the response are used if available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.factor = max(self.min_factor, self.factor / 2)
+            self.requests_available = min(self.requests_available, 0)
+            self.tokens_available = min(self.tokens_available, 0)
+            if headers is not None:
+                self._update_from_headers(now, headers)
+
+    def _update_from_headers(self, now: float, headers: Mapping[str, str]):
+        # the remaining budgets of the provider replace the emptied buckets (e.g. requests are still available if only the tokens ran out)
+        retry_after = _header_value(headers, ["retry-after"])
+        if retry_after is not None:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        remaining_requests = _header_value(headers, ["x-ratelimit-remaining-requests", "anthropic-ratelimit-requests-remaining"])
+        if remaining_requests is not None and self.requests_per_minute is not None:
+            self.requests_available = min(float(self.requests_per_minute), remaining_requests)
+        remaining_tokens = _header_value(headers, ["x-ratelimit-remaining-tokens", "anthropic-ratelimit-tokens-remaining"])
+        if remaining_tokens is not None and self.tokens_per_minute is not None:
+            self.tokens_available = min(float(self.tokens_per_minute), remaining_tokens)
+
+
+def _bucket(available: float, limit: Optional[int], new_limit: Optional[int]) -> float:
+    # new buckets start full, existing buckets are kept (at most the new maximum), so that changing the limits does not allow a burst
+    if new_limit is None:
+        return 0.0
+    elif limit is None:
+        return float(new_limit)
+    return min(available, float(new_limit))
+
+
+def _header_value(headers: Mapping[str, str], names: List[str]) -> Union[float, None]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+# one limiter per provider and model is shared by all threads of a process
+_rate_limiters: Dict[Tuple, RateLimiter] = {}
+_rate_limiters_lock = Lock()
+
+
+def get_rate_limiter(spec: MlModelSpecification) -> RateLimiter:
+    key = (spec.model_type, spec.internal_name, spec.api_key)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(spec.requests_per_minute, spec.tokens_per_minute)
+        else:
+            # only limits that are configured in the spec change the shared limiter
+            limiter = _rate_limiters[key]
+            limits = (limiter.requests_per_minute if spec.requests_per_minute is None else spec.requests_per_minute,
+                      limiter.tokens_per_minute if spec.tokens_per_minute is None else spec.tokens_per_minute)
+            if (limiter.requests_per_minute, limiter.tokens_per_minute) != limits:
+                limiter.set_limits(*limits)
+        return _rate_limiters[key]
+
+
+def status_code(exception: Optional[BaseException]) -> Union[int, None]:
+    # the SDKs of the providers store the HTTP status in different attributes
+    for value in [getattr(exception, "status_code", None), getattr(exception, "http_status", None), getattr(exception, "code", None), getattr(getattr(exception, "response", None), "status_code", None)]:
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def report_rate_limit(retry_state):
+    """
+    used as before_sleep callback of the retries of the model classes (the first argument of the retried call is the model):
+    rate limit errors slow down all requests of the model and every retry waits for the budgets like the first request
+    """
+    model = retry_state.args[0]
+    exception = retry_state.outcome.exception() if retry_state.outcome is not None else None
+    # some models also retry other errors (e.g. connection errors), only rate limits slow down the requests
+    if exception is not None and model.is_rate_limit_error(exception):
+        model.rate_limiter.report_rate_limit(getattr(exception, "headers", None) or getattr(getattr(exception, "response", None), "headers", None))
+    usage = getattr(model, "_usage", None)
+    model.rate_limiter.acquire(getattr(usage, "tokens_reserved", 0))
@@ -1,6 +1,7 @@
 from typing import List, Optional, Union, Tuple
 import re
 from decimal import Decimal
+from functools import lru_cache
 
 from parsee.templates.general_structuring_schema import StructuringItemSchema
 from parsee.utils.enums import OutputType
@@ -226,20 +227,27 @@ class MultiChoiceClassificationItem(PromptSchemaItem):
 
 
 def get_prompt_schema_item(item: StructuringItemSchema) -> PromptSchemaItem:
-    if item.type == OutputType.LIST:
-        return ListClassificationItem(item.valuesList, item.example, item.defaultValue)
-    elif item.type == OutputType.MULTI:
-        return MultiChoiceClassificationItem(item.valuesList, item.example, item.defaultValue)
-    elif item.type == OutputType.INTEGER:
-        return PositiveIntegerItem(item.example, item.defaultValue)
-    elif item.type == OutputType.NUMERIC:
-        return NumericItem(item.example, item.defaultValue)
-    elif item.type == OutputType.TEXT:
-        return TextItem(item.example, item.defaultValue)
-    elif item.type == OutputType.ENTITY:
-        return EntityItem(item.example, item.defaultValue)
-    elif item.type == OutputType.DATE:
-        return DateItem(item.example, item.defaultValue)
-    elif item.type == OutputType.PERCENTAGE:
-        return PercentageItem(item.example, item.defaultValue)
+    # prompt schema items don't change after creation, so one instance per distinct definition is shared
+    return _prompt_schema_item(item.type, tuple(item.valuesList) if item.valuesList is not None else None, item.example, item.defaultValue)
+
+
+@lru_cache(maxsize=1024)
+def _prompt_schema_item(output_type: OutputType, values_list: Optional[Tuple[str, ...]], example: Optional[str], default_value: Optional[str]) -> PromptSchemaItem:
+    values_list = list(values_list) if values_list is not None else None
+    if output_type == OutputType.LIST:
+        return ListClassificationItem(values_list, example, default_value)
+    elif output_type == OutputType.MULTI:
+        return MultiChoiceClassificationItem(values_list, example, default_value)
+    elif output_type == OutputType.INTEGER:
+        return PositiveIntegerItem(example, default_value)
+    elif output_type == OutputType.NUMERIC:
+        return NumericItem(example, default_value)
+    elif output_type == OutputType.TEXT:
+        return TextItem(example, default_value)
+    elif output_type == OutputType.ENTITY:
+        return EntityItem(example, default_value)
+    elif output_type == OutputType.DATE:
+        return DateItem(example, default_value)
+    elif output_type == OutputType.PERCENTAGE:
+        return PercentageItem(example, default_value)
     raise Exception("item not found")
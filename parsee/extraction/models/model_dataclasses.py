@@ -6,6 +6,14 @@ import os
 from parsee.utils.enums import ModelType
 
 
+def _hashable(value: any) -> any:
+    if isinstance(value, list):
+        return tuple(_hashable(x) for x in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
 @dataclass
 class MlModelSpecification:
     name: str
@@ -30,6 +38,9 @@ class MlModelSpecification:
     system_message: Optional[str]
     api_version: Optional[str]
     temperature: Optional[int] = None
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    settings: Optional[Dict] = None
 
     def model_path(self) -> Union[None, str]:
         if self.file_path is None:
@@ -45,8 +56,9 @@ class MlModelSpecification:
     def __key(self):
         return (self.name, self.model_id, self.internal_name, self.model_type, self.file_path, self.price_per_1k_tokens,
                 self.price_per_1k_output_tokens, self.price_per_image, self.max_tokens, self.api_key,
-                self.only_questions, self.only_elements, self.only_meta, self.only_mappings, self.stats,
-                self.multimodal, self.max_images, self.max_image_pixels, self.max_output_tokens, self.system_message)
+                _hashable(self.only_questions), _hashable(self.only_elements), _hashable(self.only_meta), _hashable(self.only_mappings), _hashable(self.stats),
+                self.multimodal, self.max_images, self.max_image_pixels, self.max_output_tokens, self.system_message, self.api_version, self.temperature,
+                self.requests_per_minute, self.tokens_per_minute, _hashable(self.settings))
 
     def __hash__(self):
         return hash(self.__key())
@@ -1,4 +1,5 @@
 from typing import *
+from threading import Lock
 
 from parsee.templates.element_schema import ElementDetectionSchema, ElementSchema
 from parsee.templates.general_structuring_schema import StructuringItemSchema, GeneralQuerySchema, GeneralQueryItemSchema
@@ -12,6 +13,7 @@ from parsee.extraction.models.llm_models.model_collection.together_model import
 from parsee.extraction.models.llm_models.model_collection.cohere_model import CohereModel
 from parsee.extraction.models.llm_models.model_collection.mistral_model import MistralModel
 from parsee.extraction.models.llm_models.model_collection.google_model import GoogleModel
+from parsee.extraction.models.llm_models.model_collection.mock_model import MockModel
 from parsee.extraction.tasks.questions.question_model_llm import LLMQuestionModel
 from parsee.extraction.tasks.meta_info_structuring.meta_info import MetaInfoModel
 from parsee.extraction.tasks.meta_info_structuring.meta_info_llm import MetaLLMModel
@@ -24,7 +26,12 @@ from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel
 
 
-def get_llm_base_model(spec: MlModelSpecification) -> LLMBaseModel:
+# one model (with its client and connection pool) per specification is shared by all callers in a process
+_llm_base_models: Dict[MlModelSpecification, LLMBaseModel] = {}
+_llm_base_models_lock = Lock()
+
+
+def make_llm_base_model(spec: MlModelSpecification) -> LLMBaseModel:
     if spec.model_type == ModelType.GPT:
         return ChatGPTModel(spec)
     elif spec.model_type == ModelType.REPLICATE:
@@ -41,10 +48,24 @@ def get_llm_base_model(spec: MlModelSpecification) -> LLMBaseModel:
         return MistralModel(spec)
     elif spec.model_type == ModelType.GOOGLE:
         return GoogleModel(spec)
+    elif spec.model_type == ModelType.MOCK:
+        return MockModel(spec)
     else:
         raise Exception("llm base model not found")
 
 
+def get_llm_base_model(spec: MlModelSpecification) -> LLMBaseModel:
+    with _llm_base_models_lock:
+        if spec not in _llm_base_models:
+            _llm_base_models[spec] = make_llm_base_model(spec)
+        return _llm_base_models[spec]
+
+
+def clear_llm_base_models():
+    with _llm_base_models_lock:
+        _llm_base_models.clear()
+
+
 class ModelLoader:
 
     def __init__(self, storage: StorageManager):
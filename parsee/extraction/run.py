@@ -1,5 +1,10 @@
+import os
+import time
+import logging
+import multiprocessing
 from typing import *
-from functools import reduce
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 
 from parsee.templates.job_template import JobTemplate
 from parsee.templates.helpers import create_template, StructuringItem, OutputType
@@ -9,8 +14,11 @@ from parsee.extraction.extractor_elements import StandardDocumentFormat, FinalOu
 from parsee.extraction.extractor_dataclasses import ParseeAnswer, ParseeBucket
 from parsee.storage.in_memory_storage import InMemoryStorageManager
 from parsee.converters.image_creation import ImageCreator
-from parsee.extraction.final_structuring import get_structured_tables_from_locations, final_tables_from_columns
-from parsee.extraction.models.model_loader import element_models_from_schema, meta_models_from_items, question_models_from_schema, mapping_models_from_schema, ModelLoader
+from parsee.extraction.models.model_loader import ModelLoader
+from parsee.extraction.execution_plan import ExecutionPlan
+from parsee.converters.main import load_document
+
+logger = logging.getLogger(__name__)
 
 
 def _model_loader(models: List[MlModelSpecification], custom_model_loader: Optional[ModelLoader] = None, custom_image_creator: Optional[ImageCreator] = None) -> ModelLoader:
@@ -43,41 +51,106 @@ def run_job_with_single_model(doc: StandardDocumentFormat, job_template: JobTemp
 
 
 def structure_data(doc: StandardDocumentFormat, job_template: JobTemplate, model_loader: ModelLoader, params: Dict[str, Any]) -> Tuple[List[ParseeBucket], List[FinalOutputTableColumn], List[ParseeAnswer]]:
+    # for many documents, compile the template once with job_template.compile and run the plan for each document
+    return job_template.compile(model_loader, params).run(doc)
 
-    # add manual answers to params
-    params = {**params, **job_template.detection.settings, **job_template.questions.settings}
 
-    question_models = question_models_from_schema(job_template.questions, job_template.meta, model_loader, params)
+@dataclass
+class BatchProgress:
+    completed: int
+    failed: int
+    skipped: int
+    seconds: float
 
-    answers: List[ParseeAnswer] = []
-    for question_model in question_models:
-        answers += question_model.predict_answers(doc)
+    def documents_per_second(self) -> float:
+        return self.completed / self.seconds if self.seconds > 0 else 0.0
 
-    models_loc = element_models_from_schema(job_template.detection, model_loader, params)
 
-    locations = []
-    for model_loc in models_loc:
-        locations += model_loc.classify_elements(doc)
+def _document_key(document: Union[str, StandardDocumentFormat]) -> str:
+    # documents are identified in the checkpoint by their path or source identifier
+    return os.path.abspath(document) if isinstance(document, str) else document.source_identifier
 
-    output_values = get_structured_tables_from_locations(job_template, doc, locations)
 
-    # add meta values
-    all_meta_ids = list(set(reduce(lambda acc, x: acc+x.metaInfoIds, job_template.detection.items, [])))
-    meta_ids_by_main_class = reduce(lambda acc, x: {**acc, x.id: x.metaInfoIds}, job_template.detection.items, {})
-    if len(all_meta_ids) > 0:
-        meta_models = meta_models_from_items([x for x in job_template.meta if x.id in all_meta_ids], model_loader, params)
-        for meta_model in meta_models:
-            meta_predictions_list = meta_model.predict_meta(output_values, doc.elements)
-            for k, meta_predictions in enumerate(meta_predictions_list):
-                output_values[k].meta += [x for x in meta_predictions if x.class_id in meta_ids_by_main_class[output_values[k].detected_class]]
+def _run_document(plan: ExecutionPlan, document: Union[str, StandardDocumentFormat]) -> Tuple[str, List[ParseeBucket], List[FinalOutputTableColumn], List[ParseeAnswer]]:
+    if isinstance(document, str):
+        document = load_document(document)
+    return (document.source_identifier, *plan.run(document))
 
-    # run mapping
-    all_mappings: List[ParseeBucket] = []
-    tables = final_tables_from_columns(output_values)
-    mapping_models = mapping_models_from_schema(job_template.detection, model_loader, params)
-    for model_mapping in mapping_models:
-        for table in tables:
-            mappings, mapping_schema = model_mapping.classify_elements(table)
-            all_mappings += mappings
 
-    return all_mappings, output_values, answers
\ No newline at end of file
+def run_job_over_documents(documents: Iterable[Union[str, StandardDocumentFormat]], job_template: JobTemplate, model: Optional[MlModelSpecification] = None, custom_model_loader: Optional[ModelLoader] = None,
+                           custom_image_creator: Optional[ImageCreator] = None, num_workers: Optional[int] = None, max_concurrent_documents: int = 4, checkpoint_path: Optional[str] = None,
+                           on_progress: Optional[Callable[[BatchProgress], None]] = None) -> Iterator[Tuple[str, List[ParseeBucket], List[FinalOutputTableColumn], List[ParseeAnswer]]]:
+    """
+    Runs the template for many documents (file paths or converted documents) and yields (source_identifier, buckets, columns, answers) for each document as soon as it is done (not in the order of the input).
+    File paths are converted by a pool of num_workers processes (num_workers=0: in the threads running the template), the template is run for up to max_concurrent_documents documents at once (the LLM requests of all documents share the rate limits of the models).
+    Worker processes are spawned (not forked), so scripts calling this with num_workers > 0 need an if __name__ == "__main__" guard.
+    Documents that fail are logged and skipped. If a checkpoint_path is given, completed documents are recorded in that file and skipped (not yielded again) when the job is run again.
+    """
+    start = time.perf_counter()
+    # the template of the caller is not changed
+    if model is not None:
+        job_template = job_template.with_model(model.model_id)
+    plan = job_template.compile(_model_loader([model] if model is not None else [], custom_model_loader, custom_image_creator), {})
+
+    completed_keys = set()
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            completed_keys = set(line.strip() for line in f if line.strip() != "")
+
+    num_workers = os.cpu_count() if num_workers is None else num_workers
+    # only a limited number of documents is submitted at once, so that the corpus doesn't have to fit into memory
+    max_pending = 2 * (num_workers + max_concurrent_documents)
+    completed, failed, skipped = 0, 0, 0
+
+    # worker processes are started on demand while the threads are running LLM requests, forked processes could inherit locks held by these threads
+    process_pool = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")) if num_workers > 0 else None
+    thread_pool = ThreadPoolExecutor(max_workers=max_concurrent_documents)
+    try:
+        conversions: Dict[Future, str] = {}
+        runs: Dict[Future, str] = {}
+        remaining = iter(documents)
+        exhausted = False
+        while True:
+            while not exhausted and len(conversions) + len(runs) < max_pending:
+                document = next(remaining, None)
+                if document is None:
+                    exhausted = True
+                    break
+                key = _document_key(document)
+                if key in completed_keys:
+                    skipped += 1
+                elif isinstance(document, str) and process_pool is not None:
+                    conversions[process_pool.submit(load_document, document)] = key
+                else:
+                    runs[thread_pool.submit(_run_document, plan, document)] = key
+            if len(conversions) + len(runs) == 0:
+                break
+
+            done, _ = wait(list(conversions.keys()) + list(runs.keys()), return_when=FIRST_COMPLETED)
+            for future in done:
+                key = conversions.pop(future) if future in conversions else runs.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    logger.exception(f"document could not be processed: {key}")
+                    result = None
+                    failed += 1
+                if isinstance(result, StandardDocumentFormat):
+                    # converted, the template is run next
+                    runs[thread_pool.submit(_run_document, plan, result)] = key
+                    continue
+                if result is not None:
+                    completed += 1
+                    if checkpoint_path is not None:
+                        with open(checkpoint_path, "a") as f:
+                            f.write(key + "\n")
+                progress = BatchProgress(completed, failed, skipped, time.perf_counter() - start)
+                logger.info(f"documents completed: {progress.completed} (failed: {progress.failed}, skipped: {progress.skipped}), {progress.documents_per_second():.2f} documents per second")
+                if on_progress is not None:
+                    on_progress(progress)
+                if result is not None:
+                    yield result
+    finally:
+        thread_pool.shutdown(wait=True, cancel_futures=True)
+        if process_pool is not None:
+            process_pool.shutdown(wait=True, cancel_futures=True)
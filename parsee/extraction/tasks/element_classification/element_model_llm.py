@@ -4,7 +4,7 @@ import re
 from parsee.extraction.tasks.element_classification.element_model import ElementModel, ElementSchema, StandardDocumentFormat, ParseeLocation
 from parsee.storage.interfaces import StorageManager
 from parsee.utils.helper import is_number_cell, clean_numeric_value, parse_json_array
-from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, pop_request_tokens
 from parsee.extraction.tasks.element_classification.features import LLMLocationFeatureBuilder
 
 
@@ -17,7 +17,7 @@ class ElementModelLLM(ElementModel):
         self.max_search_items = 10
         self.storage = storage
         self.prob = 0.8
-        self.feature_builder: LLMLocationFeatureBuilder = LLMLocationFeatureBuilder()
+        self.feature_builder: LLMLocationFeatureBuilder = LLMLocationFeatureBuilder(storage.feature_store)
 
     def parse_prompt_answer(self, prompt_answer: str) -> List[int]:
         answers = prompt_answer.splitlines()
@@ -39,7 +39,7 @@ class ElementModelLLM(ElementModel):
             prompt = self.feature_builder.make_prompt(item, document, self.storage)
 
             answer, amount = self.llm.make_prompt_request(prompt)
-            self.storage.log_expense(self.llm.spec.model_id, amount, item.id)
+            self.storage.log_expense(self.llm.spec.model_id, amount, item.id, pop_request_tokens(self.llm))
 
             best_indexes = self.parse_prompt_answer(answer)
 
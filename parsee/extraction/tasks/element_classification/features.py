@@ -1,6 +1,7 @@
 from typing import *
+from bisect import bisect_left, bisect_right
 
-from parsee.extraction.extractor_elements import ExtractedEl, get_text_distance, StandardDocumentFormat
+from parsee.extraction.extractor_elements import ExtractedEl, StandardDocumentFormat
 from parsee.extraction.extractor_dataclasses import ParseeLocation
 from parsee.templates.element_schema import ElementSchema
 from parsee.utils.helper import words_contained, clean_text_for_word_vectors2, composition_percentages
@@ -8,45 +9,108 @@ from parsee.utils.enums import ElementType, SearchStrategy
 from parsee.datasets.dataset_dataclasses import DatasetRow
 from parsee.utils.constants import ELEMENTS_WORDS_TO_INCLUDE, ELEMENTS_TABLES_TO_INCLUDE
 from parsee.storage.interfaces import StorageManager
+from parsee.storage.feature_store import FeatureStore, shared_feature_store
 from parsee.extraction.models.llm_models.prompts import Prompt
 
 
+class ElementContextIndex:
+    """
+    Prefix sums over the elements of a document, so that the context windows (texts and tables before/after) of an element
+    can be found without walking through the document for every element.
+    """
+
+    def __init__(self, elements: List[ExtractedEl]):
+        self.text_indices = []
+        self.table_indices = []
+        # words_prefix[k]: number of words of the first k text elements; chars_prefix[k]: number of text characters in elements[0:k]
+        self.words_prefix = [0]
+        self.chars_prefix = [0]
+        for k, element in enumerate(elements):
+            if element.el_type == ElementType.TEXT:
+                el_text = element.get_text()
+                self.text_indices.append(k)
+                self.words_prefix.append(self.words_prefix[-1] + len(words_contained(el_text)))
+                self.chars_prefix.append(self.chars_prefix[-1] + len(el_text))
+            else:
+                self.chars_prefix.append(self.chars_prefix[-1])
+                if element.el_type == ElementType.TABLE:
+                    self.table_indices.append(k)
+
+    # same as get_text_distance (without exclusions and tables)
+    def text_distance(self, el_idx1: int, el_idx2: int) -> int:
+        max_index = max(el_idx1, el_idx2)
+        min_index = min(el_idx1, el_idx2)
+        if max_index - min_index < 2:
+            return 0
+        return self.chars_prefix[max_index] - self.chars_prefix[min_index + 1]
+
+    # indices of the text elements before/after idx (starting with the closest one) until the word limit is reached
+    def text_window(self, idx: int, backward: bool, word_limit: int) -> List[int]:
+        if backward:
+            end = bisect_left(self.text_indices, idx)
+            if end == 0:
+                return []
+            # closest start position that contains enough words, otherwise all texts are taken
+            start = max(bisect_right(self.words_prefix, self.words_prefix[end] - word_limit, 0, end) - 1, 0)
+            return [self.text_indices[k] for k in range(end - 1, start - 1, -1)]
+        else:
+            start = bisect_right(self.text_indices, idx)
+            if start == len(self.text_indices):
+                return []
+            end = bisect_left(self.words_prefix, self.words_prefix[start] + word_limit, start + 1)
+            return [self.text_indices[k] for k in range(start, min(end, len(self.text_indices)))]
+
+    # indices of the closest tables before/after idx (starting with the closest one)
+    def neighbouring_tables(self, idx: int, backward: bool, table_limit: int) -> List[int]:
+        if backward:
+            end = bisect_left(self.table_indices, idx)
+            return self.table_indices[max(end - table_limit, 0):end][::-1]
+        else:
+            start = bisect_right(self.table_indices, idx)
+            return self.table_indices[start:start + table_limit]
+
+
 class LocationFeatureBuilder:
 
     memory: Dict[int, Dict[str, any]]
 
-    def __init__(self):
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
         self.memory = {}
         self.number_replacement = "xnumberx"
+        self.feature_store = shared_feature_store if feature_store is None else feature_store
+
+    def _make_element_features(self, element: ExtractedEl) -> Dict[str, any]:
+        el_text = element.get_text()
+        return {"type": element.el_type.value, "text": element.get_text_llm(False), "num_words": len(words_contained(el_text)), "percent_numbers": composition_percentages(el_text)['numbers']}
 
-    def _get_base_features(self, element_index: int, element: ExtractedEl) -> Dict[str, any]:
+    def _make_text_clean(self, element: ExtractedEl) -> str:
+        return clean_text_for_word_vectors2(element.get_text(), remove_special_chars=True, remove_all_numbers=True, number_token=self.number_replacement)
 
-        if element_index in self.memory:
-            return self.memory[element_index]
+    def _get_base_features(self, source_identifier: Optional[str], element_index: int, element: ExtractedEl) -> Dict[str, any]:
 
-        el_dict = {}
-        el_text = element.get_text()
-        num_words = len(words_contained(el_text))
-        el_dict['type'] = element.el_type.value
-        el_dict['text'] = element.get_text_llm(False)
-        el_dict['text_clean'] = clean_text_for_word_vectors2(el_text, remove_special_chars=True, remove_all_numbers=True, number_token=self.number_replacement)
-        el_dict['num_words'] = num_words
-        el_dict["percent_numbers"] = composition_percentages(el_text)['numbers']
+        if source_identifier is None:
+            # without a document identifier, features can only be kept by this builder
+            if element_index not in self.memory:
+                self.memory[element_index] = {**self._make_element_features(element), "text_clean": self._make_text_clean(element)}
+            return self.memory[element_index]
 
-        self.memory[element_index] = el_dict
-        return el_dict
+        # the cleaned text depends on the number replacement of the builder, the other features are the same for all builders
+        el_features = self.feature_store.get_or_make(source_identifier, ("element", element_index), lambda: self._make_element_features(element))
+        text_clean = self.feature_store.get_or_make(source_identifier, ("text_clean", self.number_replacement, element_index), lambda: self._make_text_clean(element))
+        return {**el_features, "text_clean": text_clean}
 
     def make_features(self, source_identifier: Optional[str], template_id: Optional[str], element_indices: List[int], elements: List[ExtractedEl], include_tables: bool = True) -> List[DatasetRow]:
 
         output = []
+        context_index = self._get_context_index(source_identifier, elements)
 
         for el_idx in element_indices:
 
-            base_features = self._get_base_features(el_idx, elements[el_idx])
-            text_before = self._get_text_features(el_idx, True, elements, ELEMENTS_WORDS_TO_INCLUDE)
-            text_after = self._get_text_features(el_idx, False, elements, ELEMENTS_WORDS_TO_INCLUDE)
-            tables_before = self._get_table_features(el_idx, True, elements, ELEMENTS_TABLES_TO_INCLUDE if include_tables else 0)
-            tables_after = self._get_table_features(el_idx, False, elements, ELEMENTS_TABLES_TO_INCLUDE if include_tables else 0)
+            base_features = self._get_base_features(source_identifier, el_idx, elements[el_idx])
+            text_before = self._get_text_features(source_identifier, el_idx, True, elements, ELEMENTS_WORDS_TO_INCLUDE, context_index)
+            text_after = self._get_text_features(source_identifier, el_idx, False, elements, ELEMENTS_WORDS_TO_INCLUDE, context_index)
+            tables_before = self._get_table_features(source_identifier, el_idx, True, elements, ELEMENTS_TABLES_TO_INCLUDE if include_tables else 0, context_index)
+            tables_after = self._get_table_features(source_identifier, el_idx, False, elements, ELEMENTS_TABLES_TO_INCLUDE if include_tables else 0, context_index)
 
             full_features = {
                 **base_features,
@@ -62,30 +126,20 @@ class LocationFeatureBuilder:
 
         return output
 
-    # returns forward/backward looking text features
-    def _get_text_features(self, idx: int, backward: bool, elements: List[ExtractedEl], word_limit: int) -> str:
-
-        text_entries_to_take = []
-        word_counter = 0
-
-        range_generator = range(idx + 1, len(elements)) if not backward else range(idx - 1, -1, -1)
+    def _get_context_index(self, source_identifier: Optional[str], elements: List[ExtractedEl]) -> ElementContextIndex:
+        if source_identifier is None:
+            return ElementContextIndex(elements)
+        return self.feature_store.get_or_make(source_identifier, ("context_index", len(elements)), lambda: ElementContextIndex(elements))
 
-        for kk in range_generator:
-
-            element = elements[kk]
-
-            if element.el_type == ElementType.TEXT:
-
-                el_features = self._get_base_features(kk, elements[kk])
+    # returns forward/backward looking text features
+    def _get_text_features(self, source_identifier: Optional[str], idx: int, backward: bool, elements: List[ExtractedEl], word_limit: int, context_index: Optional[ElementContextIndex] = None) -> str:
 
-                word_counter += el_features['num_words']
-                if backward:
-                    text_entries_to_take.append(el_features['text_clean'])
-                else:
-                    text_entries_to_take.insert(0, el_features["text_clean"])
+        context_index = self._get_context_index(source_identifier, elements) if context_index is None else context_index
 
-                if word_counter >= word_limit:
-                    break
+        text_entries_to_take = [self._get_base_features(source_identifier, kk, elements[kk])["text_clean"] for kk in context_index.text_window(idx, backward, word_limit)]
+        # texts after the element are ordered from the farthest to the closest one
+        if not backward:
+            text_entries_to_take.reverse()
 
         # take zeros entry
         if len(text_entries_to_take) == 0:
@@ -94,37 +148,32 @@ class LocationFeatureBuilder:
             return (" ".join(text_entries_to_take)).strip()
 
     # returns features for tables before/after actual table
-    def _get_table_features(self, idx: int, backward: bool, elements: List[ExtractedEl], table_limit: int) -> Dict[str, any]:
-    
+    def _get_table_features(self, source_identifier: Optional[str], idx: int, backward: bool, elements: List[ExtractedEl], table_limit: int, context_index: Optional[ElementContextIndex] = None) -> Dict[str, any]:
+
+        context_index = self._get_context_index(source_identifier, elements) if context_index is None else context_index
+
         tables_added = 0
         temp_features = {}
-    
-        range_generator = range(idx + 1, len(elements)) if not backward else range(idx - 1, -1, -1)
-    
-        for kk in range_generator:
+
+        # at least the closest table is always added
+        for kk in context_index.neighbouring_tables(idx, backward, max(table_limit, 1)):
 
             element = elements[kk]
+            table_features = self._get_base_features(source_identifier, kk, element)
+
+            tables_added += 1
+
+            # determine text distance between tables
+            text_distance = context_index.text_distance(element.source.element_index, elements[idx].source.element_index)
+
+            # add all features
+            key_append = f"_before_{tables_added}" if backward else f"_after_{tables_added}"
+            temp_features["text_distance"+key_append] = text_distance
+            temp_features["percent_numbers" + key_append] = table_features["percent_numbers"]
+            temp_features["num_words" + key_append] = table_features["num_words"]
+            temp_features["text_clean" + key_append] = table_features["text_clean"]
+            temp_features["text_simple" + key_append] = table_features["text"]
 
-            if element.el_type == ElementType.TABLE:
-
-                table_features = self._get_base_features(kk, element)
-
-                tables_added += 1
-    
-                # determine text distance between tables
-                text_distance = get_text_distance(element.source.element_index, elements[idx].source.element_index, elements)
-    
-                # add all features
-                key_append = f"_before_{tables_added}" if backward else f"_after_{tables_added}"
-                temp_features["text_distance"+key_append] = text_distance
-                temp_features["percent_numbers" + key_append] = table_features["percent_numbers"]
-                temp_features["num_words" + key_append] = table_features["num_words"]
-                temp_features["text_clean" + key_append] = table_features["text_clean"]
-                temp_features["text_simple" + key_append] = table_features["text"]
-    
-                if tables_added >= table_limit:
-                    break
-    
         # if not enough tables added, add empty features
         if tables_added < table_limit:
             for a in range(0, table_limit - tables_added):
@@ -135,14 +184,14 @@ class LocationFeatureBuilder:
                 temp_features["num_words" + key_append] = 0
                 temp_features["text_clean" + key_append] = ""
                 temp_features["text_simple" + key_append] = ""
-    
+
         return temp_features
 
 
 class LLMLocationFeatureBuilder(LocationFeatureBuilder):
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
+        super().__init__(feature_store)
         self.number_replacement = "NUMBER"
 
     def build_raw_answer(self, locations: List[ParseeLocation]) -> str:
@@ -167,7 +216,7 @@ class LLMLocationFeatureBuilder(LocationFeatureBuilder):
         additional_info_str = f" Additional info: {item.additionalInfo}" if item.additionalInfo.strip() != "" else ""
         all_element_indices = [x.source.element_index for x in closest_elements]
 
-        features = self.make_features(None, None, all_element_indices, document.elements, False)
+        features = self.make_features(document.source_identifier, None, all_element_indices, document.elements, False)
 
         prompt = Prompt(None, f'we want to find an item labeled "{item.title}".{additional_info_str}', f"""We are providing data in the following with the element_index and the text, such as [ELEMENT_INDEX] "TEXT" [end of item].
                 Using the provided text, identify "{item.title}" and return the tables which you think are most likely representing "{item.title}" (it can be one item alone or several together that form the searched item).
@@ -11,15 +11,14 @@ from parsee.templates.mappings import MappingBucket
 from parsee.datasets.dataset_dataclasses import DatasetRow
 from parsee.extraction.tasks.mappings.mapping_model import MappingSchema
 from parsee.utils.sample_items import samples
+from parsee.storage.feature_store import FeatureStore, shared_mapping_feature_store
 
 
 class MappingFeatureBuilder:
 
-    _memory: Dict[MappingUniqueIdentifier, Dict]
-
-    def __init__(self):
-        self._memory = {}
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
         self.number_replacement = "xnumberx"
+        self.feature_store = shared_mapping_feature_store if feature_store is None else feature_store
 
     def get_text_all(self, table: FinalOutputTable, schema_id: str) -> str:
 
@@ -39,15 +38,16 @@ class MappingFeatureBuilder:
 
         unique_identifier = MappingUniqueIdentifier(schema_id, table.li_identifier, kv_index)
 
-        if unique_identifier in self._memory:
-            return self._memory[unique_identifier]
+        # the line item identifier is derived from the line items only, so these features do not depend on the document,
+        # each table gets its own scope in the store of the mapping features
+        return self.feature_store.get_or_make(f"mapping:{table.li_identifier}", ("mapping", self.number_replacement, table.detected_class, unique_identifier), lambda: self._compute_base_features(table, kv_index))
+
+    def _compute_base_features(self, table: FinalOutputTable, kv_index: int) -> Dict[str, str]:
 
         line_item_org = table.line_items[kv_index]
         total_items = len(table.line_items)
 
-        self._memory[unique_identifier] = {"class_id": table.detected_class, "caption_org": line_item_org, "caption_cleaned": clean_text_for_word_vectors2(line_item_org, None, True, True, self.number_replacement), "item_idx": kv_index, "total_items": total_items}
-
-        return self._memory[unique_identifier]
+        return {"class_id": table.detected_class, "caption_org": line_item_org, "caption_cleaned": clean_text_for_word_vectors2(line_item_org, None, True, True, self.number_replacement), "item_idx": kv_index, "total_items": total_items}
 
     def make_features(self, source_identifier: Optional[str], template_id: Optional[str], table: FinalOutputTable, schema_id: str, kv_index: int) -> DatasetRow:
 
@@ -66,8 +66,8 @@ class MappingFeatureBuilder:
 
 class LLMMappingFeatureBuilder(MappingFeatureBuilder):
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
+        super().__init__(feature_store)
         self.number_replacement = "[number]"
 
     def build_raw_answer(self, choices: List[ParseeBucket], schema: MappingSchema) -> str:
@@ -3,7 +3,7 @@ from decimal import Decimal
 
 from parsee.extraction.tasks.mappings.mapping_model import MappingModel, ElementSchema, MappingSchema, ParseeBucket
 from parsee.storage.interfaces import StorageManager
-from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, pop_request_tokens
 from parsee.extraction.tasks.mappings.features import LLMMappingFeatureBuilder
 from parsee.extraction.extractor_elements import FinalOutputTable
 from parsee.utils.constants import ID_NOT_AVAILABLE
@@ -44,5 +44,5 @@ class MappingModelLLM(MappingModel):
 
         prompt = self.feature_builder.make_prompt(table, schema)
         answer, amount = self.llm.make_prompt_request(prompt)
-        self.storage.log_expense(self.llm.spec.model_id, amount, f"mapping:{table.detected_class}")
+        self.storage.log_expense(self.llm.spec.model_id, amount, f"mapping:{table.detected_class}", pop_request_tokens(self.llm))
         return self.parse_answer(table, answer, schema, table.li_identifier)
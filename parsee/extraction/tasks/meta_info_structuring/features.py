@@ -7,14 +7,16 @@ from parsee.utils.helper import is_number_cell, is_year_cell, clean_text_for_wor
 from parsee.datasets.dataset_dataclasses import DatasetRow, MetaUniqueIdentifier
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.extraction.models.llm_models.structuring_schema import get_prompt_schema_item
+from parsee.storage.feature_store import FeatureStore, shared_feature_store
 
 
 class MetaFeatureBuilder:
 
     memory: Dict[MetaUniqueIdentifier, DatasetRow]
 
-    def __init__(self):
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
         self.memory = {}
+        self.feature_store = shared_feature_store if feature_store is None else feature_store
         self.cell_start_delimiter = "xcellstartx"
         self.row_start_delimiter = "xrowstartx"
         self.cell_self_append = "xselfx"
@@ -185,8 +187,17 @@ class MetaFeatureBuilder:
 
         unique_identifier = MetaUniqueIdentifier(column.detected_class, column.col_idx, column.kv_identifier)
 
-        if unique_identifier in self.memory:
-            return self.memory[unique_identifier]
+        if source_identifier is not None:
+            # features of the same column are shared with other builders of the same type for this document
+            return self.feature_store.get_or_make(source_identifier, ("meta", type(self).__name__, unique_identifier, base_year),
+                                                  lambda: self._make_features(source_identifier, template_id, unique_identifier, column, elements, base_year, custom_features))
+
+        if unique_identifier not in self.memory:
+            self.memory[unique_identifier] = self._make_features(source_identifier, template_id, unique_identifier, column, elements, base_year, custom_features)
+
+        return self.memory[unique_identifier]
+
+    def _make_features(self, source_identifier: Optional[str], template_id: Optional[str], unique_identifier: MetaUniqueIdentifier, column: FinalOutputTableColumn, elements: List[ExtractedEl], base_year: Optional[int], custom_features: Optional[Dict[str, any]]) -> DatasetRow:
 
         text_words_to_include_before = 200
         main_el: StructuredTable = elements[column.locations[0].source.element_index]
@@ -200,15 +211,13 @@ class MetaFeatureBuilder:
         if custom_features is not None:
             features = {**features, **custom_features}
 
-        self.memory[unique_identifier] = DatasetRow(source_identifier, template_id, unique_identifier, features)
-
-        return self.memory[unique_identifier]
+        return DatasetRow(source_identifier, template_id, unique_identifier, features)
 
 
 class LLMMetaFeatureBuilder(MetaFeatureBuilder):
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
+        super().__init__(feature_store)
         self.cell_start_delimiter = "(cell start)"
         self.row_start_delimiter = "(row start)"
         self.cell_self_append = "(cell main)"
@@ -259,6 +268,35 @@ class LLMMetaFeatureBuilder(MetaFeatureBuilder):
 
         return prompt
 
+    def build_table_prompt(self, features: List[DatasetRow], col_indices: List[int], items: List[StructuringItemSchema]) -> Prompt:
+
+        # the content of the table and the text before it are the same for all columns, only the header of the column changes
+        columns_text = "".join([f'Column index {col_idx}: on top of the column (in the header part), there is this text: "{col_features.get_feature("top_column_all")}"\n' for col_features, col_idx in zip(features, col_indices)])
+
+        available_data = f'''
+                This is the information that is available:\n
+                The table has the following columns: \n{columns_text}
+                The content of the table is the following (excluding any numbers): {features[0].get_feature('li_and_values')}\n
+                On top of the line items, there is this text: "{features[0].get_feature('top_li_reworked')}\n"
+
+                Before the table starts, there is this text: "{features[0].get_feature('before')}"\n
+                '''
+
+        example_values = self.example(items).replace("Your answer could be for example: \n", "")
+        example = f"Your answer could be for example: \n[column {col_indices[0]}]\n{example_values}"
+
+        prompt = Prompt("We want to recognize certain information in a table, separately for each of its columns.", f'Please identify the following information for each column based on the provided text: {self.text_main(items)}',
+                        'It is very important that you answer for every column separately: first write the column index in brackets, for example [column 1], then in the following lines only answer with the number of the question and then one of the valid values for that question afterwards.',
+                        example, available_data)
+
+        return prompt
+
+    def make_table_prompt(self, columns: List[FinalOutputTableColumn], elements: List[ExtractedEl], items: List[StructuringItemSchema]) -> Prompt:
+
+        features = [self.make_features(None, None, column, elements, None, None) for column in columns]
+
+        return self.build_table_prompt(features, [column.col_idx for column in columns], items)
+
     def make_prompt(self, column: FinalOutputTableColumn, elements: List[ExtractedEl], items: List[StructuringItemSchema]) -> Prompt:
 
         features = self.make_features(None, None, column, elements, None, None)
@@ -6,9 +6,10 @@ from parsee.extraction.tasks.meta_info_structuring.meta_info import MetaInfoMode
 from parsee.extraction.models.llm_models.structuring_schema import get_prompt_schema_item
 from parsee.templates.general_structuring_schema import StructuringItemSchema
 from parsee.extraction.extractor_dataclasses import ParseeMeta
-from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, pop_request_tokens
 from parsee.storage.interfaces import StorageManager
 from parsee.extraction.tasks.meta_info_structuring.features import LLMMetaFeatureBuilder
+from parsee.extraction.models.llm_models.prompts import Prompt
 
 
 class MetaLLMModel(MetaInfoModel):
@@ -20,7 +21,9 @@ class MetaLLMModel(MetaInfoModel):
         self.default_prob_answer = 0.8
         self.elements = []
         self.llm = llm
-        self.feature_builder: LLMMetaFeatureBuilder = LLMMetaFeatureBuilder()
+        self.feature_builder: LLMMetaFeatureBuilder = LLMMetaFeatureBuilder(storage.feature_store if storage is not None else None)
+        # if set, all columns of a table are predicted with a single prompt
+        self.per_table = kwargs.get("meta_per_table", False)
 
     def parse_prompt_answer(self, prompt_answer: str) -> Dict[str, Tuple[str, bool]]:
         answers = prompt_answer.splitlines()
@@ -35,22 +38,64 @@ class MetaLLMModel(MetaInfoModel):
                     output[self.items[item_idx].id] = get_prompt_schema_item(self.items[item_idx]).get_value(value_predicted)
         return output
 
-    def predict_meta(self, columns: List[FinalOutputTableColumn], elements: List[ExtractedEl]) -> List[List[ParseeMeta]]:
-
-        all_output = []
-        for column in columns:
-            prompt = self.feature_builder.make_prompt(column, elements, self.items)
+    def parse_table_prompt_answer(self, prompt_answer: str, col_indices: List[int]) -> Dict[int, Dict[str, Tuple[str, bool]]]:
+        # answers are grouped by column, each group starting with a line like [column 1]
+        lines_by_column = {col_idx: [] for col_idx in col_indices}
+        current_col = None
+        for line in prompt_answer.splitlines():
+            result = re.search(r'\[ *column *(?:index *)?(\d+) *]', line, re.IGNORECASE)
+            if result is not None:
+                current_col = int(result.group(1)) if int(result.group(1)) in lines_by_column else None
+                continue
+            if current_col is not None:
+                lines_by_column[current_col].append(line)
+        return {col_idx: self.parse_prompt_answer("\n".join(lines)) for col_idx, lines in lines_by_column.items()}
 
+    def _make_request(self, prompt: Prompt, answers: Dict[Prompt, str]) -> str:
+        # identical prompts (e.g. same column detected for several classes) are only sent once
+        if prompt not in answers:
             prompt_answer, amount = self.llm.make_prompt_request(prompt)
+            self.storage.log_expense(self.llm.spec.model_id, amount, "meta LLM", pop_request_tokens(self.llm))
+            answers[prompt] = prompt_answer
+        return answers[prompt]
+
+    def _make_output(self, column: FinalOutputTableColumn, prediction_dict: Dict[str, Tuple[str, bool]]) -> List[ParseeMeta]:
+        output: List[ParseeMeta] = []
+        for key, values in prediction_dict.items():
+            value, parse_success = values
+            output.append(ParseeMeta(self.model_name, column.col_idx, column.sources, key, value, self.default_prob_answer if parse_success else 0))
+        return output
+
+    def _table_groups(self, columns: List[FinalOutputTableColumn]) -> List[List[int]]:
+        # columns of the same class and main table, column indices are unique within a group
+        groups: Dict[Tuple[str, int], List[List[int]]] = {}
+        for k, column in enumerate(columns):
+            key = (column.detected_class, column.locations[0].source.element_index)
+            if key not in groups:
+                groups[key] = [[]]
+            if column.col_idx in [columns[x].col_idx for x in groups[key][-1]]:
+                groups[key].append([])
+            groups[key][-1].append(k)
+        return [group for key_groups in groups.values() for group in key_groups]
 
-            self.storage.log_expense(self.llm.spec.model_id, amount, "meta LLM")
+    def predict_meta(self, columns: List[FinalOutputTableColumn], elements: List[ExtractedEl]) -> List[List[ParseeMeta]]:
 
-            prediction_dict = self.parse_prompt_answer(prompt_answer)
+        answers: Dict[Prompt, str] = {}
 
-            output: List[ParseeMeta] = []
-            for key, values in prediction_dict.items():
-                value, parse_success = values
-                output.append(ParseeMeta(self.model_name, column.col_idx, column.sources, key, value, self.default_prob_answer if parse_success else 0))
-            all_output.append(output)
+        if not self.per_table:
+            all_output = []
+            for column in columns:
+                prompt = self.feature_builder.make_prompt(column, elements, self.items)
+                prediction_dict = self.parse_prompt_answer(self._make_request(prompt, answers))
+                all_output.append(self._make_output(column, prediction_dict))
+            return all_output
 
+        all_output: List[Optional[List[ParseeMeta]]] = [None] * len(columns)
+        for group in self._table_groups(columns):
+            group_columns = [columns[k] for k in group]
+            prompt = self.feature_builder.make_table_prompt(group_columns, elements, self.items)
+            col_indices = [column.col_idx for column in group_columns]
+            predictions = self.parse_table_prompt_answer(self._make_request(prompt, answers), col_indices)
+            for k, column in zip(group, group_columns):
+                all_output[k] = self._make_output(column, predictions[column.col_idx])
         return all_output
@@ -1,5 +1,7 @@
 from typing import *
 from functools import reduce
+from collections import OrderedDict
+from threading import Lock
 import json
 
 from parsee.extraction.models.llm_models.prompts import Prompt
@@ -17,9 +19,14 @@ MAIN_QUESTION_STR = "main_question"
 class GeneralQueriesPromptBuilder:
 
     storage: StorageManager
+    # maximum number of item definitions for which the static fragments are kept (least recently used ones are evicted)
+    max_static_fragments = 1024
 
     def __init__(self, storage: StorageManager):
         self.storage = storage
+        # parts of the prompts that don't depend on the document, by item definition
+        self.static_fragments: OrderedDict[Tuple, Tuple[str, str, str]] = OrderedDict()
+        self._static_fragments_lock = Lock()
 
     def format_single_item(self, answer: ParseeAnswer, item: GeneralQueryItemSchema, meta_items: List[StructuringItemSchema]) -> Dict:
         schema_item = get_prompt_schema_item(item)
@@ -58,6 +65,30 @@ class GeneralQueriesPromptBuilder:
 
     def build_prompt(self, structuring_item: GeneralQueryItemSchema, meta_items: List[StructuringItemSchema], document: StandardDocumentFormat, relevant_elements: List[ExtractedEl], multimodal: bool = False, max_images: Optional[int] = None, max_image_size: Optional[int] = None) -> Prompt:
 
+        relevant_meta_items = [x for x in meta_items if structuring_item.metaInfoIds is not None and x.id in structuring_item.metaInfoIds]
+        # the key contains all values used for the fragments, so that changed items are not using outdated fragments
+        key = (_item_key(structuring_item), tuple(_item_key(x) for x in relevant_meta_items), multimodal)
+        general_info, main_question, full_example = self._get_static_fragments(key, structuring_item, relevant_meta_items, multimodal)
+
+        prompt = Prompt(general_info, main_question, None,
+                        full_example,
+                        self.get_elements_text(relevant_elements, document) if not multimodal else self.storage.image_creator.get_images(document, relevant_elements, max_images, max_image_size))
+        return prompt
+
+    def _get_static_fragments(self, key: Tuple, structuring_item: GeneralQueryItemSchema, relevant_meta_items: List[StructuringItemSchema], multimodal: bool) -> Tuple[str, str, str]:
+        with self._static_fragments_lock:
+            if key in self.static_fragments:
+                self.static_fragments.move_to_end(key)
+                return self.static_fragments[key]
+        fragments = self.build_static_fragments(structuring_item, relevant_meta_items, multimodal)
+        with self._static_fragments_lock:
+            self.static_fragments[key] = fragments
+            while len(self.static_fragments) > self.max_static_fragments:
+                self.static_fragments.popitem(last=False)
+        return fragments
+
+    def build_static_fragments(self, structuring_item: GeneralQueryItemSchema, relevant_meta_items: List[StructuringItemSchema], multimodal: bool) -> Tuple[str, str, str]:
+
         if not multimodal:
             general_info = "You are supposed to answer a question based on text fragments that are provided. " \
                            "The fragments start with a number in square brackets and then the actual text. The end of the fragment is shown by the same number in square brackets, only that the number is preceded by a slash. E.g. [22] Some Text [/22]. The lower the number of the fragment, " \
@@ -70,8 +101,6 @@ class GeneralQueriesPromptBuilder:
         additional_info_str = f" Additional info: {structuring_item.additionalInfo}" if structuring_item.additionalInfo.strip() != "" else ""
         main_question = f'The question is: {structuring_item.title} {additional_info_str} {prompt_schema_item.get_possible_values_str()}'
 
-        relevant_meta_items = [x for x in meta_items if structuring_item.metaInfoIds is not None and x.id in structuring_item.metaInfoIds]
-
         # build full example
         source_examples = [ExtractedSource(DocumentType.PDF, None, None, 241, None), ExtractedSource(DocumentType.PDF, None, None, 423, None)]
         meta_examples = [ParseeMeta("test", 0, source_examples, x.id, get_prompt_schema_item(x).get_example(True), 0.8) for x in relevant_meta_items]
@@ -89,7 +118,8 @@ class GeneralQueriesPromptBuilder:
                 meta_prompt_item = get_prompt_schema_item(meta_item)
                 main_question += f"\n({meta_item.id}): {meta_item.title} {meta_item.additionalInfo} {meta_prompt_item.get_possible_values_str()}"
 
-        prompt = Prompt(general_info, main_question, None,
-                        full_example,
-                        self.get_elements_text(relevant_elements, document) if not multimodal else self.storage.image_creator.get_images(document, relevant_elements, max_images, max_image_size))
-        return prompt
+        return general_info, main_question, full_example
+
+
+def _item_key(item: StructuringItemSchema) -> Tuple:
+    return item.id, item.type, item.title, item.additionalInfo, tuple(item.valuesList) if item.valuesList is not None else None, item.example, item.defaultValue
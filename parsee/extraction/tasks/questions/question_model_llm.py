@@ -5,11 +5,12 @@ from parsee.extraction.tasks.questions.question_model import QuestionModel
 from parsee.extraction.tasks.questions.features import GeneralQueriesPromptBuilder, MAIN_QUESTION_STR
 from parsee.extraction.extractor_dataclasses import ParseeAnswer, ParseeMeta
 from parsee.storage.interfaces import StorageManager
-from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, make_prompt_request_with_tokens
 from parsee.templates.general_structuring_schema import StructuringItemSchema, GeneralQueryItemSchema
 from parsee.extraction.models.llm_models.structuring_schema import get_prompt_schema_item
 from parsee.extraction.models.llm_models.prompts import Prompt
 from parsee.utils.helper import parse_json_dict
+from parsee.utils.instrumentation import stage
 
 
 class LLMQuestionModel(QuestionModel):
@@ -76,16 +77,23 @@ class LLMQuestionModel(QuestionModel):
         return output
 
     def predict_for_prompt(self, prompt: Prompt, schema_item: GeneralQueryItemSchema, max_element_index: Optional[int], document: Optional[StandardDocumentFormat]) -> List[ParseeAnswer]:
-        prompt_answer, amount = self.llm.make_prompt_request(prompt)
-        self.storage.log_expense(self.llm.spec.model_id, amount, schema_item.id)
-        return self.parse_prompt_answer(schema_item, prompt_answer, max_element_index, document)
+        with stage("prompt_request", model=self.model_name, class_id=schema_item.id) as attributes:
+            prompt_answer, amount, tokens = make_prompt_request_with_tokens(self.llm, prompt)
+            attributes["cache_hits"] = 1 if tokens is None else 0
+            attributes["cost"] = float(amount)
+        self.storage.log_expense(self.llm.spec.model_id, amount, schema_item.id, tokens)
+        with stage("parse", model=self.model_name, class_id=schema_item.id):
+            return self.parse_prompt_answer(schema_item, prompt_answer, max_element_index, document)
 
     def predict_answers(self, document: StandardDocumentFormat) -> List[ParseeAnswer]:
 
         answers: List[ParseeAnswer] = []
         for schema_item in self.items:
-            relevant_elements = self.prompt_builder.get_relevant_elements(schema_item, document)
-            prompt = self.prompt_builder.build_prompt(schema_item, self.meta, document, relevant_elements, self.llm.spec.multimodal, self.llm.spec.max_images, self.llm.spec.max_image_pixels)
+            with stage("retrieval", source_identifier=document.source_identifier, class_id=schema_item.id) as attributes:
+                relevant_elements = self.prompt_builder.get_relevant_elements(schema_item, document)
+                attributes["num_elements"] = len(relevant_elements)
+            with stage("prompt_build", source_identifier=document.source_identifier, class_id=schema_item.id):
+                prompt = self.prompt_builder.build_prompt(schema_item, self.meta, document, relevant_elements, self.llm.spec.multimodal, self.llm.spec.max_images, self.llm.spec.max_image_pixels)
             answers += self.predict_for_prompt(prompt, schema_item, len(document.elements), document)
 
         return answers
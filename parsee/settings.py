@@ -12,6 +12,21 @@ class ChatSettings(BaseSettings):
     min_tokens_for_instructions_and_history: int = 500
     encoding: Encoding = tiktoken.get_encoding("cl100k_base")
     max_cache_size: int = 128
+    max_documents_feature_store: int = 32
+    max_tables_mapping_feature_store: int = 256
+    max_elements_document_cache: int = 100000
+    max_bytes_document_cache: int = 200000000
+    document_cache_dir: Optional[str] = None
+    source_identifier_registry_path: Optional[str] = None
+    max_workers_hashing: int = 4
+    source_identifier_registry_save_interval: float = 10.0
+    cloud_timeout: float = 60
+    cloud_max_retries: int = 3
+    cloud_backoff_factor: float = 0.5
+    cloud_max_workers: int = 8
+    expense_ledger_path: Optional[str] = None
+    expense_batch_size: int = 100
+    expense_flush_interval: float = 1.0
     retry_attempts: int = 5
     retry_wait_multiplier: int = 1
     retry_wait_min: int = 2
@@ -0,0 +1,107 @@
+import os
+import copy
+import pickle
+import tempfile
+from typing import *
+from collections import OrderedDict
+from threading import RLock
+from concurrent.futures import Future
+
+from parsee.extraction.extractor_elements import StandardDocumentFormat
+from parsee.utils.helper import get_source_identifier_simple
+from parsee.settings import chat_settings
+
+
+def document_size(document: StandardDocumentFormat) -> Tuple[int, int]:
+    # number of elements and estimated size in bytes (from the text of the elements)
+    return len(document.elements), sum(len(x.get_text() or "") for x in document.elements)
+
+
+class DocumentCache:
+    """
+    Keeps loaded documents in memory (least recently used documents are evicted if the total number of elements or size is exceeded).
+    If a directory is given, converted documents are also saved there, so they don't have to be converted again by other processes/sessions.
+    Documents are identified by their source identifier (for local files, this is the hash of the file).
+    """
+
+    def __init__(self, max_elements: Optional[int] = None, max_bytes: Optional[int] = None, disk_dir: Optional[str] = None):
+        self.max_elements = chat_settings.max_elements_document_cache if max_elements is None else max_elements
+        self.max_bytes = chat_settings.max_bytes_document_cache if max_bytes is None else max_bytes
+        self.disk_dir = chat_settings.document_cache_dir if disk_dir is None else disk_dir
+        if self.disk_dir is not None and not os.path.exists(self.disk_dir):
+            os.makedirs(self.disk_dir)
+        self._documents: OrderedDict[str, Tuple[StandardDocumentFormat, int, int]] = OrderedDict()
+        self.total_elements = 0
+        self.total_bytes = 0
+        self._lock = RLock()
+        # documents that are currently loaded by some thread, other threads requesting them wait for the result
+        self._loading: Dict[str, Future] = {}
+
+    def _disk_path(self, source_identifier: str) -> str:
+        return os.path.join(self.disk_dir, get_source_identifier_simple(source_identifier) + ".pkl")
+
+    def _load_from_disk(self, source_identifier: str) -> Union[StandardDocumentFormat, None]:
+        if self.disk_dir is None or not os.path.exists(self._disk_path(source_identifier)):
+            return None
+        with open(self._disk_path(source_identifier), "rb") as f:
+            return pickle.load(f)
+
+    def _save_to_disk(self, document: StandardDocumentFormat):
+        if self.disk_dir is None:
+            return
+        # write to a unique temporary file first, so that other processes never read incomplete files (also when they convert the same document)
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(document, f)
+            os.replace(tmp_path, self._disk_path(document.source_identifier))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _add(self, source_identifier: str, document: StandardDocumentFormat):
+        num_elements, num_bytes = document_size(document)
+        self._documents[source_identifier] = (document, num_elements, num_bytes)
+        self.total_elements += num_elements
+        self.total_bytes += num_bytes
+        # evict least recently used documents (the newest one is always kept)
+        while len(self._documents) > 1 and (self.total_elements > self.max_elements or self.total_bytes > self.max_bytes):
+            _, (_, evicted_elements, evicted_bytes) = self._documents.popitem(last=False)
+            self.total_elements -= evicted_elements
+            self.total_bytes -= evicted_bytes
+
+    def get_or_load(self, source_identifier: str, load_function: Callable[[str], StandardDocumentFormat]) -> StandardDocumentFormat:
+        # documents are loaded outside of the lock, so that other documents can be loaded (or taken from the cache) at the same time
+        with self._lock:
+            if source_identifier in self._documents:
+                self._documents.move_to_end(source_identifier)
+                # callers may replace the elements of the document, the cached document is not changed by that
+                return copy.copy(self._documents[source_identifier][0])
+            future = self._loading.get(source_identifier)
+            loading_thread = future is None
+            if loading_thread:
+                future = Future()
+                self._loading[source_identifier] = future
+        if not loading_thread:
+            return copy.copy(future.result())
+        try:
+            document = self._load_from_disk(source_identifier)
+            if document is None:
+                document = load_function(source_identifier)
+                self._save_to_disk(document)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[source_identifier]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._add(source_identifier, document)
+            del self._loading[source_identifier]
+        future.set_result(document)
+        return copy.copy(document)
+
+    def clear(self):
+        with self._lock:
+            self._documents = OrderedDict()
+            self.total_elements = 0
+            self.total_bytes = 0
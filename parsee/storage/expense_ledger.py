@@ -0,0 +1,200 @@
+import os
+import csv
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+from decimal import Decimal
+from typing import *
+from dataclasses import dataclass, field
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock, Thread
+
+from parsee.settings import chat_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExpenseEntry:
+    service: str
+    amount: Decimal
+    class_id: str
+    tokens: Optional[int] = None
+    source_identifier: Optional[str] = None
+    template_id: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+class ExpenseSink:
+
+    def write(self, entries: List[ExpenseEntry]):
+        raise NotImplementedError
+
+
+class SqliteExpenseSink(ExpenseSink):
+
+    def __init__(self, path: str):
+        self.path = path
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS expenses (timestamp REAL, service TEXT, amount TEXT, class_id TEXT, tokens INTEGER, source_identifier TEXT, template_id TEXT)")
+
+    def write(self, entries: List[ExpenseEntry]):
+        # a new connection per batch, as the batches are written from the background thread of the ledger
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany("INSERT INTO expenses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(x.timestamp, x.service, str(x.amount), x.class_id, x.tokens, x.source_identifier, x.template_id) for x in entries])
+
+
+class CsvExpenseSink(ExpenseSink):
+
+    columns = ["timestamp", "service", "amount", "class_id", "tokens", "source_identifier", "template_id"]
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, entries: List[ExpenseEntry]):
+        write_header = not os.path.exists(self.path)
+        with open(self.path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(self.columns)
+            for x in entries:
+                writer.writerow([x.timestamp, x.service, str(x.amount), x.class_id, x.tokens, x.source_identifier, x.template_id])
+
+
+def sink_from_path(path: Optional[str]) -> Union[ExpenseSink, None]:
+    if path is None:
+        return None
+    return CsvExpenseSink(path) if path.lower().endswith(".csv") else SqliteExpenseSink(path)
+
+
+# document and template of the current structure_data call, used to group the expenses
+_expense_context: ContextVar[Tuple[Optional[str], Optional[str]]] = ContextVar("expense_context", default=(None, None))
+
+
+@contextmanager
+def expense_context(source_identifier: Optional[str], template_id: Optional[str]):
+    token = _expense_context.set((source_identifier, template_id))
+    try:
+        yield
+    finally:
+        _expense_context.reset(token)
+
+
+class ExpenseWriter:
+    """
+    Writes the entries of all ledgers with the same sink in batches, from a single background thread (started with the first entry).
+    """
+
+    def __init__(self, sink: ExpenseSink, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.sink = sink
+        self.batch_size = chat_settings.expense_batch_size if batch_size is None else batch_size
+        self.flush_interval = chat_settings.expense_flush_interval if flush_interval is None else flush_interval
+        self._lock = Lock()
+        self._queue = queue.Queue()
+        self._thread: Optional[Thread] = None
+
+    def put(self, entry: ExpenseEntry):
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._write_batches, daemon=True)
+                self._thread.start()
+        self._queue.put(entry)
+
+    def flush(self):
+        # blocks until all entries put so far are written to the sink
+        if self._thread is not None:
+            self._queue.join()
+
+    def _write_batches(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                self.sink.write(batch)
+            except Exception:
+                logger.exception("expenses could not be written")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+# one writer per sink (by path), shared by all ledgers: storages are created per call or worker, they should not start a thread each
+_writers: Dict[Any, ExpenseWriter] = {}
+_writers_lock = Lock()
+
+
+def get_expense_writer(path: Optional[str] = None, sink: Optional[ExpenseSink] = None, batch_size: Optional[int] = None,
+                       flush_interval: Optional[float] = None) -> Union[ExpenseWriter, None]:
+    """
+    returns the shared writer of a sink (or of the sink for a path), the batch settings are only used when the writer is created
+    """
+    key = getattr(sink, "path", id(sink)) if sink is not None else path
+    if key is None:
+        return None
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = ExpenseWriter(sink_from_path(path) if sink is None else sink, batch_size, flush_interval)
+        return _writers[key]
+
+
+def flush_expenses():
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+atexit.register(flush_expenses)
+
+
+class ExpenseLedger:
+    """
+    Collects the expenses of the LLM requests without blocking the requests: entries are aggregated in memory right away (by service, class,
+    document and template) and written to the sink (if any) in batches by the background thread of the shared writer of the sink.
+    """
+
+    group_fields = ["service", "class_id", "source_identifier", "template_id"]
+
+    def __init__(self, sink: Optional[ExpenseSink] = None, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.writer = get_expense_writer(chat_settings.expense_ledger_path if sink is None else None, sink, batch_size, flush_interval)
+        self._aggregates: Dict[str, Dict[Optional[str], Dict[str, Any]]] = {x: {} for x in self.group_fields}
+        self._lock = Lock()
+
+    def log(self, service: str, amount: Decimal, class_id: str, tokens: Optional[int] = None):
+        source_identifier, template_id = _expense_context.get()
+        entry = ExpenseEntry(service, amount, class_id, tokens, source_identifier, template_id)
+        with self._lock:
+            for group_field in self.group_fields:
+                totals = self._aggregates[group_field].setdefault(getattr(entry, group_field), {"amount": Decimal(0), "tokens": 0, "requests": 0})
+                totals["amount"] += amount
+                totals["tokens"] += tokens if tokens is not None else 0
+                totals["requests"] += 1
+        if self.writer is not None:
+            self.writer.put(entry)
+
+    def totals(self, group_by: str = "source_identifier") -> Dict[Optional[str], Dict[str, Any]]:
+        """
+        amount, tokens and number of requests by service, class_id, source_identifier or template_id
+        """
+        if group_by not in self.group_fields:
+            raise Exception(f"expenses can only be grouped by one of: {', '.join(self.group_fields)}")
+        with self._lock:
+            return {k: {**v} for k, v in self._aggregates[group_by].items()}
+
+    def flush(self):
+        # blocks until all entries logged so far are written to the sink
+        if self.writer is not None:
+            self.writer.flush()
+
+    def clear(self):
+        with self._lock:
+            self._aggregates = {x: {} for x in self.group_fields}
@@ -0,0 +1,60 @@
+from typing import *
+from collections import OrderedDict
+from threading import RLock
+
+from parsee.settings import chat_settings
+
+
+class FeatureStore:
+    """
+    Keeps computed features of document elements, so that they can be shared between feature builders (and models).
+    Entries are scoped by the source identifier of the document, a scope of None is used for features that do not depend on a document.
+    Only the most recently used documents are kept.
+    """
+
+    def __init__(self, max_documents: Optional[int] = None):
+        self.max_documents = chat_settings.max_documents_feature_store if max_documents is None else max_documents
+        self._scopes: OrderedDict[Optional[str], Dict[Hashable, any]] = OrderedDict()
+        self._lock = RLock()
+
+    def _scope(self, source_identifier: Optional[str]) -> Dict[Hashable, any]:
+        if source_identifier in self._scopes:
+            self._scopes.move_to_end(source_identifier)
+        else:
+            self._scopes[source_identifier] = {}
+            while len(self._scopes) > self.max_documents:
+                self._scopes.popitem(last=False)
+        return self._scopes[source_identifier]
+
+    def get(self, source_identifier: Optional[str], key: Hashable) -> Union[any, None]:
+        with self._lock:
+            if source_identifier not in self._scopes:
+                return None
+            return self._scope(source_identifier).get(key)
+
+    def set(self, source_identifier: Optional[str], key: Hashable, value: any):
+        with self._lock:
+            self._scope(source_identifier)[key] = value
+
+    def get_or_make(self, source_identifier: Optional[str], key: Hashable, make_fun: Callable[[], any]) -> any:
+        with self._lock:
+            scope = self._scope(source_identifier)
+            if key in scope:
+                return scope[key]
+        # computed without holding the lock, so that other threads are not blocked (if two threads compute the same feature, the first value is kept)
+        value = make_fun()
+        with self._lock:
+            return self._scope(source_identifier).setdefault(key, value)
+
+    def clear(self, source_identifier: Optional[str] = None):
+        with self._lock:
+            if source_identifier is None:
+                self._scopes = OrderedDict()
+            elif source_identifier in self._scopes:
+                del self._scopes[source_identifier]
+
+
+# shared by all feature builders that are not given a specific store
+shared_feature_store = FeatureStore()
+# features of the mapping tables (scoped by table), kept apart from the documents, so that documents with many tables don't evict the features of other documents
+shared_mapping_feature_store = FeatureStore(chat_settings.max_tables_mapping_feature_store)
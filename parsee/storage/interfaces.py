@@ -6,6 +6,9 @@ from functools import reduce
 from parsee.templates.job_template import JobTemplate
 from parsee.extraction.models.model_dataclasses import MlModelSpecification
 from parsee.storage.vector_stores.interfaces import VectorStore
+from parsee.storage.feature_store import FeatureStore, shared_feature_store
+from parsee.storage.document_cache import DocumentCache
+from parsee.storage.expense_ledger import ExpenseLedger
 from parsee.extraction.extractor_elements import FileReference
 from parsee.converters.image_creation import ImageCreator
 from parsee.extraction.extractor_dataclasses import Base64Image
@@ -16,16 +19,20 @@ class StorageManager:
 
     vector_store: VectorStore
     image_creator: ImageCreator
+    feature_store: FeatureStore
+    expense_ledger: ExpenseLedger
 
-    def __init__(self, vector_store: VectorStore, image_creator: ImageCreator):
+    def __init__(self, vector_store: VectorStore, image_creator: ImageCreator, feature_store: Optional[FeatureStore] = None, expense_ledger: Optional[ExpenseLedger] = None):
         self.vector_store = vector_store
         self.image_creator = image_creator
+        self.feature_store = shared_feature_store if feature_store is None else feature_store
+        self.expense_ledger = ExpenseLedger() if expense_ledger is None else expense_ledger
 
     def db_values_template(self, job_template: JobTemplate, strict: bool) -> JobTemplate:
         raise NotImplementedError
 
-    def log_expense(self, service: str, amount: Decimal, class_id: str):
-        raise NotImplementedError
+    def log_expense(self, service: str, amount: Decimal, class_id: str, tokens: Optional[int] = None):
+        self.expense_ledger.log(service, amount, class_id, tokens)
 
     def get_available_models(self) -> List[MlModelSpecification]:
         raise NotImplementedError
@@ -34,9 +41,11 @@ class StorageManager:
 class DocumentManager:
 
     storage: StorageManager
+    document_cache: DocumentCache
 
-    def __init__(self, storage: StorageManager):
+    def __init__(self, storage: StorageManager, document_cache: Optional[DocumentCache] = None):
         self.storage = storage
+        self.document_cache = DocumentCache() if document_cache is None else document_cache
 
     def _load_documents(self, references: List[FileReference], multimodal: bool, search_term: Optional[str], max_images: Optional[int], max_tokens: Optional[int], load_function: Callable, show_chunk_index: bool) -> Union[str, List[Base64Image]]:
         # find and load the most relevant documents
@@ -44,7 +53,7 @@ class DocumentManager:
         unique_identifiers = set([x.source_identifier for x in references])
         for source_identifier in self.storage.vector_store.sort_identifiers_by_relevance(unique_identifiers, search_term):
             total_added = 0
-            doc = load_function(source_identifier)
+            doc = self.document_cache.get_or_load(source_identifier, load_function)
             # check if all elements should be taken or not
             take_all = len([x for x in references if x.source_identifier == doc.source_identifier and x.element_index is None]) > 0
             if not take_all:
@@ -1,25 +1,36 @@
-from parsee.utils.helper import get_source_identifier
 from parsee.storage.interfaces import *
+from parsee.storage.source_identifier_registry import SourceIdentifierRegistry, shared_source_identifier_registry
 from parsee.extraction.extractor_elements import StandardDocumentFormat
 from parsee.converters.main import load_document
 
 
 class LocalFileManager(DocumentManager):
 
-    def __init__(self, storage: StorageManager, document_paths: List[str]):
-        super().__init__(storage)
-        self.source_identifier_to_paths = {}
-        for path in document_paths:
-            self.source_identifier_to_paths[get_source_identifier(path)] = path
+    registry: SourceIdentifierRegistry
+
+    def __init__(self, storage: StorageManager, document_paths: List[str], document_cache: Optional[DocumentCache] = None, registry: Optional[SourceIdentifierRegistry] = None):
+        super().__init__(storage, document_cache)
+        self.registry = shared_source_identifier_registry if registry is None else registry
+        self._identifiers_to_paths = {}
+        self._unresolved_paths = []
+        self.add_files(document_paths)
 
     def add_files(self, document_paths: List[str]):
-        for path in document_paths:
-            self.source_identifier_to_paths[get_source_identifier(path)] = path
+        # files are hashed in the background, the identifiers are only needed once documents are loaded
+        self._unresolved_paths += document_paths
+        self.registry.submit(document_paths)
+
+    @property
+    def source_identifier_to_paths(self) -> Dict[str, str]:
+        for path in self._unresolved_paths:
+            self._identifiers_to_paths[self.registry.get(path)] = path
+        self._unresolved_paths = []
+        return self._identifiers_to_paths
 
     def load_with_source_identifier(self, source_identifier: str) -> StandardDocumentFormat:
         if source_identifier not in self.source_identifier_to_paths:
             raise Exception("file not found")
-        return load_document(self.source_identifier_to_paths[source_identifier])
+        return load_document(self.source_identifier_to_paths[source_identifier], source_identifier)
 
     def load_documents(self, references: List[FileReference], multimodal: bool, search_term: Optional[str], max_images: Optional[int], max_tokens: Optional[int], show_chunk_index: bool = False) -> Union[str, List[Base64Image]]:
         return self._load_documents(references, multimodal, search_term, max_images, max_tokens, self.load_with_source_identifier, show_chunk_index)
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import atexit
+import weakref
+import tempfile
+from typing import *
+from threading import RLock
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from parsee.utils.helper import get_source_identifier
+from parsee.settings import chat_settings
+
+
+class SourceIdentifierRegistry:
+    """
+    Keeps the source identifiers (sha256 of the file contents) of local files, so that files are only hashed again if their size or modification time changed.
+    Files can be hashed in background threads; if a path is given, the identifiers are persisted as JSON (after all pending files were hashed, at most once
+    per save interval and at exit). Several processes can use the same path, entries of the other processes are kept when saving.
+    """
+
+    def __init__(self, registry_path: Optional[str] = None, max_workers: Optional[int] = None, save_interval: Optional[float] = None):
+        self.registry_path = chat_settings.source_identifier_registry_path if registry_path is None else registry_path
+        self.max_workers = chat_settings.max_workers_hashing if max_workers is None else max_workers
+        self.save_interval = chat_settings.source_identifier_registry_save_interval if save_interval is None else save_interval
+        # absolute path -> (size, mtime_ns, source identifier)
+        self._entries: Dict[str, Tuple[int, int, str]] = self._load()
+        self._pending: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._changed = False
+        self._last_save: Optional[float] = None
+        self._lock = RLock()
+        _registries.add(self)
+
+    def _load(self) -> Dict[str, Tuple[int, int, str]]:
+        if self.registry_path is None or not os.path.exists(self.registry_path):
+            return {}
+        with open(self.registry_path, "r") as f:
+            return {path: tuple(entry) for path, entry in json.load(f).items()}
+
+    @staticmethod
+    def _file_key(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _cached(self, path: str) -> Union[str, None]:
+        entry = self._entries.get(path)
+        if entry is not None and tuple(entry[0:2]) == self._file_key(path):
+            return entry[2]
+        return None
+
+    def _hash(self, path: str) -> str:
+        size, mtime_ns = self._file_key(path)
+        source_identifier = get_source_identifier(path)
+        with self._lock:
+            self._entries[path] = (size, mtime_ns, source_identifier)
+            self._changed = True
+        return source_identifier
+
+    def _hash_finished(self, path: str):
+        with self._lock:
+            self._pending.pop(path, None)
+            # files that are hashed one by one (without submitting them) would otherwise rewrite the whole registry for every file
+            if len(self._pending) == 0 and (self._last_save is None or time.monotonic() - self._last_save >= self.save_interval):
+                self.save()
+
+    def submit(self, paths: List[str]):
+        # start hashing files that are not known yet in background threads
+        with self._lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                if path in self._pending or self._cached(path) is not None:
+                    continue
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                future = self._executor.submit(self._hash, path)
+                self._pending[path] = future
+                future.add_done_callback(lambda _, p=path: self._hash_finished(p))
+
+    def get(self, path: str) -> str:
+        path = os.path.abspath(path)
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                source_identifier = self._cached(path)
+                if source_identifier is not None:
+                    return source_identifier
+        source_identifier = self._hash(path) if future is None else future.result()
+        # callbacks of futures might not have run yet when the result is available
+        self._hash_finished(path)
+        return source_identifier
+
+    def save(self):
+        with self._lock:
+            if self.registry_path is None or not self._changed:
+                return
+            entries = {**self._load(), **self._entries}
+            # a unique temporary file per save, so that processes saving at the same time never write into the same file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.registry_path)), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.registry_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._entries = entries
+            self._changed = False
+            self._last_save = time.monotonic()
+
+
+# all registries are saved at exit (entries hashed since the last save)
+_registries: weakref.WeakSet = weakref.WeakSet()
+
+
+def save_registries():
+    for registry in list(_registries):
+        registry.save()
+
+
+atexit.register(save_registries)
+
+# shared by all file managers and load_document if no specific registry is given
+shared_source_identifier_registry = SourceIdentifierRegistry()
@@ -15,8 +15,9 @@ from parsee.utils.enums import ElementType
 
 class SimpleNumpyStore(VectorStore):
 
-    def __init__(self):
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, encoder: Optional[Any] = None):
+        # any object with the encode method of the sentence transformers can be used as encoder
+        self.encoder = SentenceTransformer('all-MiniLM-L6-v2') if encoder is None else encoder
         self.min_chunk_size_characters = 1000
         self.k = 100
         self.indexes = {}
@@ -1,5 +1,6 @@
+from copy import copy
 from pydantic.dataclasses import dataclass
-from typing import Dict, Optional, List, Union
+from typing import Dict, Optional, List, Union, Any
 
 from parsee.templates.element_schema import ElementDetectionSchema
 from parsee.templates.general_structuring_schema import GeneralQuerySchema, StructuringItemSchema
@@ -27,5 +28,35 @@ class JobTemplate:
         for item in self.meta:
             item.model = model.model_id
 
+    def with_model(self, model_id: str, questions_settings: Optional[Dict[str, Any]] = None, detection_settings: Optional[Dict[str, Any]] = None) -> "JobTemplate":
+        """
+        copy of the template where all items use the given model and the settings are extended, this template is not changed.
+        Only the template, schemas and items are copied (shallow), all other values (e.g. the settings values and lists of the items) are shared with this template.
+        """
+        template = copy(self)
+        template.questions = copy(self.questions)
+        template.questions.items = [_with_values(x, model=model_id) for x in self.questions.items]
+        template.questions.settings = {**self.questions.settings, **(questions_settings if questions_settings is not None else {})}
+        template.detection = copy(self.detection)
+        template.detection.items = [_with_values(x, model=model_id, mappingModel=model_id) for x in self.detection.items]
+        template.detection.settings = {**self.detection.settings, **(detection_settings if detection_settings is not None else {})}
+        template.meta = [_with_values(x, model=model_id) for x in self.meta]
+        return template
+
+    def compile(self, model_loader: Any, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        creates the models and lookups of the template once (returns an ExecutionPlan), the plan can then be run for many documents
+        """
+        # imported here, as the extraction modules depend on the templates
+        from parsee.extraction.execution_plan import ExecutionPlan
+        return ExecutionPlan(self, model_loader, params)
+
     def to_json_dict(self) -> Dict:
-        return {"id": self.id, "title": self.title, "description": self.description, "questions": self.questions.to_json_dict(), "detection": self.detection.to_json_dict(), "meta": [x.to_json_dict() for x in self.meta]}
\ No newline at end of file
+        return {"id": self.id, "title": self.title, "description": self.description, "questions": self.questions.to_json_dict(), "detection": self.detection.to_json_dict(), "meta": [x.to_json_dict() for x in self.meta]}
+
+
+def _with_values(item: Any, **values) -> Any:
+    item_new = copy(item)
+    for key, value in values.items():
+        setattr(item_new, key, value)
+    return item_new
@@ -56,3 +56,4 @@ class ModelType(Enum):
     COHERE = "cohere"
     MISTRAL = "mistral"
     GOOGLE = "google"
+    MOCK = "mock"
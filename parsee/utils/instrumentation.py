@@ -0,0 +1,110 @@
+import time
+from typing import *
+from dataclasses import dataclass
+from contextlib import contextmanager
+from threading import Lock
+
+
+@dataclass
+class StageTiming:
+    name: str
+    start: float
+    duration: float
+    attributes: Dict[str, Any]
+
+
+class InstrumentationHook:
+    """
+    Receives the timings of the stages of the extraction and chat pipelines (e.g. conversion, retrieval, prompt_build, tokenization, llm_request, parse).
+    """
+
+    def on_stage(self, timing: StageTiming):
+        raise NotImplementedError
+
+
+class InMemoryCollector(InstrumentationHook):
+
+    def __init__(self):
+        self.timings: List[StageTiming] = []
+        self._lock = Lock()
+
+    def on_stage(self, timing: StageTiming):
+        with self._lock:
+            self.timings.append(timing)
+
+    def clear(self):
+        with self._lock:
+            self.timings = []
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        number of calls, total seconds and the sums of all numeric attributes (e.g. tokens, cost, cache hits) by stage
+        """
+        output = {}
+        with self._lock:
+            for timing in self.timings:
+                entry = output.setdefault(timing.name, {"count": 0, "seconds": 0.0})
+                entry["count"] += 1
+                entry["seconds"] += timing.duration
+                for key, value in timing.attributes.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        entry[key] = entry.get(key, 0) + value
+        return output
+
+
+class OpenTelemetryHook(InstrumentationHook):
+    """
+    Emits every stage as a span of an OpenTelemetry tracer (requires the opentelemetry-api package).
+    """
+
+    def __init__(self, tracer: Optional[Any] = None):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise Exception("opentelemetry-api has to be installed to use the OpenTelemetryHook")
+            tracer = trace.get_tracer("parsee")
+        self.tracer = tracer
+
+    def on_stage(self, timing: StageTiming):
+        attributes = {k: v for k, v in timing.attributes.items() if isinstance(v, (str, bool, int, float))}
+        span = self.tracer.start_span(f"parsee.{timing.name}", start_time=int(timing.start * 1e9), attributes=attributes)
+        span.end(end_time=int((timing.start + timing.duration) * 1e9))
+
+
+_hooks: List[InstrumentationHook] = []
+_hooks_lock = Lock()
+
+
+def add_hook(hook: InstrumentationHook):
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: InstrumentationHook):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def is_enabled() -> bool:
+    # attributes that are expensive to compute should only be added if a hook is registered
+    return len(_hooks) > 0
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """
+    times the enclosed code, attributes can also be added to the yielded dict inside of the block
+    """
+    if not is_enabled():
+        yield attributes
+        return
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        timing = StageTiming(name, start_wall, time.perf_counter() - start, attributes)
+        for hook in list(_hooks):
+            hook.on_stage(timing)
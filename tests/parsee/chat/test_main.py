@@ -1,10 +1,15 @@
+import time
 from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from threading import Lock
+from types import SimpleNamespace
 from typing import Any
 
 from tenacity import RetryError, Future
 
-from parsee.chat.custom_dataclasses import Message
-from parsee.chat.main import run_chat_with_fallback
+from parsee.chat.custom_dataclasses import Message, SinglePageProcessingSettings
+from parsee.chat.main import run_chat_with_fallback, run_chat
 from parsee.converters.image_creation import DiskImageCreator
 from parsee.storage.in_memory_storage import InMemoryStorageManager
 from parsee.storage.local_file_manager import LocalFileManager
@@ -40,3 +45,39 @@ def test_run_chat_with_fallback(monkeypatch):
                            spec_successes, False)
     assert result[0].text == "Success 1"
 
+
+
+class MockPageModel:
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.prompts = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = Lock()
+        self.make_prompt_request = lru_cache(maxsize=None)(self._make_prompt_request)
+
+    def _make_prompt_request(self, prompt):
+        with self.lock:
+            self.prompts.append(prompt)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return f"answer {prompt.available_data[0]}", Decimal(1)
+
+
+def test_run_chat_pages_parallel(monkeypatch):
+    """Pages should be processed concurrently (up to the limit) and merged in the order of the pages."""
+    spec = SimpleNamespace(model_id="mock", multimodal=True, max_images=None)
+    model = MockPageModel(spec)
+    monkeypatch.setattr("parsee.chat.main.get_llm_base_model", lambda x: model)
+    document_manager = SimpleNamespace(load_documents=lambda *args: [f"page{k}" for k in range(0, 10)])
+    settings = SinglePageProcessingSettings(max_images_trigger=3, merge_strategy=lambda answers: "|".join(answers), parallel=True, max_concurrent_pages=3)
+
+    output = run_chat(Message(text="Test", references=[], author=None, cost=None), [], document_manager, spec, True, False, settings)
+    assert output[0].text == "|".join([f"answer page{k}" for k in range(0, 10)])
+    assert output[0].cost == 10
+    assert 1 < model.max_running <= 3
+    assert all("Your last answer" not in x.additional_info for x in model.prompts)
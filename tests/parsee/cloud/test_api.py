@@ -0,0 +1,162 @@
+import re
+import json
+import time
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import cv2
+import numpy as np
+import pytest
+
+from parsee.cloud.api import ParseeCloud, RequestType
+from parsee.extraction.extractor_dataclasses import AssignedAnswer
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # keep connections alive, so that the pooled session can reuse them
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.connections.add(self.client_address)
+            failures_left = server.failures_left
+            server.failures_left = max(failures_left - 1, 0)
+        if failures_left > 0:
+            self._send(server.failure_status, b"")
+        elif self.path.startswith("/api/document/images"):
+            page_index = int(self.path.split("page-index=")[1])
+            time.sleep(0.2)
+            # the width of the image identifies the page
+            _, image = cv2.imencode(".jpg", np.zeros((10, 10 + page_index, 3), dtype=np.uint8))
+            self._send(200, image.tobytes(), "image/jpeg")
+        else:
+            self._send(200, json.dumps({"path": self.path}).encode("utf-8"))
+
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            self.server.requests.append(self.path)
+            failures_left = self.server.failures_left
+            self.server.failures_left = max(failures_left - 1, 0)
+        if failures_left > 0:
+            self._send(self.server.failure_status, b"")
+        elif self.path == "/disconnect":
+            # connection is lost after the request was received
+            self.close_connection = True
+        elif self.path.startswith("/api/document/upload"):
+            file_name = re.search(rb'filename="([^"]+)"', body).group(1).decode("utf-8")
+            if file_name.startswith("unsupported"):
+                self._send(415, b"unsupported file type")
+                return
+            self._send(200, json.dumps([{"identifier": f"id-{file_name}"}]).encode("utf-8"))
+        elif json.loads(body)["itemId"] == "invalid":
+            self._send(400, b"invalid item")
+        else:
+            self._send(200, b"")
+
+
+@pytest.fixture
+def stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.connections = set()
+    server.failures_left = 0
+    server.failure_status = 503
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_with_backoff(stand_in_server):
+    """Transient errors should be retried until the request succeeds or no retries are left."""
+    cloud = ParseeCloud("key", f"http://127.0.0.1:{stand_in_server.server_port}", max_retries=3, backoff_factor=0.01)
+    stand_in_server.failures_left = 2
+    assert cloud._get_response(cloud.host + "/test").json() == {"path": "/test"}
+    assert len(stand_in_server.requests) == 3
+    # keep-alive connections of the session are reused
+    assert len(stand_in_server.connections) == 1
+
+    stand_in_server.failures_left = 5
+    assert cloud._get_response(cloud.host + "/test").status_code == 503
+    assert len(stand_in_server.requests) == 7
+
+
+def test_post_requests_only_retried_if_not_processed(stand_in_server):
+    """POST requests should not be retried on server errors or lost connections (they may have been processed), but on 429 and errors while connecting."""
+    cloud = ParseeCloud("key", f"http://127.0.0.1:{stand_in_server.server_port}", max_retries=3, backoff_factor=0.01)
+    stand_in_server.failures_left = 2
+    assert cloud._make_request(cloud.host + "/test", RequestType.POST, {"itemId": "item"}).status_code == 503
+    assert len(stand_in_server.requests) == 1
+
+    stand_in_server.failures_left = 2
+    stand_in_server.failure_status = 429
+    assert cloud._make_request(cloud.host + "/test", RequestType.POST, {"itemId": "item"}).status_code == 200
+    assert len(stand_in_server.requests) == 4
+
+    # requests that may have been received by the server are not retried, only requests that could not be sent
+    assert cloud._make_request(cloud.host + "/disconnect", RequestType.POST, {"itemId": "item"}) is None
+    assert len(stand_in_server.requests) == 5
+    calls = []
+    post = cloud.session.post
+    cloud.session.post = lambda *args, **kwargs: calls.append(args) or post(*args, **kwargs)
+    assert cloud._make_request("http://127.0.0.1:1/test", RequestType.POST, {"itemId": "item"}) is None
+    assert len(calls) == 4
+
+    # explicitly idempotent requests are retried on any transient error
+    stand_in_server.failures_left = 2
+    stand_in_server.failure_status = 503
+    assert cloud._make_request(cloud.host + "/test", RequestType.POST, {"itemId": "item"}, idempotent=True).status_code == 200
+    assert len(stand_in_server.requests) == 8
+
+
+def test_images_fetched_concurrently(stand_in_server):
+    """Page images should be downloaded in parallel and returned in the order of the pages."""
+    cloud = ParseeCloud("key", f"http://127.0.0.1:{stand_in_server.server_port}", max_workers=8)
+    start = time.time()
+    images = cloud.get_images("doc", list(range(0, 8)), None)
+    assert time.time() - start < 1.0
+    widths = [cv2.imdecode(np.frombuffer(base64.b64decode(x.data), dtype=np.uint8), cv2.IMREAD_COLOR).shape[1] for x in images]
+    assert widths == [10 + k for k in range(0, 8)]
+
+
+def test_bulk_uploads(stand_in_server, tmp_path):
+    """Answers and files should be uploaded concurrently with a result for each entry."""
+    cloud = ParseeCloud("key", f"http://127.0.0.1:{stand_in_server.server_port}", max_retries=0)
+    answers = [("template", f"doc{k}", AssignedAnswer("invalid" if k == 3 else "item", str(k), [], [])) for k in range(0, 10)]
+    results = cloud.upload_assigned_answers(answers)
+    assert [x.item for x in results] == [x[2] for x in answers]
+    assert [k for k, x in enumerate(results) if not x.successful] == [3]
+    assert (results[3].status_code, results[3].error) == (400, "invalid item")
+    assert not cloud.add_assigned_answers("template", "doc", [x[2] for x in answers])
+
+    file_paths = []
+    for k in range(0, 4):
+        file_paths.append(str(tmp_path / f"file{k}.pdf"))
+        with open(file_paths[-1], "wb") as f:
+            f.write(b"content")
+    with open(str(tmp_path / "unsupported.xyz"), "wb") as f:
+        f.write(b"content")
+    results = cloud.upload_files(file_paths + [str(tmp_path / "missing.pdf"), str(tmp_path / "unsupported.xyz")])
+    assert [x.value for x in results[0:4]] == [f"id-file{k}.pdf" for k in range(0, 4)]
+    assert [x.status_code for x in results[0:4]] == [200] * 4
+    assert not results[4].successful
+    assert (results[5].successful, results[5].status_code, results[5].error) == (False, 415, "unsupported file type")
+    with pytest.raises(Exception, match="415"):
+        cloud.upload_file(str(tmp_path / "unsupported.xyz"))
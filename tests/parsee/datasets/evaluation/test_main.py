@@ -0,0 +1,105 @@
+import os
+from types import SimpleNamespace
+from threading import Lock
+
+from parsee.datasets.evaluation import main
+from parsee.datasets.evaluation.main import evaluate_llm_performance, EvaluationResult
+from parsee.datasets.dataset_dataclasses import DatasetRow
+from parsee.datasets.readers.disk_reader import SimpleCsvDiskReader
+from parsee.datasets.writers.disk_writer import CsvDiskWriter
+from parsee.extraction.extractor_dataclasses import ParseeAnswer, ParseeMeta
+from parsee.utils.enums import ModelType
+
+
+class MockQuestionModel:
+
+    def __init__(self, model_id: str, calls: list):
+        self.model_id = model_id
+        self.calls = calls
+        self.lock = Lock()
+
+    def parse_prompt_answer(self, item, prompt_answer, total_elements, document):
+        return [ParseeAnswer(self.model_id, [], item.id, prompt_answer, prompt_answer, True, [])]
+
+    def predict_for_prompt(self, prompt, item, total_elements, document):
+        with self.lock:
+            self.calls.append((self.model_id, prompt.main_task))
+        return self.parse_prompt_answer(item, prompt.main_task.replace("prompt", "answer"), None, None)
+
+
+def make_dataset(tmp_path) -> str:
+    writer = CsvDiskWriter(str(tmp_path), False)
+    rows = []
+    for k in range(0, 10):
+        row = DatasetRow(f"doc{k}", "template", "q1", {"full_prompt": f"prompt {k}"})
+        row.assign_truth_values({"assigned": f"answer {k}"})
+        rows.append(row)
+    writer.write_rows(rows, "dataset")
+    writer.finish_writing()
+    return writer.full_paths["dataset"]
+
+
+def test_evaluate_parallel_and_resume(tmp_path, monkeypatch):
+    """Models should be built once, answers written in order and rows of a partially written answers file not predicted again."""
+    calls = []
+    built = []
+
+    def mock_get_question_model(self, model_id, items, all_meta_items, params):
+        built.append(model_id)
+        return MockQuestionModel(model_id, calls)
+
+    monkeypatch.setattr(main.ModelLoader, "get_question_model", mock_get_question_model)
+    dataset_path = make_dataset(tmp_path)
+    template = SimpleNamespace(questions=SimpleNamespace(items=[SimpleNamespace(id="q1")]), meta=[])
+    models = [SimpleNamespace(model_id=model_id, model_type=ModelType.GPT, multimodal=False) for model_id in ["m1", "m2"]]
+
+    # first run is interrupted after 4 rows
+    reader = SimpleCsvDiskReader(dataset_path)
+    reader.reassign_indices(reader.indices[:4])
+    os.mkdir(os.path.join(tmp_path, "partial"))
+    writer = CsvDiskWriter(os.path.join(tmp_path, "partial"), False)
+    evaluate_llm_performance(template, reader, models, SimpleNamespace(), writer, max_workers=3)
+    assert built == ["m1", "m2"]
+    assert len(calls) == 8
+    # rows are on disk before the writer is closed, a row cut off by a killed process is skipped on resume
+    with open(writer.full_paths["dataset_with_answers"], "a") as f:
+        f.write("doc4,template")
+    assert len(list(SimpleCsvDiskReader(writer.full_paths["dataset_with_answers"]).row_generator())) == 4
+    writer.finish_writing()
+
+    calls.clear()
+    os.mkdir(os.path.join(tmp_path, "final"))
+    writer = CsvDiskWriter(os.path.join(tmp_path, "final"), False)
+    result = evaluate_llm_performance(template, SimpleCsvDiskReader(dataset_path), models, SimpleNamespace(), writer, max_workers=3, max_concurrent_per_provider={ModelType.GPT: 2}, resume_reader=SimpleCsvDiskReader(os.path.join(tmp_path, "partial", "dataset_with_answers.csv")))
+    writer.finish_writing()
+    assert sorted(calls) == sorted([(model_id, f"prompt {k}") for k in range(4, 10) for model_id in ["m1", "m2"]])
+    assert result["m1"]["total_correct_percent"] == 1 and result["m2"]["total_correct_percent"] == 1
+    rows = [row for row, _ in SimpleCsvDiskReader(writer.full_paths["dataset_with_answers"]).row_generator()]
+    assert [row.source_identifier for row in rows] == [f"doc{k}" for k in range(0, 10)]
+    assert all(row.get_value("m1", False) == row.get_value("assigned", False) for row in rows)
+
+
+def test_evaluation_breakdowns():
+    """Scores should be available per class and per meta item, with confidence intervals over the sources."""
+    ev = EvaluationResult(None, None)
+    for k in range(0, 10):
+        currency = ParseeMeta("assigned", 0, [], "currency", "USD", 1)
+        ev.add_answers(f"doc{k}", [ParseeAnswer("assigned", [], "total", str(k), "", True, [currency]), ParseeAnswer("assigned", [], "issuer", "A", "", True, [])], True)
+        # model gets the total right for even documents, the currency only for the first half
+        predicted_currency = ParseeMeta("m1", 0, [], "currency", "USD" if k < 5 else "EUR", 1)
+        ev.add_answers(f"doc{k}", [ParseeAnswer("m1", [], "total", str(k) if k % 2 == 0 else "x", "", True, [predicted_currency]), ParseeAnswer("m1", [], "issuer", "A", "", True, [])], False)
+
+    scores = ev.evaluate()
+    assert scores["m1"]["total_correct"] == 15
+    assert scores["m1"]["total_correct_meta_found"] == 5
+    assert scores["m1"]["total_correct_percent"] == 0.75
+
+    by_class = ev.evaluate_by_class()
+    assert by_class["m1"]["total"]["total_correct_percent"] == 0.5
+    assert by_class["m1"]["issuer"]["total_correct_percent"] == 1
+
+    assert ev.evaluate_by_meta()["m1"]["currency"] == {"total_correct": 5, "total": 10, "total_correct_percent": 0.5}
+
+    lower, upper = ev.bootstrap_confidence_intervals(500, 0.9, seed=1)["m1"]
+    assert 0.5 <= lower <= 0.75 <= upper <= 1
+    assert ev.bootstrap_confidence_intervals(10, seed=1)["assigned"] == (1, 1)
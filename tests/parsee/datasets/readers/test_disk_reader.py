@@ -0,0 +1,82 @@
+import os
+
+from parsee.datasets.dataset_dataclasses import DatasetRow
+from parsee.datasets.readers import disk_reader
+from parsee.datasets.readers.disk_reader import SimpleCsvDiskReader, IndexedCsvDiskReader, ParquetDiskReader
+from parsee.datasets.writers.disk_writer import CsvDiskWriter, ParquetDiskWriter
+
+
+def make_dataset(tmp_path, num_rows: int) -> str:
+    writer = CsvDiskWriter(str(tmp_path), False)
+    rows = []
+    for k in range(0, num_rows):
+        row = DatasetRow(f"doc{k}", "template", "q1", {"full_prompt": f"prompt {k}\nwith \"quotes\", commas\nand äöü"})
+        row.assign_truth_values({"assigned": f"answer {k}"})
+        rows.append(row)
+    writer.write_rows(rows, "dataset")
+    writer.finish_writing()
+    return writer.full_paths["dataset"]
+
+
+def row_values(reader) -> list:
+    return [(idx, row.source_identifier, row.get_feature("full_prompt"), row.get_value("assigned", False)) for row, idx in reader.row_generator()]
+
+
+def test_indexed_reader(tmp_path, monkeypatch):
+    """Rows read via the byte offset index should match a full scan of the file, the index should be saved and reused."""
+    dataset_path = make_dataset(tmp_path, 20)
+    reader = IndexedCsvDiskReader(dataset_path)
+    assert os.path.exists(dataset_path + ".index.npy")
+    assert [x[1:] for x in row_values(reader)] == [x[1:] for x in row_values(SimpleCsvDiskReader(dataset_path))]
+    assert [x.col_name for x in reader.get_columns()] == [x.col_name for x in SimpleCsvDiskReader(dataset_path).get_columns()]
+
+    def fail_build(self):
+        raise Exception("index should not be rebuilt")
+
+    monkeypatch.setattr(disk_reader.IndexedCsvDiskReader, "_build_index", fail_build)
+    reader = IndexedCsvDiskReader(dataset_path)
+    reader.reassign_indices([17, 3, 4])
+    assert [x[0:2] for x in row_values(reader)] == [(3, "doc2"), (4, "doc3"), (17, "doc16")]
+
+    reader = IndexedCsvDiskReader(dataset_path)
+    reader.shuffle(1)
+    shuffled = [x[0] for x in row_values(reader)]
+    assert shuffled != list(range(1, 21)) and sorted(shuffled) == list(range(1, 21))
+
+    shards = []
+    for shard_index in range(0, 3):
+        reader = IndexedCsvDiskReader(dataset_path)
+        reader.shard(3, shard_index)
+        shards += [x[0] for x in row_values(reader)]
+    assert sorted(shards) == list(range(1, 21))
+
+
+def test_index_rebuilt_for_changed_file(tmp_path):
+    """An index of a file that changed in the meantime should not be used."""
+    dataset_path = make_dataset(tmp_path, 5)
+    assert len(row_values(IndexedCsvDiskReader(dataset_path))) == 5
+    os.remove(dataset_path)
+    make_dataset(tmp_path, 8)
+    assert [x[1] for x in row_values(IndexedCsvDiskReader(dataset_path))] == [f"doc{k}" for k in range(0, 8)]
+
+
+def test_parquet_dataset(tmp_path):
+    """Datasets written as parquet should be read back with the same values, optionally only with some of the columns."""
+    csv_path = make_dataset(tmp_path, 10)
+    writer = ParquetDiskWriter(str(tmp_path), False, row_group_size=3)
+    rows = [row for row, _ in SimpleCsvDiskReader(csv_path).row_generator()]
+    for row in rows:
+        row.assign_truth_values({"other": "x"})
+        writer.write_rows([row], "dataset")
+    writer.finish_writing()
+
+    reader = ParquetDiskReader(writer.full_paths["dataset"])
+    assert [x[1:] for x in row_values(reader)] == [x[1:] for x in row_values(SimpleCsvDiskReader(csv_path))]
+    assert [row.to_list() for row, _ in reader.row_generator()] == [row.to_list() for row in rows]
+
+    reader = ParquetDiskReader(writer.full_paths["dataset"], ["full_prompt", "assigned"])
+    reader.reassign_indices([2, 5, 9])
+    projected = [row for row, _ in reader.row_generator()]
+    assert [row.source_identifier for row in projected] == ["doc1", "doc4", "doc8"]
+    assert projected[0].get_value("other", False) is None
+    assert projected[0].get_value("assigned", False) == "answer 1"
@@ -0,0 +1,40 @@
+from parsee.datasets.main import create_dataset, create_dataset_rows
+from parsee.datasets.readers.disk_reader import SimpleCsvDiskReader
+from parsee.datasets.writers.disk_writer import CsvDiskWriter
+from parsee.extraction.extractor_elements import StandardDocumentFormat, ExtractedEl
+from parsee.extraction.extractor_dataclasses import ExtractedSource, AssignedAnswer
+from parsee.storage.interfaces import StorageManager
+from parsee.storage.in_memory_storage import InMemoryStorageManager
+from parsee.templates.helpers import StructuringItem, create_template
+from parsee.utils.enums import DocumentType, ElementType, OutputType, SearchStrategy
+
+
+class MockStorage(InMemoryStorageManager):
+
+    def __init__(self):
+        # no vector store needed for the tests
+        StorageManager.__init__(self, None, None)
+        self.models = []
+        self.truth_questions = []
+        self.truth_locations = []
+
+
+def make_document(k: int) -> StandardDocumentFormat:
+    elements = [ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.TEXT, None, None, 0, None), f"Invoice {k}, total: {k * 10} USD")]
+    return StandardDocumentFormat(DocumentType.TEXT, f"doc{k}", elements, None)
+
+
+def test_create_dataset(tmp_path):
+    """Rows created for a corpus by a pool of workers should be the same as for single documents and written in order."""
+    item = StructuringItem("What is the invoice total?", OutputType.NUMERIC, assigned_id="total")
+    item.searchStrategy = SearchStrategy.START
+    template = create_template([item])
+    corpus = [(make_document(k), [AssignedAnswer("total", str(k * 10), [], [])]) for k in range(0, 6)]
+
+    writer = CsvDiskWriter(str(tmp_path), False)
+    assert create_dataset(template, iter(corpus), writer, num_workers=2, storage_factory=MockStorage, max_pending=3) == 6
+    writer.finish_writing()
+
+    # values are written as strings
+    expected = [["" if x is None else x for x in row.to_list()] for document, answers in corpus for row in create_dataset_rows(template, document, answers, MockStorage())]
+    assert [row.to_list() for row, _ in SimpleCsvDiskReader(writer.full_paths["dataset"]).row_generator()] == expected
@@ -0,0 +1,47 @@
+from tenacity import RetryError
+
+from parsee import mock_config
+from parsee.extraction.extractor_elements import StandardDocumentFormat, ExtractedEl
+from parsee.extraction.extractor_dataclasses import ExtractedSource
+from parsee.extraction.models.llm_models.prompts import Prompt
+from parsee.extraction.models.model_loader import get_llm_base_model
+from parsee.extraction.tasks.questions.question_model_llm import LLMQuestionModel
+from parsee.storage.interfaces import StorageManager
+from parsee.templates.helpers import StructuringItem, OutputType
+from parsee.utils.enums import DocumentType, ElementType, SearchStrategy
+
+
+def test_canned_answers_are_parsed():
+    """The answers derived from the prompt examples should be parsed by the question models, with sources from the actual document."""
+    item = StructuringItem("What is the revenue?", OutputType.NUMERIC, assigned_id="revenue")
+    item.searchStrategy = SearchStrategy.START
+    elements = [ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.PDF, None, None, k, {"page_idx": 0}), f"revenue was {k * 100}") for k in range(0, 3)]
+    document = StandardDocumentFormat(DocumentType.PDF, "doc", elements, None)
+    storage = StorageManager(None, None)
+    model = LLMQuestionModel([item], [], storage, get_llm_base_model(mock_config(model_name="mock-questions")))
+    answers = model.predict_answers(document)
+    assert len(answers) == 1
+    assert answers[0].class_id == "revenue"
+    assert [x.element_index for x in answers[0].sources] == [0]
+    assert storage.expense_ledger.totals("class_id")["revenue"]["tokens"] > 0
+
+
+def test_configured_answers_and_determinism():
+    """Configured answers should be used if their key is in the prompt, the same settings should always give the same answers."""
+    spec = mock_config(model_name="mock-configured", answers={"capital of France": "Paris"}, latency_mean=0.01, latency_std=0.01, seed=1)
+    model = get_llm_base_model(spec)
+    assert model.make_prompt_request(Prompt(None, "What is the capital of France?", available_data="123"))[0] == "Paris"
+    assert model.make_prompt_request(Prompt(None, "Something else?", available_data="123"))[0] == "mock answer"
+    # attempts are only tracked until a request gets through
+    assert model._attempts == {}
+    assert model._random("abc", 0).random() == get_llm_base_model(mock_config(model_name="mock-other", seed=1))._random("abc", 0).random()
+
+
+def test_injected_rate_limits_are_retried():
+    """Injected rate limit errors should be retried as configured in the settings."""
+    model = get_llm_base_model(mock_config(model_name="mock-rate-limited", rate_limit_probability=1))
+    try:
+        model.make_prompt_request(Prompt(None, "What is the capital of France?", available_data="123"))
+    except RetryError:
+        pass
+    assert model._call_api.statistics["attempt_number"] == 2
@@ -1,8 +1,11 @@
-from parsee import ollama_config
+from concurrent.futures import ThreadPoolExecutor
+
+from parsee import ollama_config, mock_config
 from parsee.chat.custom_dataclasses import Message
 from parsee.extraction.extractor_dataclasses import Base64Image
 from parsee.extraction.models.llm_models.prompts import Prompt
-from parsee.extraction.models.model_loader import get_llm_base_model
+from parsee.extraction.models.model_loader import get_llm_base_model, clear_llm_base_models
+from parsee.extraction.models.llm_models.llm_base_model import make_prompt_request_with_tokens
 
 
 class MockOllamaClient:
@@ -40,3 +43,49 @@ def test_make_prompt_request__with_cache_list_argument(monkeypatch):
     prompt = Prompt(None, f"{message}", available_data=[Base64Image("jpeg", "abc")], history=[])
     model.make_prompt_request(prompt)
     assert model.make_prompt_request.cache_info().hits == 1
+
+
+def test_models_reused_per_spec(monkeypatch):
+    """Models with the same specification should be created once per process, also when requested from several threads."""
+    clients = []
+    monkeypatch.setattr("parsee.extraction.models.llm_models.model_collection.ollama_model.Client",
+                        lambda host: clients.append(host) or MockOllamaClient(host))
+    clear_llm_base_models()
+
+    def make_spec(model_name: str = "llama3"):
+        spec = ollama_config(model_name)
+        spec.only_questions = ["q1"]
+        spec.stats = {"accuracy": 0.9}
+        return spec
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        models = list(executor.map(lambda _: get_llm_base_model(make_spec()), range(0, 16)))
+    assert len(set(id(x) for x in models)) == 1
+    assert len(clients) == 1
+    spec = make_spec()
+    spec.temperature = 1
+    assert get_llm_base_model(spec) is not models[0]
+    # the rate limits are part of the specification
+    assert get_llm_base_model(make_spec("llama3-limited")).rate_limiter.requests_per_minute is None
+    spec = make_spec("llama3-limited")
+    spec.requests_per_minute = 10
+    spec.tokens_per_minute = 1000
+    model = get_llm_base_model(spec)
+    assert model is not get_llm_base_model(make_spec("llama3-limited"))
+    assert (model.rate_limiter.requests_per_minute, model.rate_limiter.tokens_per_minute) == (10, 1000)
+    clear_llm_base_models()
+
+
+def test_cache_hits_per_thread():
+    """Cache hits should be detected from the usage of the current thread, not from the counter shared by all threads."""
+    model = get_llm_base_model(mock_config(model_name="mock-cache-hits"))
+
+    def request(k: int) -> bool:
+        prompt = Prompt(None, f"What is the answer to question {k}?", available_data="123")
+        return make_prompt_request_with_tokens(model, prompt)[2] is None
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = list(executor.map(request, range(0, 4)))
+    assert first == [False] * 4
+    assert not request(5)
+    assert request(5)
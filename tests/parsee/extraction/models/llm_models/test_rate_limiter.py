@@ -0,0 +1,81 @@
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from parsee import ollama_config
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel
+from parsee.extraction.models.llm_models.rate_limiter import RateLimiter, get_rate_limiter, report_rate_limit
+
+
+def test_token_budget_shared_between_threads():
+    """Requests of all threads should be spread so that the tokens per minute are not exceeded."""
+    # 1200 tokens per minute, i.e. 20 tokens per second after the first minute of budget is used
+    limiter = RateLimiter(None, 1200)
+    limiter.acquire(1200)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: limiter.acquire(5), range(0, 4)))
+    assert 0.8 < time.monotonic() - start < 2
+
+
+def test_slow_down_after_rate_limit():
+    """Rate limit errors should pause the requests (using the retry-after header) and reduce the rate."""
+    limiter = RateLimiter(6000, None)
+    start = time.monotonic()
+    limiter.report_rate_limit({"retry-after": "0.5", "x-ratelimit-remaining-requests": "0"})
+    assert limiter.factor == 0.5
+    limiter.acquire()
+    assert time.monotonic() - start > 0.5
+
+    spec = ollama_config("rate-limited-model")
+    spec.requests_per_minute = 100
+    assert get_rate_limiter(spec) is get_rate_limiter(ollama_config("rate-limited-model"))
+    assert get_rate_limiter(spec).requests_per_minute == 100
+
+
+def test_changed_limits_keep_the_budgets():
+    """Specs with different limits for the same model should not refill the shared limiter, limits not configured in a spec are kept."""
+    spec = ollama_config("changed-limits-model")
+    spec.requests_per_minute = 60
+    limiter = get_rate_limiter(spec)
+    for _ in range(0, 60):
+        limiter.acquire()
+
+    spec = ollama_config("changed-limits-model")
+    spec.requests_per_minute = 120
+    assert get_rate_limiter(spec) is limiter
+    assert limiter.requests_per_minute == 120
+    assert limiter.requests_available < 1
+
+    spec.requests_per_minute = 30
+    get_rate_limiter(spec)
+    get_rate_limiter(ollama_config("changed-limits-model"))
+    assert limiter.requests_per_minute == 30
+    assert limiter.requests_available < 1
+
+
+def test_retries_acquire_and_unused_tokens_are_released():
+    """Retries should wait for the budgets again, only errors with status 429 should slow down the requests, unused answer tokens should be returned."""
+    model = LLMBaseModel(ollama_config("retried-model"))
+    model.rate_limiter = RateLimiter(6000, 1000)
+    model._usage.tokens_reserved = 100
+
+    def retry_state(exception):
+        return SimpleNamespace(args=[model], outcome=SimpleNamespace(exception=lambda: exception))
+
+    report_rate_limit(retry_state(SimpleNamespace(status_code=500)))
+    assert model.rate_limiter.factor == 1.0
+    assert 899 <= model.rate_limiter.tokens_available <= 901
+
+    start = time.monotonic()
+    report_rate_limit(retry_state(SimpleNamespace(status_code=429, response=SimpleNamespace(headers={"retry-after": "0.3", "x-ratelimit-remaining-tokens": "500"}))))
+    assert time.monotonic() - start > 0.3
+    assert model.rate_limiter.factor < 0.6
+    assert 395 <= model.rate_limiter.tokens_available <= 405
+
+    model.rate_limiter.release(100)
+    assert 495 <= model.rate_limiter.tokens_available <= 505
+    with pytest.raises(Exception):
+        RateLimiter(0, None)
@@ -0,0 +1,43 @@
+from parsee.extraction.extractor_elements import ExtractedEl, StructuredTable, StructuredRow, StructuredTableCell, get_text_distance
+from parsee.extraction.extractor_dataclasses import ExtractedSource
+from parsee.extraction.tasks.element_classification.features import ElementContextIndex, LocationFeatureBuilder
+from parsee.storage.feature_store import FeatureStore
+from parsee.utils.enums import DocumentType, ElementType
+
+
+def make_document() -> list:
+    elements = []
+    for k, entry in enumerate(["one two three", None, "four five", "six", None, "seven eight"]):
+        source = ExtractedSource(DocumentType.PDF, None, None, k, None)
+        if entry is None:
+            elements.append(StructuredTable(source, [StructuredRow("body", [StructuredTableCell(f"Revenue {k}"), StructuredTableCell("100")])]))
+        else:
+            elements.append(ExtractedEl(ElementType.TEXT, source, entry))
+    return elements
+
+
+def test_context_windows():
+    """Text windows, neighbouring tables and text distances should be found from the prefix sums."""
+    elements = make_document()
+    context_index = ElementContextIndex(elements)
+    assert context_index.text_window(4, True, 3) == [3, 2]
+    assert context_index.text_window(1, False, 3) == [2, 3]
+    assert context_index.text_window(4, False, 10) == [5]
+    assert context_index.text_window(0, True, 10) == []
+    assert context_index.neighbouring_tables(5, True, 2) == [4, 1]
+    assert context_index.neighbouring_tables(0, False, 1) == [1]
+    assert context_index.neighbouring_tables(4, False, 2) == []
+    for idx1 in range(0, len(elements)):
+        for idx2 in range(0, len(elements)):
+            assert context_index.text_distance(idx1, idx2) == get_text_distance(idx1, idx2, elements)
+
+
+def test_location_features():
+    """Features of an element should include the closest texts and tables around it."""
+    features = LocationFeatureBuilder(FeatureStore()).make_features("doc", None, [4], make_document(), False)[0]
+    assert features.get_feature("text_before") == "six four five one two three"
+    assert features.get_feature("text_after") == "seven eight"
+    # the closest table is always included
+    assert features.get_feature("text_distance_before_1") == len("four five") + len("six")
+    assert features.get_feature("text_simple_before_1") == make_document()[1].get_text_llm(False)
+    assert features.get_feature("text_distance_after_1") is None
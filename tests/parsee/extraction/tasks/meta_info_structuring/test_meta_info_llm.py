@@ -0,0 +1,67 @@
+from typing import Optional
+from decimal import Decimal
+from types import SimpleNamespace
+
+from parsee.extraction.extractor_elements import ExtractedEl, FinalOutputTableColumn, StructuredTable, StructuredRow, StructuredTableCell
+from parsee.extraction.extractor_dataclasses import ExtractedSource, ParseeLocation
+from parsee.extraction.tasks.meta_info_structuring.meta_info_llm import MetaLLMModel
+from parsee.storage.feature_store import FeatureStore
+from parsee.templates.general_structuring_schema import StructuringItemSchema
+from parsee.utils.enums import DocumentType, ElementType, OutputType, ContextType, SearchStrategy
+
+
+class MockStorage:
+
+    def __init__(self):
+        self.feature_store = FeatureStore()
+        self.expenses = []
+
+    def log_expense(self, service: str, amount: Decimal, class_id: str, tokens: Optional[int] = None):
+        self.expenses.append(amount)
+
+
+class MockLLM:
+
+    def __init__(self, answer: str):
+        self.spec = SimpleNamespace(model_id="mock")
+        self.answer = answer
+        self.prompts = []
+
+    def make_prompt_request(self, prompt):
+        self.prompts.append(prompt)
+        return self.answer, Decimal(1)
+
+
+def make_columns() -> tuple:
+    elements = [ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.PDF, None, None, 0, None), "Income statement in USD")]
+    rows = [StructuredRow("header", [StructuredTableCell(""), StructuredTableCell("2023"), StructuredTableCell("2022")]),
+            StructuredRow("body", [StructuredTableCell("Revenue"), StructuredTableCell("100"), StructuredTableCell("90")]),
+            StructuredRow("body", [StructuredTableCell("Costs"), StructuredTableCell("50"), StructuredTableCell("40")])]
+    table = StructuredTable(ExtractedSource(DocumentType.PDF, None, None, 1, None), rows)
+    elements.append(table)
+    columns = []
+    for detected_class in ["income", "other"]:
+        location = ParseeLocation("test", 1.0, detected_class, 1.0, table.source, [])
+        for k, col_idx_org in enumerate(table.numeric_cols_indices):
+            columns.append(FinalOutputTableColumn(location, table, k, k, col_idx_org))
+    return columns, elements
+
+
+def test_meta_per_table():
+    """All columns of a table should be predicted with one prompt, identical prompts should only be sent once."""
+    columns, elements = make_columns()
+    item = StructuringItemSchema(OutputType.LIST, ContextType.ITEMS, "period", "Period", "", None, SearchStrategy.START, None, None, ["FY", "Q1"], None, None)
+    llm = MockLLM("[column 0]\n1) FY\n[Column 1]\n1) Q1")
+    storage = MockStorage()
+    model = MetaLLMModel([item], llm, storage, meta_per_table=True)
+    output = model.predict_meta(columns, elements)
+    # "income" and "other" columns give the same prompt
+    assert len(llm.prompts) == 1
+    assert len(storage.expenses) == 1
+    assert [[(x.column_index, x.class_value) for x in meta] for meta in output] == [[(0, "FY")], [(1, "Q1")], [(0, "FY")], [(1, "Q1")]]
+    assert "2023" in str(llm.prompts[0]) and "2022" in str(llm.prompts[0])
+
+    llm = MockLLM("1) FY")
+    output = MetaLLMModel([item], llm, MockStorage()).predict_meta(columns, elements)
+    assert len(llm.prompts) == 2
+    assert [[x.class_value for x in meta] for meta in output] == [["FY"]] * 4
@@ -0,0 +1,33 @@
+from parsee.extraction.extractor_elements import StandardDocumentFormat, ExtractedEl
+from parsee.extraction.extractor_dataclasses import ExtractedSource
+from parsee.extraction.tasks.questions.features import GeneralQueriesPromptBuilder
+from parsee.storage.interfaces import StorageManager
+from parsee.templates.helpers import StructuringItem, MetaItem
+from parsee.utils.enums import DocumentType, ElementType, OutputType
+
+
+def make_document(text: str) -> StandardDocumentFormat:
+    return StandardDocumentFormat(DocumentType.PDF, text, [ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.PDF, None, None, 0, {"page_idx": 0}), text)], None)
+
+
+def test_build_prompt_reuses_static_fragments():
+    """The parts of the prompt that don't depend on the document should be built once per item definition, only the data should change."""
+    meta_item = MetaItem("Which currency?", OutputType.LIST, list_values=["EUR", "USD"], assigned_id="currency")
+    item = StructuringItem("What is the revenue?", OutputType.NUMERIC, meta_info=[meta_item], assigned_id="revenue")
+    builder = GeneralQueriesPromptBuilder(StorageManager(None, None))
+
+    documents = [make_document("revenue was 100"), make_document("revenue was 200")]
+    prompts = [builder.build_prompt(item, [meta_item], doc, doc.elements) for doc in documents]
+    assert len(builder.static_fragments) == 1
+    assert prompts[0].instructions() == prompts[1].instructions()
+    assert "revenue was 200" in prompts[1].available_data
+    assert str(prompts[1]) == str(GeneralQueriesPromptBuilder(StorageManager(None, None)).build_prompt(item, [meta_item], documents[1], documents[1].elements))
+
+    item.title = "What is the net income?"
+    assert "net income" in builder.build_prompt(item, [meta_item], documents[0], documents[0].elements).main_task
+    assert len(builder.static_fragments) == 2
+
+    # only the most recently used item definitions are kept
+    builder.max_static_fragments = 1
+    builder.build_prompt(item, [], documents[0], documents[0].elements)
+    assert len(builder.static_fragments) == 1
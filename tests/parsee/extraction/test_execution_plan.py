@@ -0,0 +1,49 @@
+from parsee import mock_config
+from parsee.extraction.extractor_elements import StandardDocumentFormat, ExtractedEl, StructuredTable, StructuredRow, StructuredTableCell
+from parsee.extraction.extractor_dataclasses import ExtractedSource
+from parsee.extraction.models.model_loader import ModelLoader
+from parsee.storage.interfaces import StorageManager
+from parsee.templates.helpers import StructuringItem, TableItem, MetaItem, create_template
+from parsee.utils.enums import DocumentType, ElementType, OutputType, SearchStrategy
+
+
+class MockModelsStorage(StorageManager):
+
+    def __init__(self, models):
+        super().__init__(None, None)
+        self.models = models
+
+    def get_available_models(self):
+        return self.models
+
+
+def make_document(source_identifier: str) -> StandardDocumentFormat:
+    elements = [ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.PDF, None, None, 0, {"page_idx": 0}), "Income statement of the group in EUR"),
+                StructuredTable(ExtractedSource(DocumentType.PDF, None, None, 1, {"page_idx": 0}), [
+                    StructuredRow("header", [StructuredTableCell(""), StructuredTableCell("FY 2023"), StructuredTableCell("FY 2022")]),
+                    StructuredRow("body", [StructuredTableCell("Revenue"), StructuredTableCell("1,200"), StructuredTableCell("1,100")]),
+                    StructuredRow("body", [StructuredTableCell("Net income"), StructuredTableCell("200"), StructuredTableCell("150")])])]
+    return StandardDocumentFormat(DocumentType.PDF, source_identifier, elements, None)
+
+
+def test_compiled_template_runs_for_several_documents():
+    """A compiled template should create its models once and run them for any number of documents."""
+    spec = mock_config(model_name="mock-plan")
+    currency = MetaItem("Which currency?", OutputType.LIST, list_values=["EUR", "USD"], assigned_id="currency")
+    question = StructuringItem("What is the revenue?", OutputType.NUMERIC, assigned_id="revenue")
+    table = TableItem("Income statement", "revenue income", meta_info=[currency], assigned_id="income_statement")
+    for item in [question, table]:
+        item.searchStrategy = SearchStrategy.START
+    template = create_template([question], [table])
+    template.set_default_model(spec)
+    storage = MockModelsStorage([spec])
+
+    plan = template.compile(ModelLoader(storage))
+    question_model = plan.question_models[0]
+    for source_identifier in ["doc1", "doc2"]:
+        _, columns, answers = plan.run(make_document(source_identifier))
+        assert [x.class_id for x in answers] == ["revenue"]
+        assert len(columns) == 2
+        assert all(x.detected_class == "income_statement" and [m.class_id for m in x.meta] == ["currency"] for x in columns)
+    assert plan.question_models[0] is question_model
+    assert set(storage.expense_ledger.totals().keys()) == {"doc1", "doc2"}
@@ -0,0 +1,82 @@
+from hashlib import sha256
+
+from parsee.extraction.extractor_elements import FinalOutputTableColumn, StructuredTable, StructuredRow, StructuredTableCell, ElementGroup
+from parsee.extraction.extractor_dataclasses import ExtractedSource, ParseeLocation
+from parsee.extraction.tasks.mappings.utils import get_table_signature
+from parsee.utils.enums import DocumentType
+
+
+def make_table(element_index: int, rows: list) -> StructuredTable:
+    source = ExtractedSource(DocumentType.PDF, None, None, element_index, None)
+    return StructuredTable(source, [StructuredRow("body", [StructuredTableCell(caption)] + [StructuredTableCell(x) for x in values]) for caption, *values in rows])
+
+
+def make_location(table: StructuredTable) -> ParseeLocation:
+    return ParseeLocation("test", 1.0, "test", 1.0, table.source, [])
+
+
+def expected_identifiers(column: FinalOutputTableColumn):
+    kv_identifier = sha256(str(column.key_value_pairs_json()).encode('utf-8')).hexdigest()
+    li_identifier = sha256(str(get_table_signature(column.key_value_pairs)).encode('utf-8')).hexdigest()
+    return kv_identifier, li_identifier
+
+
+def test_identifiers_follow_changes():
+    """The lazily computed identifiers should always match a fresh computation from the key value pairs."""
+    first = make_table(0, [("Revenue", "100", "90"), ("Costs", "50", "40")])
+    second = make_table(2, [("Profit", "50", "50")])
+    column = FinalOutputTableColumn(make_location(first), first, 0, 0, 1)
+    assert (column.kv_identifier, column.li_identifier) == expected_identifiers(column)
+
+    column.add_location(make_location(second), second, 0, 1)
+    assert [x[0] for x in column.key_value_pairs] == ["Revenue", "Costs", "Profit"]
+    assert len(column.sources) == 2
+    assert (column.kv_identifier, column.li_identifier) == expected_identifiers(column)
+
+    column.add_empty_line_items(1, ["Other"])
+    assert [x[0] for x in column.key_value_pairs] == ["Revenue", "Other", "Costs", "Profit"]
+    assert (column.kv_identifier, column.li_identifier) == expected_identifiers(column)
+
+
+def test_add_location_matches_full_build():
+    """Appending a location incrementally should give the same values as rebuilding the column from scratch."""
+    tables = [make_table(k, [(f"Item {k}-{x}", str(x), str(x * 2)) for x in range(1, 4)]) for k in range(0, 5)]
+    column = FinalOutputTableColumn(make_location(tables[0]), tables[0], 0, 1, 2)
+    for table in tables[1:]:
+        column.add_location(make_location(table), table, 1, 2)
+    incremental = (list(column.key_value_pairs), column.kv_identifier, column.li_identifier)
+    column.build()
+    assert incremental == (column.key_value_pairs, column.kv_identifier, column.li_identifier)
+
+
+def test_structured_values_merged_tables():
+    """Columns of tables merged into one group should contain the line items of all tables."""
+    first = make_table(0, [("Revenue", "100", "90"), ("Costs", "50", "40")])
+    second = make_table(1, [("Profit", "50", "50")])
+    group = ElementGroup("test", make_location(first))
+    group.merge_with(ElementGroup("test", make_location(second)))
+    columns = group.structured_values([first, second])
+    assert len(columns) == 2
+    assert columns[0].key_value_pairs == [("Revenue", 100), ("Costs", 50), ("Profit", 50)]
+    assert columns[0].li_identifier == columns[1].li_identifier
+    assert columns[0].kv_identifier != columns[1].kv_identifier
+
+
+def test_rendered_text_cached_until_rows_change():
+    """Table texts should only be rendered once and re-rendered when rows are added."""
+    table = make_table(0, [("Revenue", "100", "90"), ("Costs", "50", "40")])
+    calls = []
+    render_org = table._render_text_llm
+    table._render_text_llm = lambda contain_numbers: calls.append(contain_numbers) or render_org(contain_numbers)
+    text_numbers = table.get_text_llm(True)
+    text_no_numbers = table.get_text_llm(False)
+    assert table.get_text_llm(True) == text_numbers
+    assert table.get_text_llm(False) == text_no_numbers
+    assert calls == [True, False]
+
+    row = StructuredRow("body", [StructuredTableCell("Profit"), StructuredTableCell("50"), StructuredTableCell("50")])
+    row.final_values = row.values
+    table.rows.append(row)
+    assert "Profit" in table.get_text_llm(True)
+    assert "Profit" in table.get_text()
+    assert calls == [True, False, True]
@@ -0,0 +1,34 @@
+import os
+
+from parsee import mock_config
+from parsee.extraction.models.model_loader import ModelLoader
+from parsee.extraction.run import run_job_over_documents
+from parsee.templates.helpers import StructuringItem, create_template
+from parsee.utils.enums import OutputType, SearchStrategy
+from tests.parsee.extraction.test_execution_plan import MockModelsStorage, make_document
+
+
+def test_run_job_over_documents_with_checkpoint(tmp_path):
+    """Documents and file paths should be processed, failed documents skipped and completed documents not processed again after a restart."""
+    html_path = os.path.join(tmp_path, "report.html")
+    with open(html_path, "w") as f:
+        f.write("<html><body><p>The revenue was 1,200 EUR.</p></body></html>")
+    question = StructuringItem("What is the revenue?", OutputType.NUMERIC, assigned_id="revenue")
+    question.searchStrategy = SearchStrategy.START
+    template = create_template([question])
+    spec = mock_config(model_name="mock-batch")
+    model_loader = ModelLoader(MockModelsStorage([spec]))
+    documents = [make_document("doc1"), html_path, os.path.join(tmp_path, "missing.html"), make_document("doc2")]
+    checkpoint_path = os.path.join(tmp_path, "checkpoint.txt")
+    progress = []
+
+    results = list(run_job_over_documents(documents, template, spec, model_loader, num_workers=1, checkpoint_path=checkpoint_path, on_progress=progress.append))
+
+    assert len(results) == 3
+    assert template.questions.items[0].model != spec.model_id
+    assert len(set(x[0] for x in results)) == 3
+    assert all([a.class_id for a in answers] == ["revenue"] for _, _, _, answers in results)
+    assert (progress[-1].completed, progress[-1].failed, progress[-1].skipped) == (3, 1, 0)
+
+    assert list(run_job_over_documents(documents, template, spec, model_loader, num_workers=0, checkpoint_path=checkpoint_path, on_progress=progress.append)) == []
+    assert (progress[-1].completed, progress[-1].failed, progress[-1].skipped) == (0, 1, 3)
@@ -0,0 +1,82 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from parsee.storage.document_cache import DocumentCache
+from parsee.storage.interfaces import DocumentManager, StorageManager
+from parsee.extraction.extractor_elements import ExtractedEl, StandardDocumentFormat, FileReference
+from parsee.extraction.extractor_dataclasses import ExtractedSource
+from parsee.utils.enums import DocumentType, ElementType
+
+
+def make_document(source_identifier: str, num_elements: int) -> StandardDocumentFormat:
+    elements = [ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.TEXT, None, None, k, None), f"text {k}") for k in range(0, num_elements)]
+    return StandardDocumentFormat(DocumentType.TEXT, source_identifier, elements, None)
+
+
+class CountingLoader:
+
+    def __init__(self):
+        self.loaded = []
+
+    def __call__(self, source_identifier: str) -> StandardDocumentFormat:
+        self.loaded.append(source_identifier)
+        return make_document(source_identifier, 3)
+
+
+class SlowLoader(CountingLoader):
+
+    def __call__(self, source_identifier: str) -> StandardDocumentFormat:
+        time.sleep(0.3)
+        return super().__call__(source_identifier)
+
+
+class MockVectorStore:
+
+    def sort_identifiers_by_relevance(self, source_identifiers, search_term):
+        return sorted(source_identifiers)
+
+
+def test_documents_loaded_once_and_evicted():
+    """Documents should only be loaded again after they were evicted, in which case they are read from the disk cache if available."""
+    loader = CountingLoader()
+    cache = DocumentCache(max_elements=6, max_bytes=1000)
+    for source_identifier in ["a", "b", "a", "c", "a", "b"]:
+        assert cache.get_or_load(source_identifier, loader).source_identifier == source_identifier
+    # b was used least recently when c was added
+    assert loader.loaded == ["a", "b", "c", "b"]
+    assert cache.total_elements == 6
+
+
+def test_documents_loaded_concurrently():
+    """Different documents should be loaded at the same time, requests for a document that is being loaded should wait for it."""
+    loader = SlowLoader()
+    cache = DocumentCache()
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        documents = list(executor.map(lambda x: cache.get_or_load(x, loader), ["a", "b", "a", "b"]))
+    assert time.time() - start < 0.55
+    assert [x.source_identifier for x in documents] == ["a", "b", "a", "b"]
+    assert sorted(loader.loaded) == ["a", "b"]
+
+
+def test_disk_cache(tmp_path):
+    """Converted documents should be shared between caches using the same directory."""
+    loader = CountingLoader()
+    cache = DocumentCache(disk_dir=str(tmp_path))
+    cache.get_or_load("a", loader)
+    document = DocumentCache(disk_dir=str(tmp_path)).get_or_load("a", loader)
+    assert loader.loaded == ["a"]
+    assert [x.get_text() for x in document.elements] == ["text 0", "text 1", "text 2"]
+    assert [x.name for x in tmp_path.iterdir() if x.name.endswith(".tmp")] == []
+
+
+def test_cached_documents_not_changed_by_manager():
+    """Filtering the elements of a document for a request should not change the cached document."""
+    storage = StorageManager(MockVectorStore(), None)
+    loader = CountingLoader()
+    manager = DocumentManager(storage, DocumentCache())
+    partial = manager._load_documents([FileReference("a", None, 1)], False, None, None, 10000, loader, True)
+    full = manager._load_documents([FileReference("a", None, None)], False, None, None, 10000, loader, True)
+    assert "text 1" in partial and "text 0" not in partial
+    assert "text 0" in full and "text 2" in full
+    assert loader.loaded == ["a"]
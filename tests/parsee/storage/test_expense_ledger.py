@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import threading
+from decimal import Decimal
+
+from parsee.storage.expense_ledger import ExpenseLedger, SqliteExpenseSink, expense_context
+
+
+def test_expenses_aggregated_and_written_in_batches(tmp_path):
+    """Expenses should be aggregated by document and template right away and written to the sink in the background."""
+    path = os.path.join(tmp_path, "expenses.db")
+    ledger = ExpenseLedger(SqliteExpenseSink(path), batch_size=10, flush_interval=0.05)
+    with expense_context("doc1", "template1"):
+        for k in range(0, 25):
+            ledger.log("gpt", Decimal("0.01"), f"question_{k % 2}", 100)
+    with expense_context("doc2", "template1"):
+        ledger.log("gpt", Decimal("0.5"), "question_0", None)
+    ledger.log("gpt", Decimal("1"), "chat")
+
+    assert ledger.totals()["doc1"] == {"amount": Decimal("0.25"), "tokens": 2500, "requests": 25}
+    assert ledger.totals("template_id")["template1"]["amount"] == Decimal("0.75")
+    assert ledger.totals("template_id")[None]["requests"] == 1
+    assert ledger.totals("class_id")["question_0"]["requests"] == 14
+
+    ledger.flush()
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT source_identifier, COUNT(*) FROM expenses GROUP BY source_identifier ORDER BY source_identifier").fetchall()
+    assert rows == [(None, 1), ("doc1", 25), ("doc2", 1)]
+
+
+def test_ledgers_share_writer_of_sink(tmp_path):
+    """Ledgers with the same sink (e.g. of storages created per call) should share one writer thread."""
+    path = os.path.join(tmp_path, "expenses.db")
+    ledgers = [ExpenseLedger(SqliteExpenseSink(path), flush_interval=0.05) for _ in range(0, 5)]
+    num_threads = threading.active_count()
+    for ledger in ledgers:
+        ledger.log("gpt", Decimal("0.01"), "question")
+    assert len(set(id(x.writer) for x in ledgers)) == 1
+    assert threading.active_count() == num_threads + 1
+
+    ledgers[0].flush()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0] == 5
@@ -0,0 +1,78 @@
+import threading
+from types import SimpleNamespace
+
+from parsee.storage.feature_store import FeatureStore, shared_mapping_feature_store
+from parsee.extraction.extractor_elements import ExtractedEl
+from parsee.extraction.extractor_dataclasses import ExtractedSource
+from parsee.extraction.tasks.element_classification.features import LocationFeatureBuilder, LLMLocationFeatureBuilder
+from parsee.extraction.tasks.mappings.features import LLMMappingFeatureBuilder
+from parsee.utils.enums import DocumentType, ElementType
+
+
+def make_elements(texts: list) -> list:
+    return [ExtractedEl(ElementType.TEXT, ExtractedSource(DocumentType.TEXT, None, None, k, None), text) for k, text in enumerate(texts)]
+
+
+def test_features_scoped_by_document():
+    """Entries of different documents should not collide and the least recently used documents should be evicted."""
+    store = FeatureStore(2)
+    store.set("doc1", 0, "a")
+    store.set("doc2", 0, "b")
+    assert store.get("doc1", 0) == "a"
+    store.set("doc3", 0, "c")
+    # doc2 was used least recently
+    assert store.get("doc2", 0) is None
+    assert store.get("doc1", 0) == "a"
+    assert store.get_or_make("doc3", 0, lambda: "x") == "c"
+
+
+def test_base_features_shared_between_builders(monkeypatch):
+    """Element features should be computed once per document, even when several builders are used."""
+    calls = []
+
+    def mock_composition(text):
+        calls.append(text)
+        return {"numbers": 0, "text": 1, "special": 0}
+
+    monkeypatch.setattr("parsee.extraction.tasks.element_classification.features.composition_percentages", mock_composition)
+    store = FeatureStore()
+    elements = make_elements(["Revenue increased by 10 percent", "Income statement", "Other text"])
+    first = LLMLocationFeatureBuilder(store).make_features("doc1", None, [1], elements, False)
+    second = LLMLocationFeatureBuilder(store).make_features("doc1", None, [1], elements, False)
+    assert len(calls) == 3
+    assert first[0].to_list() == second[0].to_list()
+    # the cleaned text depends on the builder, the rest is shared
+    LocationFeatureBuilder(store).make_features("doc1", None, [1], elements, False)
+    assert len(calls) == 3
+    LocationFeatureBuilder(store).make_features("doc2", None, [1], elements, False)
+    assert len(calls) == 6
+
+
+def test_features_computed_without_blocking_other_threads():
+    """Other threads should be able to use the store while a feature is computed."""
+    store = FeatureStore()
+    started, finished = threading.Event(), threading.Event()
+
+    def slow_feature():
+        started.set()
+        assert finished.wait(5)
+        return "slow"
+
+    thread = threading.Thread(target=lambda: store.get_or_make("doc1", "slow", slow_feature))
+    thread.start()
+    assert started.wait(5)
+    assert store.get_or_make("doc2", "fast", lambda: "fast") == "fast"
+    finished.set()
+    thread.join()
+    assert store.get("doc1", "slow") == "slow"
+
+
+def test_mapping_features_by_detected_class():
+    """Tables with the same line items but different classes should not share their mapping features."""
+    store = FeatureStore()
+    tables = [SimpleNamespace(detected_class=class_id, li_identifier="same_items", line_items=["Revenue", "Costs"]) for class_id in ["income_statement", "segments"]]
+    features = [LLMMappingFeatureBuilder(store)._make_base_features(table, "schema", 0) for table in tables]
+    assert [x["class_id"] for x in features] == ["income_statement", "segments"]
+    # the features are scoped by table, in a store separate from the documents by default
+    assert list(store._scopes.keys()) == ["mapping:same_items"]
+    assert LLMMappingFeatureBuilder().feature_store is shared_mapping_feature_store
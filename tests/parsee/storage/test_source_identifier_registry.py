@@ -0,0 +1,65 @@
+import os
+import json
+
+import parsee.storage.source_identifier_registry as registry_module
+from parsee.storage.source_identifier_registry import SourceIdentifierRegistry
+from parsee.storage.local_file_manager import LocalFileManager
+from parsee.storage.interfaces import StorageManager
+from parsee.utils.helper import get_source_identifier
+
+
+def test_files_hashed_once(tmp_path, monkeypatch):
+    """Files should only be hashed again if they changed, also across registries using the same file."""
+    hashed = []
+    monkeypatch.setattr(registry_module, "get_source_identifier", lambda path: hashed.append(path) or get_source_identifier(path))
+    paths = []
+    for k in range(0, 3):
+        paths.append(str(tmp_path / f"file_{k}.txt"))
+        with open(paths[-1], "w") as f:
+            f.write(f"content {k}")
+    registry_path = str(tmp_path / "registry.json")
+
+    registry = SourceIdentifierRegistry(registry_path, 2)
+    registry.submit(paths)
+    assert [registry.get(x) for x in paths] == [get_source_identifier(x) for x in paths]
+    assert len(hashed) == 3
+    assert os.path.exists(registry_path)
+
+    with open(paths[0], "w") as f:
+        f.write("changed content")
+    registry = SourceIdentifierRegistry(registry_path, 2)
+    assert [registry.get(x) for x in paths] == [get_source_identifier(x) for x in paths]
+    assert len(hashed) == 4
+
+
+def test_file_manager_resolves_identifiers(tmp_path):
+    """The file manager should find files by the identifiers of the registry."""
+    path = str(tmp_path / "file.txt")
+    with open(path, "w") as f:
+        f.write("content")
+    manager = LocalFileManager(StorageManager(None, None), [path], None, SourceIdentifierRegistry(None, 1))
+    assert manager.source_identifier_to_paths == {get_source_identifier(path): path}
+
+
+def test_saves_debounced_and_merged(tmp_path):
+    """Files hashed one by one should not rewrite the registry each time, registries of several processes should keep each other's entries."""
+    paths = []
+    for k in range(0, 20):
+        paths.append(str(tmp_path / f"file_{k}.txt"))
+        with open(paths[-1], "w") as f:
+            f.write(f"content {k}")
+    registry_path = str(tmp_path / "registry.json")
+
+    registry = SourceIdentifierRegistry(registry_path, 1, save_interval=60)
+    other_registry = SourceIdentifierRegistry(registry_path, 1, save_interval=60)
+    for path in paths[0:10]:
+        registry.get(path)
+    other_registry.get(paths[10])
+    with open(registry_path) as f:
+        assert len(json.load(f)) == 2
+
+    registry.save()
+    other_registry.save()
+    with open(registry_path) as f:
+        assert len(json.load(f)) == 11
+    assert [x.name for x in tmp_path.iterdir() if x.name.endswith(".tmp")] == []
@@ -0,0 +1,20 @@
+from parsee.templates.helpers import StructuringItem, TableItem, MetaItem, create_template
+from parsee.utils.enums import OutputType
+
+
+def test_with_model_does_not_change_original():
+    """The template with the new model should share the unchanged values with the original template, which keeps its models and settings."""
+    meta_item = MetaItem("Which currency?", OutputType.TEXT)
+    template = create_template([StructuringItem("What is the revenue?", OutputType.NUMERIC, meta_info=[meta_item])], [TableItem("Income statement", "revenue", meta_info=[meta_item])])
+    template.questions.settings = {"existing": [1, 2, 3]}
+    truth = [object()]
+
+    specialized = template.with_model("assigned", questions_settings={"assigned": truth})
+
+    assert [x.model for x in specialized.questions.items + specialized.detection.items + specialized.meta] == ["assigned"] * 3
+    assert specialized.detection.items[0].mappingModel == "assigned"
+    assert specialized.questions.settings["assigned"] is truth
+    assert specialized.questions.settings["existing"] is template.questions.settings["existing"]
+    assert specialized.questions.items[0].metaInfoIds is template.questions.items[0].metaInfoIds
+    assert "assigned" not in template.questions.settings
+    assert "assigned" not in [x.model for x in template.questions.items + template.detection.items + template.meta]
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from parsee import ollama_config
+from parsee.settings import chat_settings
+from parsee.extraction.models.llm_models.llm_base_model import LLMBaseModel, truncate_prompt
+from parsee.extraction.models.llm_models.prompts import Prompt
+from parsee.utils.instrumentation import InMemoryCollector, OpenTelemetryHook, add_hook, remove_hook, stage
+
+
+class MockModel(LLMBaseModel):
+
+    def __init__(self):
+        super().__init__(ollama_config("instrumented-model"))
+        self.encoding = chat_settings.encoding
+        self.max_tokens_answer = 10
+
+    def make_prompt_request(self, prompt: Prompt):
+        final_prompt, num_tokens_input = truncate_prompt(prompt, self.encoding, 1000)
+        return self._request(num_tokens_input, lambda x: ("one two three", Decimal("0.5")), final_prompt)
+
+
+class MockSpan:
+
+    def __init__(self, spans, name, start_time, attributes):
+        self.spans = spans
+        self.entry = [name, start_time, None, attributes]
+
+    def end(self, end_time):
+        self.entry[2] = end_time
+        self.spans.append(self.entry)
+
+
+class MockTracer:
+
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, start_time, attributes):
+        return MockSpan(self.spans, name, start_time, attributes)
+
+
+def test_stages_collected():
+    """Timings, tokens and costs of the stages should be passed to all registered hooks."""
+    collector = InMemoryCollector()
+    tracer = MockTracer()
+    otel_hook = OpenTelemetryHook(tracer)
+    add_hook(collector)
+    add_hook(otel_hook)
+    try:
+        model = MockModel()
+        for _ in range(0, 2):
+            model.make_prompt_request(Prompt(None, "question", available_data="some data"))
+        with stage("custom", source_identifier="doc") as attributes:
+            attributes["num_elements"] = 3
+    finally:
+        remove_hook(collector)
+        remove_hook(otel_hook)
+    summary = collector.summary()
+    assert summary["tokenization"]["count"] == 2
+    assert summary["llm_request"]["output_tokens"] == 6
+    assert summary["llm_request"]["cost"] == 1.0
+    assert summary["llm_request"]["input_tokens"] == summary["tokenization"]["input_tokens"] > 0
+    assert summary["custom"]["num_elements"] == 3
+    assert [x[0] for x in tracer.spans] == ["parsee.tokenization", "parsee.llm_request"] * 2 + ["parsee.custom"]
+    assert all(x[1] <= x[2] for x in tracer.spans)
+    # without hooks, nothing is collected
+    model.make_prompt_request(Prompt(None, "question", available_data="some data"))
+    assert collector.summary()["llm_request"]["count"] == 2